@@ -2,20 +2,25 @@ from __future__ import annotations
 
 import contextlib
 import logging
-from collections import deque
-from typing import Any
+import sys
+from collections import defaultdict, deque
+from typing import Any, ClassVar
 
 from tornado import gen, locks
 from tornado.ioloop import IOLoop
 
 import dask
-from dask.utils import parse_timedelta
+from dask.utils import parse_bytes, parse_timedelta
 
 from distributed.core import CommClosedError
 from distributed.metrics import time
+from distributed.protocol.compact import encode_messages
 
 logger = logging.getLogger(__name__)
 
+#: Weight of the latest batch in the moving averages of the message rate and size
+_ALPHA = 0.2
+
 
 class BatchedSend:
     """Batch messages in batches on a stream
@@ -38,10 +43,25 @@ class BatchedSend:
     On the other side, the recipient will get a message like the following::
 
         ['Hello,', 'world!']
+
+    The interval is only an upper bound, see ``distributed.comm.batched-send``:
+
+    - Once the buffered messages exceed ``flush-size`` bytes, as estimated from the
+      average size of the messages sent so far, they are sent right away, in
+      batches of about that size.
+    - When messages come in faster than ``target-length`` per interval, the
+      interval shrinks down to ``minimum`` so that batches stay about that long.
+    - Messages whose op is in ``priority-ops``, e.g. steal requests, are sent right
+      away, together with the messages queued before them.
     """
 
     # XXX why doesn't BatchedSend follow either the IOStream or Comm API?
 
+    #: Total time that messages spent in the buffer of any BatchedSend in this
+    #: process, and number of messages sent, by op
+    queueing_delay: ClassVar[defaultdict[str, float]] = defaultdict(float)
+    queued_messages: ClassVar[defaultdict[str, int]] = defaultdict(int)
+
     def __init__(self, interval, loop=None, serializers=None):
         # XXX is the loop arg useful?
         self.loop = loop or IOLoop.current()
@@ -61,6 +81,31 @@ class BatchedSend:
         self.serializers = serializers
         self._consecutive_failures = 0
 
+        config = dask.config.get("distributed.comm.batched-send")
+        self.flush_size = parse_bytes(config["flush-size"])
+        self.priority_ops = frozenset(config["priority-ops"])
+        adaptive = config["adaptive-interval"]
+        if adaptive["enabled"]:
+            self.min_interval = min(
+                self.interval, parse_timedelta(adaptive["minimum"], default="ms")
+            )
+        else:
+            self.min_interval = self.interval
+        self.target_length = adaptive["target-length"]
+        #: Interval after the latest batch, between min_interval and interval
+        self.current_interval = self.interval
+        #: Moving average of the number of messages sent per second
+        self.message_rate = 0.0
+        self._last_batch = None
+        #: Maximum number of messages per batch, from flush_size and the average
+        #: size of the messages sent so far
+        self._batch_length = sys.maxsize
+        self._bytes_per_message = None
+        #: Whether the buffer should be sent without waiting for the interval
+        self._urgent = False
+        #: Time at which every message in the buffer was queued
+        self._enqueued = []
+
     def start(self, comm):
         self.comm = comm
         self.loop.add_callback(self._background_send)
@@ -88,12 +133,16 @@ class BatchedSend:
                 # Nothing to send
                 self.next_deadline = None
                 continue
-            if self.next_deadline is not None and time() < self.next_deadline:
+            if (
+                self.next_deadline is not None
+                and time() < self.next_deadline
+                and not self._urgent
+                and len(self.buffer) < self._batch_length
+            ):
                 # Send interval not expired yet
                 continue
-            payload, self.buffer = self.buffer, []
+            payload = self._next_batch()
             self.batch_count += 1
-            self.next_deadline = time() + self.interval
             try:
                 # NOTE: Since `BatchedSend` doesn't have a handle on the running
                 # `_background_send` coroutine, the only thing with a reference to this
@@ -109,7 +158,9 @@ class BatchedSend:
                 # object is always cleaned up, even if `yield` raises `GeneratorExit`.
                 with contextlib.closing(
                     self.comm.write(
-                        payload, serializers=self.serializers, on_error="raise"
+                        self._encode(payload),
+                        serializers=self.serializers,
+                        on_error="raise",
                     )
                 ) as coro:
                     nbytes = yield coro
@@ -118,6 +169,7 @@ class BatchedSend:
                 else:
                     self.recent_message_log.append("large-message")
                 self.byte_count += nbytes
+                self._update_batch_length(nbytes, len(payload))
             except CommClosedError:
                 logger.info("Batched Comm Closed %r", self.comm, exc_info=True)
                 break
@@ -147,6 +199,63 @@ class BatchedSend:
         self.stopped.set()
         self.abort()
 
+    def _next_batch(self) -> list:
+        """Pop the next batch from the buffer, and update the statistics and the
+        deadline of the following one
+        """
+        now = time()
+        n = len(self.buffer)
+        if n > self._batch_length:
+            n = self._batch_length
+            payload, self.buffer = self.buffer[:n], self.buffer[n:]
+            enqueued, self._enqueued = self._enqueued[:n], self._enqueued[n:]
+            # Send the rest right after this batch
+            self._urgent = True
+            self.waker.set()
+        else:
+            payload, self.buffer = self.buffer, []
+            enqueued, self._enqueued = self._enqueued, []
+            self._urgent = False
+
+        delay = BatchedSend.queueing_delay
+        count = BatchedSend.queued_messages
+        for msg, t in zip(payload, enqueued):
+            op = (msg.get("op") or "other") if isinstance(msg, dict) else "other"
+            delay[op] += now - t
+            count[op] += 1
+
+        if self._last_batch is not None:
+            # Don't mistake messages sent early, e.g. urgent ones, for a rate spike
+            elapsed = max(now - self._last_batch, self.current_interval)
+            self.message_rate += _ALPHA * (n / elapsed - self.message_rate)
+        self._last_batch = now
+        if self.min_interval < self.interval and self.message_rate:
+            self.current_interval = min(
+                self.interval,
+                max(self.min_interval, self.target_length / self.message_rate),
+            )
+        self.next_deadline = now + self.current_interval
+        return payload
+
+    def _update_batch_length(self, nbytes: int, nmessages: int) -> None:
+        if not nmessages:
+            return
+        if self._bytes_per_message is None:
+            self._bytes_per_message = nbytes / nmessages
+        else:
+            self._bytes_per_message += _ALPHA * (
+                nbytes / nmessages - self._bytes_per_message
+            )
+        self._batch_length = max(1, int(self.flush_size / self._bytes_per_message))
+
+    def _encode(self, payload: list) -> list:
+        """Encode the most frequent messages compactly, if the peer supports it.
+        See distributed.protocol.compact.
+        """
+        if self.comm.handshake_options.get("compact-messages"):
+            return encode_messages(payload)
+        return payload
+
     def send(self, *msgs: Any) -> None:
         """Schedule a message for sending to the other side
 
@@ -157,8 +266,18 @@ class BatchedSend:
 
         self.message_count += len(msgs)
         self.buffer.extend(msgs)
+        self._enqueued.extend([time()] * len(msgs))
+        if not self._urgent and self.priority_ops:
+            for msg in msgs:
+                if isinstance(msg, dict) and msg.get("op") in self.priority_ops:
+                    self._urgent = True
+                    break
         # Avoid spurious wakeups if possible
-        if self.next_deadline is None:
+        if (
+            self.next_deadline is None
+            or self._urgent
+            or len(self.buffer) >= self._batch_length
+        ):
             self.waker.set()
 
     @gen.coroutine
@@ -176,10 +295,13 @@ class BatchedSend:
             try:
                 if self.buffer:
                     self.buffer, payload = [], self.buffer
+                    self._enqueued = []
                     # See note in `_background_send` for explanation of `closing`.
                     with contextlib.closing(
                         self.comm.write(
-                            payload, serializers=self.serializers, on_error="raise"
+                            self._encode(payload),
+                            serializers=self.serializers,
+                            on_error="raise",
                         )
                     ) as coro:
                         yield coro
@@ -192,6 +314,7 @@ class BatchedSend:
             return
         self.please_stop = True
         self.buffer = []
+        self._enqueued = []
         self.waker.set()
         if not self.comm.closed():
             self.comm.abort()
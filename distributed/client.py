@@ -99,6 +99,7 @@ from distributed.exceptions import WorkerStartTimeoutError
 from distributed.metrics import time
 from distributed.objects import HasWhat, SchedulerInfo, WhoHas
 from distributed.protocol import serialize, to_serialize
+from distributed.protocol.compact import decode_messages
 from distributed.protocol.pickle import dumps, loads
 from distributed.protocol.serialize import Serialized, ToPickle, _is_dumpable
 from distributed.publish import Datasets
@@ -1762,6 +1763,8 @@ class Client(SyncMethodMixin):
                         break
                 if not isinstance(msgs, (list, tuple)):
                     msgs = (msgs,)
+                elif self.scheduler_comm.comm.handshake_options.get("compact-messages"):
+                    msgs = decode_messages(msgs)
 
                 breakout = False
                 for msg in msgs:
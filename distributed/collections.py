@@ -119,19 +119,33 @@ class HeapSet(MutableSet[T]):
 
     def peekn(self, n: int) -> Iterator[T]:
         """Iterate over the n smallest elements without removing them.
-        This is O(1) for n == 1; O(n*logn) otherwise.
+        This is O(1) for n == 1; O(n*logn) otherwise, regardless of the size of the
+        heap.
         """
         if n <= 0 or not self:
             return  # empty iterator
         if n == 1:
             yield self.peek()
-        else:
-            # NOTE: we could pop N items off the queue, then push them back.
-            # But copying the list N times is probably slower than just sorting it
-            # with fast C code.
-            # If we had a `heappop` that sliced the list instead of popping from it,
-            # we could implement an optimized version for small `n`s.
+        elif self._sorted:
             yield from itertools.islice(self.sorted(), n)
+        else:
+            # Walk the heap from the root, always visiting the smallest node whose
+            # parent has been visited. Unlike sorting the whole heap, this is
+            # O(n*logn) plus the cost of skipping discarded elements.
+            heap = self._heap
+            frontier = [(heap[0], 0)]
+            seen = set()
+            while frontier:
+                (_, _, vref), i = heapq.heappop(frontier)
+                value = vref()
+                if value in self._data and value not in seen:
+                    yield value
+                    seen.add(value)
+                    if len(seen) == n:
+                        return
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
 
     def pop(self) -> T:
         if not self._data:
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import socket
+
 from distributed.comm.addressing import (
     get_address_host,
     get_address_host_port,
@@ -22,6 +24,12 @@ def _register_transports():
     backends["tcp"] = tcp.TCPBackend()
     backends["tls"] = tcp.TLSBackend()
 
+    if hasattr(socket, "AF_UNIX"):
+        from distributed.comm import shm, unix
+
+        backends["unix"] = unix.UnixBackend()
+        backends["shm"] = shm.SHMBackend()
+
     try:
         # If `distributed-ucxx` is installed, it takes over the protocol="ucx" support
         import distributed_ucxx
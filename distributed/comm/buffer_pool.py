@@ -0,0 +1,187 @@
+"""Pool of reusable receive buffers for the TCP comms.
+
+Without it, every frame received by :meth:`~distributed.comm.tcp.TCP.read` is read
+into a freshly allocated buffer. Under sustained traffic, these short-lived buffers
+of several megabytes cause fragmentation of the memory allocator, which shows up as
+unmanaged memory.
+
+Buffers are lent in size classes, so that a buffer can be reused for frames of
+slightly different sizes. Nobody returns them explicitly: a lent buffer is
+reclaimed as soon as nothing references it anymore, which is detected through its
+reference count. Frames that are deserialized into objects that reference them (e.g.
+numpy arrays) simply keep their buffer for as long as they live.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from collections import defaultdict, deque
+
+import dask
+from dask.utils import parse_bytes
+
+from distributed.protocol.utils import host_array
+
+#: Maximum number of lent buffers which are tracked to be reclaimed. Buffers that are
+#: referenced for a long time are eventually forgotten by the pool.
+MAX_LENT = 1024
+
+_pool: BufferPool | None = None
+_pool_lock = threading.Lock()
+
+
+def size_class(n: int) -> int:
+    """Round n up to the nearest size class. There are four size classes between
+    consecutive powers of two, so buffers are never more than 25% larger than
+    requested.
+    """
+    step = 1 << max(0, n.bit_length() - 3)
+    return -(-n // step) * step
+
+
+def _refcounts(bases: list | deque) -> list[int]:
+    return [sys.getrefcount(base) for base in bases]
+
+
+#: Reference count of a buffer that is only referenced by the pool
+_UNREFERENCED = _refcounts([bytearray()])[0]
+
+
+class BufferPool:
+    """Size-classed pool of writeable buffers, as returned by
+    :func:`~distributed.protocol.utils.host_array`.
+
+    Parameters
+    ----------
+    min_size:
+        Smaller buffers are not pooled, as the allocator deals with them efficiently
+    max_size:
+        Larger buffers are not pooled
+    max_free:
+        Maximum total size of the buffers kept in the pool while they're not lent
+    """
+
+    min_size: int
+    max_size: int
+    max_free: int
+
+    #: size class -> buffers that are not lent
+    _free: defaultdict[int, list[object]]
+    #: (buffer, size class) that are lent, possibly still referenced
+    _lent: deque[tuple[object, int]]
+    _lock: threading.Lock
+
+    #: Total size of the buffers that are not lent
+    free_bytes: int
+    #: Total size of the lent buffers that are tracked by the pool
+    lent_bytes: int
+    #: Number of buffers lent from the pool
+    hits: int
+    #: Number of buffers that had to be allocated
+    misses: int
+    #: Number of buffers that were too small or too large to be pooled
+    unpooled: int
+
+    def __init__(self, min_size: int, max_size: int, max_free: int):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_free = max_free
+        self._free = defaultdict(list)
+        self._lent = deque()
+        self._lock = threading.Lock()
+        self.free_bytes = 0
+        self.lent_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.unpooled = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<BufferPool: {self.hits} hits, {self.misses} misses, "
+            f"{self.free_bytes} free bytes, {self.lent_bytes} lent bytes>"
+        )
+
+    def acquire(self, n: int) -> memoryview:
+        """Return a writeable buffer of n bytes, which is reclaimed by the pool
+        when it's no longer referenced.
+        """
+        if not self.min_size <= n <= self.max_size:
+            self.unpooled += 1
+            return host_array(n)
+
+        size = size_class(n)
+        with self._lock:
+            if not self._free[size]:
+                self._collect()
+            if self._free[size]:
+                base = self._free[size].pop()
+                self.free_bytes -= size
+                self.hits += 1
+            else:
+                base = host_array(size).obj
+                self.misses += 1
+
+            if len(self._lent) == MAX_LENT:
+                _, forgotten_size = self._lent.popleft()
+                self.lent_bytes -= forgotten_size
+            self._lent.append((base, size))
+            self.lent_bytes += size
+
+        return memoryview(base)[:n]  # type: ignore[call-overload]
+
+    def collect(self) -> None:
+        """Reclaim the lent buffers that are no longer referenced"""
+        with self._lock:
+            self._collect()
+
+    def _collect(self) -> None:
+        bases = [base for base, _ in self._lent]
+        refcounts = _refcounts(bases)
+        # One more reference from the list above
+        unreferenced = _UNREFERENCED + 1
+        del bases
+
+        lent = self._lent
+        self._lent = deque()
+        for (base, size), refcount in zip(lent, refcounts):
+            if refcount > unreferenced:
+                self._lent.append((base, size))
+                continue
+            self.lent_bytes -= size
+            if self.free_bytes + size <= self.max_free:
+                self._free[size].append(base)
+                self.free_bytes += size
+
+    def clear(self) -> None:
+        """Release all buffers that are not lent"""
+        with self._lock:
+            self._free.clear()
+            self.free_bytes = 0
+
+
+def get_buffer_pool() -> BufferPool | None:
+    """Return the buffer pool of this process, or None if
+    ``distributed.comm.buffer-pool.enabled`` is False.
+    """
+    global _pool
+    if not dask.config.get("distributed.comm.buffer-pool.enabled"):
+        return None
+    # Reference counts are only meaningful on CPython
+    if sys.implementation.name != "cpython":
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BufferPool(
+                    min_size=parse_bytes(
+                        dask.config.get("distributed.comm.buffer-pool.min-size")
+                    ),
+                    max_size=parse_bytes(
+                        dask.config.get("distributed.comm.buffer-pool.max-size")
+                    ),
+                    max_free=parse_bytes(
+                        dask.config.get("distributed.comm.buffer-pool.max-free")
+                    ),
+                )
+    return _pool
@@ -15,7 +15,12 @@ from dask.utils import parse_timedelta
 from distributed.comm import registry
 from distributed.comm.addressing import get_address_host, parse_address, resolve_address
 from distributed.metrics import time
-from distributed.protocol.compression import get_compression_settings
+from distributed.protocol.compact import SCHEMA_DIGEST
+from distributed.protocol.compression import (
+    AdaptiveCompression,
+    compressions,
+    get_compression_settings,
+)
 from distributed.protocol.pickle import HIGHEST_PROTOCOL
 from distributed.utils import wait_for
 
@@ -156,13 +161,31 @@ class Comm(ABC):
         """
         if self.same_host:
             compression = None
+            adaptive = False
         else:
             compression = get_compression_settings("distributed.comm.compression")
+            adaptive = dask.config.get("distributed.comm.adaptive-compression.enabled")
 
         return {
             "compression": compression,
+            # Choose compression at runtime, regardless of the peer's settings
+            "adaptive-compression": adaptive,
+            # Compression algorithms this peer is able to decompress, regardless of
+            # the ones it uses to compress. This allows sending pre-compressed frames,
+            # e.g. spilled data, as they are.
+            "decompression": sorted(
+                name
+                for name, comp in compressions.items()
+                if isinstance(name, str) and comp.name == name
+            ),
             "python": tuple(sys.version_info)[:3],
             "pickle-protocol": HIGHEST_PROTOCOL,
+            # Schema of the batched stream messages that may be encoded as tuples
+            "compact-messages": (
+                SCHEMA_DIGEST
+                if dask.config.get("distributed.comm.compact-messages")
+                else None
+            ),
         }
 
     @staticmethod
@@ -199,6 +222,12 @@ class Comm(ABC):
             out["compression"] = local["compression"]
         else:
             out["compression"] = None
+        out["decompression"] = tuple(remote.get("decompression", ()))
+        if local.get("adaptive-compression"):
+            out["compression"] = AdaptiveCompression.from_config(out["decompression"])
+        out["compact-messages"] = local.get("compact-messages") is not None and (
+            local["compact-messages"] == remote.get("compact-messages")
+        )
 
         return out
 
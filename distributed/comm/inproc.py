@@ -8,6 +8,7 @@ import sys
 import threading
 import weakref
 from collections import deque, namedtuple
+from typing import Any
 
 from tornado.concurrent import Future
 from tornado.ioloop import IOLoop
@@ -212,6 +213,10 @@ class InProc(Comm):
     def same_host(self) -> bool:
         return True
 
+    def handshake_info(self) -> dict[str, Any]:
+        # Messages are passed as they are, without being encoded
+        return {**super().handshake_info(), "compact-messages": None}
+
     async def read(self, deserializers="ignored"):
         if self._closed:
             raise CommClosedError()
@@ -0,0 +1,544 @@
+"""Multiplexing of many logical comms over a single comm.
+
+A :class:`MuxConnection` takes over an established stream-based comm (TCP, TLS, or
+Unix domain socket) and carries any number of concurrent :class:`MuxStream` objects,
+which implement the :class:`Comm` interface and can be used anywhere a comm is
+expected, e.g. for RPCs.
+
+Messages are serialized by the stream, and their frames are sent in records of at
+most ``distributed.comm.multiplex.chunk-size`` bytes. The writer takes turns between
+the streams that have data to send, so that a small message waits for at most a
+couple of chunks of a large transfer in progress on another stream. The receiver
+reads every chunk straight into the frame it belongs to, so large messages are
+not copied any more than over a dedicated comm.
+
+Every stream has its own flow control window of
+``distributed.comm.multiplex.window`` bytes: the receiver only grants more while
+someone is reading from the stream, so a stream whose messages are not being
+consumed does not prevent the others from making progress.
+
+Only the side that initiated the underlying comm opens streams; the other side is
+notified of new streams with a callback.
+
+Wire format
+-----------
+Every record starts with a header of kind (1 byte), stream id (4 bytes), and
+length (8 bytes), in network byte order:
+
+- ``MESSAGE``: a new message starts on the stream. It is followed by the sizes of
+  its frames, as ``length`` 8-byte integers. The most significant bit is set for
+  the shards of a buffer after the first one; they are all received into a single
+  buffer, so that they can be merged back without copies.
+- ``DATA``: ``length`` bytes of the message in progress on the stream follow.
+- ``WINDOW``: the peer may send ``length`` more bytes on the stream.
+- ``CLOSE``: the stream was closed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import struct
+from collections import deque
+from collections.abc import Callable, Iterator
+
+from tornado.iostream import IOStream, StreamClosedError
+
+import dask
+from dask.utils import parse_bytes
+
+from distributed.comm.core import Comm, CommClosedError
+from distributed.comm.utils import from_frames, to_frames
+from distributed.protocol.utils import host_array
+from distributed.utils import ensure_memoryview, nbytes
+
+logger = logging.getLogger(__name__)
+
+MESSAGE = 0
+DATA = 1
+WINDOW = 2
+CLOSE = 3
+
+RECORD = struct.Struct("!BIQ")
+_SHARD = 1 << 63
+
+#: Largest read when discarding the data of a stream that was closed on this side
+_DISCARD_SIZE = 2**20
+
+
+def can_multiplex(comm: Comm) -> bool:
+    """Whether a :class:`MuxConnection` can be established over comm"""
+    return isinstance(getattr(comm, "stream", None), IOStream)
+
+
+class MuxStream(Comm):
+    """A logical comm carried by a :class:`MuxConnection`"""
+
+    sid: int
+    _conn: MuxConnection
+    #: Messages received in full, as lists of frames
+    _inbox: deque[list[memoryview]]
+    #: Frames of the message being received, and position of the next byte
+    _incoming: list[memoryview] | None
+    _incoming_index: int
+    _incoming_offset: int
+    #: MESSAGE records, followed by the frames of the message
+    _outbox: deque[bytes | memoryview]
+    #: Number of bytes that can be sent before the peer grants more
+    _send_window: int
+    #: Number of bytes received which have not been granted back to the peer yet
+    _uncredited: int
+    _reading: bool
+    _closed: bool
+    _readable: asyncio.Event
+    _drained: asyncio.Event
+
+    def __init__(self, conn: MuxConnection, sid: int, deserialize: bool = True):
+        super().__init__(deserialize=deserialize)
+        self.sid = sid
+        self._conn = conn
+        self._inbox = deque()
+        self._incoming = None
+        self._incoming_index = 0
+        self._incoming_offset = 0
+        self._outbox = deque()
+        self._send_window = conn.window
+        self._uncredited = 0
+        self._reading = False
+        self._closed = False
+        self._readable = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self.allow_offload = conn.comm.allow_offload
+        self.local_info = conn.comm.local_info
+        self.remote_info = conn.comm.remote_info
+        self.handshake_options = conn.comm.handshake_options
+
+    @property
+    def local_address(self) -> str:
+        return self._conn.comm.local_address
+
+    @property
+    def peer_address(self) -> str:
+        return self._conn.comm.peer_address
+
+    @property
+    def same_host(self) -> bool:
+        return self._conn.comm.same_host
+
+    @property
+    def extra_info(self):
+        return self._conn.comm.extra_info
+
+    def closed(self) -> bool:
+        return self._closed
+
+    async def read(self, deserializers=None):
+        if not self._inbox and self._closed:
+            raise CommClosedError(f"{self!r} is closed")
+        self._reading = True
+        try:
+            self._conn._credit(self)
+            while not self._inbox:
+                self._readable.clear()
+                await self._readable.wait()
+                if not self._inbox and self._closed:
+                    raise CommClosedError(f"{self!r} was closed by the peer")
+        finally:
+            self._reading = False
+        frames = self._inbox.popleft()
+
+        try:
+            return await from_frames(
+                frames,
+                deserialize=self.deserialize,
+                deserializers=deserializers,
+                allow_offload=self.allow_offload,
+            )
+        except EOFError:
+            # Frames possibly garbled or truncated by communication error
+            self.abort()
+            raise CommClosedError("aborted stream on truncated data")
+
+    async def write(self, msg, serializers=None, on_error="message"):
+        if self._closed:
+            raise CommClosedError(f"{self!r} is closed")
+        frames = await to_frames(
+            msg,
+            allow_offload=self.allow_offload,
+            serializers=serializers,
+            on_error=on_error,
+            context={
+                "sender": self.local_info,
+                "recipient": self.remote_info,
+                **self.handshake_options,
+            },
+        )
+        sizes = []
+        previous = None
+        for frame in frames:
+            buffer = frame.obj if isinstance(frame, memoryview) else frame
+            shard = buffer is previous and not isinstance(buffer, bytes)
+            sizes.append(nbytes(frame) | _SHARD if shard else nbytes(frame))
+            previous = buffer
+        if self._closed:
+            raise CommClosedError(f"{self!r} is closed")
+        self._outbox.append(
+            RECORD.pack(MESSAGE, self.sid, len(sizes))
+            + struct.pack(f"!{len(sizes)}Q", *sizes)
+        )
+        self._outbox.extend(
+            ensure_memoryview(frame) for frame in frames if nbytes(frame)
+        )
+        self._drained.clear()
+        self._conn._schedule(self)
+        return sum(map(nbytes, frames))
+
+    async def close(self):
+        if self._closed:
+            return
+        # Flush the messages written so far
+        await self._drained.wait()
+        self._close()
+
+    def abort(self) -> None:
+        self._outbox.clear()
+        self._drained.set()
+        self._close()
+
+    def _close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._readable.set()
+            self._conn._close_stream(self)
+
+    def _on_peer_close(self) -> None:
+        self._closed = True
+        self._outbox.clear()
+        self._drained.set()
+        self._readable.set()
+
+    # Sending
+
+    def _sendable(self) -> bool:
+        return bool(self._outbox) and self._send_window > 0
+
+    def _next_records(self, max_nbytes: int) -> tuple[list[bytes | memoryview], int]:
+        """Pop up to max_nbytes of message data from the outbox, and return it
+        together with the records describing it
+        """
+        buffers: list[bytes | memoryview] = []
+        pieces: list[memoryview] = []
+        total = 0
+        max_nbytes = min(max_nbytes, self._send_window)
+        while self._outbox and total < max_nbytes:
+            frame = self._outbox[0]
+            if isinstance(frame, bytes):
+                if pieces:
+                    break  # Don't start another message in the same DATA record
+                buffers.append(self._outbox.popleft())
+                continue
+            piece = frame[: max_nbytes - total]
+            if piece.nbytes == frame.nbytes:
+                self._outbox.popleft()
+            else:
+                self._outbox[0] = frame[piece.nbytes :]
+            pieces.append(piece)
+            total += piece.nbytes
+
+        buffers.append(RECORD.pack(DATA, self.sid, total))
+        buffers += pieces
+        self._send_window -= total
+        if not self._outbox:
+            self._drained.set()
+        return buffers, total
+
+    # Receiving
+
+    def _start_message(self, sizes: tuple[int, ...]) -> None:
+        if self._incoming is not None:
+            raise ValueError(f"{self!r} received a message before the end of another")
+        # Group the shards of each buffer
+        groups: list[list[int]] = []
+        for size in sizes:
+            if size & _SHARD and groups:
+                groups[-1].append(size & ~_SHARD)
+            else:
+                groups.append([size & ~_SHARD])
+        self._incoming = []
+        for group in groups:
+            buffer = host_array(sum(group))
+            offset = 0
+            for size in group:
+                self._incoming.append(buffer[offset : offset + size])
+                offset += size
+        self._incoming_index = 0
+        self._incoming_offset = 0
+        self._skip_empty_frames()
+
+    def _targets(self, n: int) -> Iterator[memoryview]:
+        """Yield the buffers that the next n bytes of the message in progress must be
+        read into
+        """
+        frames = self._incoming
+        if frames is None:
+            raise ValueError(f"{self!r} received data outside of a message")
+        while n:
+            if self._incoming_index == len(frames):
+                raise ValueError(f"{self!r} received more data than announced")
+            frame = frames[self._incoming_index]
+            start = self._incoming_offset
+            stop = min(frame.nbytes, start + n)
+            n -= stop - start
+            if stop == frame.nbytes:
+                self._incoming_index += 1
+                self._incoming_offset = 0
+                self._skip_empty_frames()
+            else:
+                self._incoming_offset = stop
+            yield frame[start:stop]
+
+    def _received(self, n: int) -> None:
+        self._uncredited += n
+        if self._incoming is not None and self._incoming_index == len(self._incoming):
+            self._inbox.append(self._incoming)
+            self._incoming = None
+            self._readable.set()
+
+    def _skip_empty_frames(self) -> None:
+        assert self._incoming is not None
+        while (
+            self._incoming_index < len(self._incoming)
+            and not self._incoming[self._incoming_index].nbytes
+        ):
+            self._incoming_index += 1
+
+
+class MuxConnection:
+    """Carry any number of :class:`MuxStream` over a comm
+
+    Parameters
+    ----------
+    comm:
+        Established comm, for which :func:`can_multiplex` is True. Nothing else must
+        read from or write to it afterwards.
+    on_stream:
+        Called with every new stream opened by the peer. If omitted, the peer can't
+        open streams.
+    deserialize:
+        Whether the streams deserialize the messages they read
+    """
+
+    comm: Comm
+    streams: dict[int, MuxStream]
+    chunk_size: int
+    window: int
+
+    def __init__(
+        self,
+        comm: Comm,
+        on_stream: Callable[[MuxStream], object] | None = None,
+        deserialize: bool = True,
+    ):
+        if not can_multiplex(comm):
+            raise TypeError(f"Can't multiplex streams over {comm!r}")
+        self.comm = comm
+        self.on_stream = on_stream
+        self.deserialize = deserialize
+        self.streams = {}
+        self.chunk_size = parse_bytes(
+            dask.config.get("distributed.comm.multiplex.chunk-size")
+        )
+        self.window = parse_bytes(dask.config.get("distributed.comm.multiplex.window"))
+        self._sids = itertools.count(1)
+        self._max_peer_sid = 0
+        self._control = bytearray()
+        self._ready: deque[MuxStream] = deque()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._done = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._close_callbacks: list[Callable[[], object]] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"<MuxConnection{' (closed)' if self._closed else ''} "
+            f"{self.comm.local_address} -> {self.comm.peer_address}: "
+            f"{len(self.streams)} streams>"
+        )
+
+    def __len__(self) -> int:
+        return len(self.streams)
+
+    def closed(self) -> bool:
+        return self._closed
+
+    def add_close_callback(self, callback: Callable[[], object]) -> None:
+        self._close_callbacks.append(callback)
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._read_loop()),
+            asyncio.create_task(self._write_loop()),
+        ]
+
+    async def run(self) -> None:
+        """Start, and wait until the underlying comm is closed"""
+        self.start()
+        try:
+            await self._done.wait()
+        finally:
+            self.abort()
+
+    def open_stream(self) -> MuxStream:
+        if self._closed:
+            raise CommClosedError(f"{self!r} is closed")
+        stream = MuxStream(self, next(self._sids), self.deserialize)
+        self.streams[stream.sid] = stream
+        return stream
+
+    def abort(self) -> None:
+        self.comm.abort()
+        self._shutdown()
+
+    def _shutdown(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        for stream in self.streams.values():
+            stream._on_peer_close()
+        self.streams.clear()
+        self._wakeup.set()
+        self._done.set()
+        for callback in self._close_callbacks:
+            callback()
+
+    # Called by the streams
+
+    def _schedule(self, stream: MuxStream) -> None:
+        if stream._sendable() and stream not in self._ready:
+            self._ready.append(stream)
+            self._wakeup.set()
+
+    def _credit(self, stream: MuxStream) -> None:
+        # The peer runs out of window only after this side received half of it, so
+        # there's no need to grant every message back
+        if stream._uncredited >= self.window // 2 and not stream._closed:
+            self._control += RECORD.pack(WINDOW, stream.sid, stream._uncredited)
+            stream._uncredited = 0
+            self._wakeup.set()
+
+    def _close_stream(self, stream: MuxStream) -> None:
+        if self.streams.pop(stream.sid, None) is not None and not self._closed:
+            self._control += RECORD.pack(CLOSE, stream.sid, 0)
+            self._wakeup.set()
+
+    # Background tasks
+
+    async def _write_loop(self) -> None:
+        iostream = self.comm.stream  # type: ignore[attr-defined]
+        # Don't let the transport buffer more than two batches, or a small message
+        # would have to wait for a large transfer after all
+        flushed: asyncio.Future | None = None
+        try:
+            while not self._closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._control or self._ready:
+                    buffers: list[bytes | memoryview] = [bytes(self._control)]
+                    self._control.clear()
+                    budget = self.chunk_size
+                    while self._ready and budget > 0:
+                        stream = self._ready.popleft()
+                        records, sent = stream._next_records(budget)
+                        buffers += records
+                        budget -= sent
+                        if stream._sendable():
+                            self._ready.append(stream)
+                    if flushed is not None:
+                        await flushed
+                    if self._closed:
+                        return
+                    flushed = self._write(iostream, buffers)
+        except (OSError, CommClosedError, StreamClosedError) as e:
+            logger.debug("Lost connection %r while writing: %s", self, e)
+        except Exception:
+            logger.exception("Error in %r", self)
+        finally:
+            self.abort()
+
+    @staticmethod
+    def _write(iostream: IOStream, buffers: list[bytes | memoryview]) -> asyncio.Future:
+        """Write buffers, and return a future that completes when they've all been
+        handed over to the kernel
+        """
+        # Same trick as TCP.write: enqueue everything, so that small buffers are
+        # merged and sent together
+        if iostream._write_buffer is None:
+            raise StreamClosedError()
+        for buf in buffers:
+            if buf:
+                iostream._write_buffer.append(buf)
+                iostream._total_write_index += len(buf)
+        return iostream.write(b"")
+
+    async def _read_loop(self) -> None:
+        iostream = self.comm.stream  # type: ignore[attr-defined]
+        try:
+            while not self._closed:
+                kind, sid, length = RECORD.unpack(
+                    await iostream.read_bytes(RECORD.size)
+                )
+                stream = self.streams.get(sid)
+                if kind == DATA:
+                    if stream is None:  # Closed on this side
+                        await self._discard(iostream, length)
+                        continue
+                    for target in stream._targets(length):
+                        await iostream.read_into(target)  # type: ignore[arg-type]
+                    stream._received(length)
+                    if stream._reading:
+                        self._credit(stream)
+                elif kind == MESSAGE:
+                    sizes = struct.unpack(
+                        f"!{length}Q", await iostream.read_bytes(8 * length)
+                    )
+                    if stream is not None:
+                        stream._start_message(sizes)
+                    elif (stream := self._accept(sid)) is not None:
+                        stream._start_message(sizes)
+                        self.on_stream(stream)  # type: ignore[misc]
+                elif kind == WINDOW:
+                    if stream is not None:
+                        stream._send_window += length
+                        self._schedule(stream)
+                elif kind == CLOSE:
+                    if stream is not None:
+                        del self.streams[sid]
+                        stream._on_peer_close()
+                else:
+                    raise ValueError(f"Unknown record of kind {kind}")
+        except (OSError, CommClosedError, StreamClosedError) as e:
+            logger.debug("Lost connection %r while reading: %s", self, e)
+        except Exception:
+            logger.exception("Error in %r", self)
+        finally:
+            self.abort()
+
+    def _accept(self, sid: int) -> MuxStream | None:
+        """Create a stream opened by the peer, unless it was already closed on this
+        side
+        """
+        if self.on_stream is None or sid <= self._max_peer_sid:
+            return None
+        self._max_peer_sid = sid
+        stream = MuxStream(self, sid, self.deserialize)
+        self.streams[sid] = stream
+        return stream
+
+    @staticmethod
+    async def _discard(iostream: IOStream, n: int) -> None:
+        while n:
+            chunk = await iostream.read_bytes(min(n, _DISCARD_SIZE))
+            n -= len(chunk)
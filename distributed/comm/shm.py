@@ -0,0 +1,310 @@
+"""Shared memory transport for processes on the same host.
+
+Messages are exchanged through a Unix domain socket, like TCP through the loopback
+interface, except that frames larger than ``distributed.comm.shm.min-size`` are
+copied into shared memory segments. The socket only carries their paths; the receiver
+maps the segments into its own address space without further copies, and unlinks
+them.
+
+Segments are files in a directory on a memory-backed filesystem (``/dev/shm`` by
+default). Each process creates them in its own directory of a
+:class:`~distributed.diskutils.WorkSpace`, which is deleted when the process exits,
+or by another process if it crashes.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import ClassVar
+
+import msgpack
+from tornado import gen
+from tornado.ioloop import IOLoop
+from tornado.iostream import IOStream, StreamClosedError
+
+import dask
+from dask.utils import parse_bytes
+
+from distributed.comm.core import CommClosedError
+from distributed.comm.tcp import C_INT_MAX, convert_stream_closed_error, read_bytes_rw
+from distributed.comm.unix import UNIX, UnixBackend, UnixConnector, UnixListener
+from distributed.comm.utils import OFFLOAD_THRESHOLD, from_frames, to_frames
+from distributed.diskutils import WorkDir, WorkSpace
+from distributed.utils import ensure_memoryview, nbytes, offload
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+#: Read the whole segment into the page table at once, instead of page faulting on
+#: every page on first access (Linux only)
+MAP_FLAGS = mmap.MAP_SHARED | getattr(mmap, "MAP_POPULATE", 0)
+#: Seconds after a graceful close() before deleting the segments that the peer has
+#: not read yet
+CLOSE_GRACE_PERIOD = 10
+
+_workspace: WorkSpace | None = None
+_work_dir: WorkDir | None = None
+_counter = itertools.count()
+
+
+def shm_directory() -> str:
+    """Return the directory where shared memory segments and sockets are created"""
+    directory = dask.config.get("distributed.comm.shm.directory")
+    if directory is None:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "dask-shm")
+
+
+def get_workspace() -> WorkSpace:
+    global _workspace
+    if _workspace is None or _workspace.base_dir != os.path.abspath(shm_directory()):
+        _workspace = WorkSpace(shm_directory())
+    return _workspace
+
+
+def get_work_dir() -> str:
+    """Return the directory, private to this process, where to create new shared
+    memory segments and sockets
+    """
+    global _work_dir
+    workspace = get_workspace()
+    if _work_dir is None or not os.path.isdir(_work_dir.dir_path):
+        _work_dir = workspace.new_work_dir(prefix=f"{os.getpid()}-")
+    return _work_dir.dir_path
+
+
+def write_segment(frame: bytes | memoryview) -> str:
+    """Copy frame into a new shared memory segment and return its path"""
+    frame = ensure_memoryview(frame)
+    fd, path = tempfile.mkstemp(prefix=SEGMENT_PREFIX, dir=get_work_dir())
+    try:
+        # Much faster than writing into a mmap, which would page fault on every page
+        offset = 0
+        while offset < frame.nbytes:
+            offset += os.pwrite(fd, frame[offset : offset + C_INT_MAX], offset)
+    except BaseException:
+        os.unlink(path)
+        raise
+    finally:
+        os.close(fd)
+    return path
+
+
+def read_segment(path: str, size: int) -> memoryview:
+    """Map a shared memory segment written by :func:`write_segment`, possibly by
+    another process, and unlink it. The memory is released when the returned
+    memoryview, and all the objects referencing it, are garbage collected.
+    """
+    work_dir, name = os.path.split(path)
+    if (
+        not name.startswith(SEGMENT_PREFIX)
+        or os.path.dirname(work_dir) != get_workspace().base_dir
+    ):
+        raise ValueError(f"Not a shared memory segment: {path!r}")
+
+    fd = os.open(path, os.O_RDWR)
+    try:
+        os.unlink(path)
+        if os.fstat(fd).st_size != size:
+            raise ValueError(f"Expected {size} bytes in {path!r}")
+        return memoryview(mmap.mmap(fd, size, flags=MAP_FLAGS))
+    finally:
+        os.close(fd)
+
+
+def unlink_segments(paths: list[str]) -> None:
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass  # Already received
+
+
+class SHM(UNIX):
+    """
+    An established communication over a Unix domain socket, where large frames are
+    transferred through shared memory.
+    """
+
+    #: Don't split large buffers, or the receiver would need to merge them back with
+    #: a memory copy
+    max_shard_size: ClassVar[int] = sys.maxsize
+    #: Transfer frames of at least this many bytes through shared memory
+    min_segment_size: ClassVar[int] = parse_bytes(
+        dask.config.get("distributed.comm.shm.min-size")
+    )
+    #: Segments written by this comm which may not have been received yet
+    _segments: list[str]
+
+    def __init__(
+        self,
+        stream: IOStream,
+        local_addr: str,
+        peer_addr: str,
+        deserialize: bool = True,
+    ):
+        self._segments = []
+        super().__init__(stream, local_addr, peer_addr, deserialize)
+
+    async def read(self, deserializers=None):
+        stream = self.stream
+        if stream is None:
+            raise CommClosedError()
+
+        try:
+            header_nbytes_bin = await stream.read_bytes(8)
+            (header_nbytes,) = struct.unpack("Q", header_nbytes_bin)
+            header = msgpack.loads(
+                await stream.read_bytes(header_nbytes), use_list=False
+            )
+            # The sizes of the frames sent through the socket, and the paths and
+            # sizes of those sent through shared memory
+            inline_nbytes = sum(entry for entry in header if isinstance(entry, int))
+            inline = memoryview(bytearray())
+            if inline_nbytes:
+                inline = await read_bytes_rw(stream, inline_nbytes)
+
+            frames = []
+            offset = 0
+            for entry in header:
+                if isinstance(entry, int):
+                    frames.append(inline[offset : offset + entry])
+                    offset += entry
+                else:
+                    path, size = entry
+                    frames.append(read_segment(path, size))
+
+        except StreamClosedError as e:
+            self.stream = None
+            self._closed = True
+            # The peer is gone, and won't read the segments we sent it
+            self._abort_segments()
+            convert_stream_closed_error(self, e)
+        except BaseException:
+            # See TCP.read()
+            self.abort()
+            raise
+        else:
+            return await self._from_frames(frames, deserializers)
+
+    async def write(self, msg, serializers=None, on_error="message"):
+        stream = self.stream
+        if stream is None:
+            raise CommClosedError()
+
+        frames = await to_frames(
+            msg,
+            allow_offload=self.allow_offload,
+            serializers=serializers,
+            on_error=on_error,
+            context={
+                "sender": self.local_info,
+                "recipient": self.remote_info,
+                **self.handshake_options,
+            },
+            frame_split_size=self.max_shard_size,
+        )
+        frames_nbytes = [nbytes(frame) for frame in frames]
+        large = [
+            frame
+            for frame, frame_nbytes in zip(frames, frames_nbytes)
+            if frame_nbytes >= self.min_segment_size
+        ]
+        large_nbytes = sum(nb for nb in frames_nbytes if nb >= self.min_segment_size)
+
+        # Forget about the segments that have already been received
+        self._segments = [path for path in self._segments if os.path.exists(path)]
+        if (
+            self.allow_offload
+            and OFFLOAD_THRESHOLD
+            and large_nbytes > OFFLOAD_THRESHOLD
+        ):
+            paths = await offload(list, map(write_segment, large))
+        else:
+            paths = list(map(write_segment, large))
+        self._segments += paths
+
+        header = []
+        inline = []
+        paths_iter = iter(paths)
+        for frame, frame_nbytes in zip(frames, frames_nbytes):
+            if frame_nbytes >= self.min_segment_size:
+                header.append((next(paths_iter), frame_nbytes))
+            else:
+                header.append(frame_nbytes)
+                inline.append(frame)
+        header_bin = msgpack.dumps(header)
+        data = b"".join([struct.pack("Q", len(header_bin)), header_bin, *inline])
+
+        try:
+            stream.write(data)
+        except StreamClosedError as e:
+            self.stream = None
+            self._closed = True
+            self._abort_segments()
+            convert_stream_closed_error(self, e)
+        except BaseException:
+            # See TCP.write()
+            self.abort()
+            raise
+
+        return len(data) + large_nbytes
+
+    async def _from_frames(self, frames, deserializers):
+        try:
+            return await from_frames(
+                frames,
+                deserialize=self.deserialize,
+                deserializers=deserializers,
+                allow_offload=self.allow_offload,
+            )
+        except EOFError:
+            # Frames possibly garbled or truncated by communication error
+            self.abort()
+            raise CommClosedError("aborted stream on truncated data")
+
+    def _abort_segments(self) -> None:
+        # After an abort, the peer may not be able to read the segments anymore
+        segments, self._segments = self._segments, []
+        unlink_segments(segments)
+
+    @gen.coroutine
+    def close(self):
+        yield super().close()
+        # The peer may still read the messages that were written before closing.
+        # Give it some time to map their segments, then delete the ones it didn't.
+        segments, self._segments = self._segments, []
+        segments = [path for path in segments if os.path.exists(path)]
+        if segments:
+            IOLoop.current().call_later(CLOSE_GRACE_PERIOD, unlink_segments, segments)
+
+    def abort(self) -> None:
+        super().abort()
+        self._abort_segments()
+
+
+class SHMConnector(UnixConnector):
+    prefix = "shm://"
+    comm_class = SHM
+
+
+class SHMListener(UnixListener):
+    prefix = "shm://"
+    comm_class = SHM
+
+    def _default_path(self) -> str:
+        return os.path.join(get_work_dir(), f"listener-{next(_counter)}.sock")
+
+
+class SHMBackend(UnixBackend):
+    def get_connector(self):
+        return SHMConnector()
+
+    def get_listener(self, loc, handle_comm, deserialize, **connection_args):
+        return SHMListener(loc, handle_comm, deserialize, **connection_args)
@@ -5,6 +5,7 @@ import ctypes
 import errno
 import functools
 import logging
+import os
 import socket
 import ssl
 import struct
@@ -23,6 +24,7 @@ import dask
 from dask.utils import parse_timedelta
 
 from distributed.comm.addressing import parse_host_port, unparse_host_port
+from distributed.comm.buffer_pool import BufferPool, get_buffer_pool
 from distributed.comm.core import (
     BaseListener,
     Comm,
@@ -37,7 +39,14 @@ from distributed.comm.utils import (
     get_tcp_server_address,
     to_frames,
 )
-from distributed.protocol.utils import host_array, pack_frames_prelude, unpack_frames
+from distributed.metrics import time
+from distributed.protocol.compression import AdaptiveCompression
+from distributed.protocol.utils import (
+    FileBuffer,
+    host_array,
+    pack_frames_prelude,
+    unpack_frames,
+)
 from distributed.system import MEMORY_LIMIT
 from distributed.utils import ensure_ip, ensure_memoryview, get_ip, nbytes
 
@@ -54,6 +63,10 @@ logger = logging.getLogger(__name__)
 C_INT_MAX = 256 ** ctypes.sizeof(ctypes.c_int) // 2 - 1
 MAX_BUFFER_SIZE = MEMORY_LIMIT / 2
 
+# Smallest write, net of the socket send buffer, that measures the bandwidth of a link
+# for adaptive compression
+BANDWIDTH_MIN_NBYTES = 2**20
+
 
 def set_tcp_timeout(comm):
     """
@@ -66,6 +79,8 @@ def set_tcp_timeout(comm):
     timeout = int(parse_timedelta(timeout, default="seconds"))
 
     sock = comm.socket
+    if sock.family not in (socket.AF_INET, socket.AF_INET6):
+        return  # e.g. Unix domain socket
 
     # Default (unsettable) value on Windows
     # https://msdn.microsoft.com/en-us/library/windows/desktop/dd877220(v=vs.85).aspx
@@ -163,6 +178,17 @@ class TCP(Comm):
     max_shard_size: ClassVar[int] = dask.utils.parse_bytes(
         dask.config.get("distributed.comm.shard")
     )
+    #: Send frames backed by a :class:`~distributed.protocol.utils.FileBuffer` (e.g.
+    #: spilled data) with ``os.sendfile()``, without reading them into memory
+    use_sendfile: ClassVar[bool] = hasattr(os, "sendfile")
+    #: Read large uncompressed buffers (e.g. numpy arrays) into buffers of the
+    #: :class:`~distributed.comm.buffer_pool.BufferPool`, if enabled. Set it when the
+    #: messages read from this comm are released shortly after being deserialized;
+    #: otherwise, they may be retained in buffers up to 25% larger than necessary.
+    #: The msgpack header and small frames are always read into pooled buffers.
+    #: Transfers between workers don't set it: their buffers are deserialized
+    #: zero-copy and stay in :attr:`~distributed.worker.Worker.data`.
+    pool_large_frames: bool = False
     stream: IOStream | None
 
     def __init__(
@@ -219,16 +245,19 @@ class TCP(Comm):
 
         fmt = "Q"
         fmt_size = struct.calcsize(fmt)
+        pool = get_buffer_pool()
 
         try:
             # Don't store multiple numpy or parquet buffers into the same buffer, or
             # none will be released until all are released.
             frames_nosplit_nbytes_bin = await stream.read_bytes(fmt_size)
             (frames_nosplit_nbytes,) = struct.unpack(fmt, frames_nosplit_nbytes_bin)
-            frames_nosplit = await read_bytes_rw(stream, frames_nosplit_nbytes)
+            frames_nosplit = await read_bytes_rw(stream, frames_nosplit_nbytes, pool)
             frames, buffers_nbytes = unpack_frames(frames_nosplit, partial=True)
             for buffer_nbytes in buffers_nbytes:
-                buffer = await read_bytes_rw(stream, buffer_nbytes)
+                buffer = await read_bytes_rw(
+                    stream, buffer_nbytes, pool if self.pool_large_frames else None
+                )
                 frames.append(buffer)
 
         except (StreamClosedError, SSLError) as e:
@@ -276,10 +305,26 @@ class TCP(Comm):
         )
         frames, frames_nbytes, frames_nbytes_total = _add_frames_header(frames)
 
+        # Measure the bandwidth of the link for adaptive compression, with writes
+        # that don't wait for previous ones
+        policy = self.handshake_options.get("compression")
+        if not isinstance(policy, AdaptiveCompression) or stream.writing():
+            policy = None
+
         try:
             # trick to enqueue all frames for writing beforehand
             for each_frame_nbytes, each_frame in zip(frames_nbytes, frames):
-                if each_frame_nbytes:
+                # Only frames that span a whole FileBuffer can be sent with sendfile,
+                # as the offset of a slice within its buffer is not known. Frames that
+                # are split by frame_split_size() are sharded into new FileBuffers.
+                if (
+                    self.use_sendfile
+                    and isinstance(each_frame, memoryview)
+                    and isinstance(each_frame.obj, FileBuffer)
+                    and each_frame_nbytes == each_frame.obj.nbytes
+                ):
+                    await _sendfile(stream, each_frame.obj)
+                elif each_frame_nbytes:
                     # Make sure that `len(data) == data.nbytes`
                     # See <https://github.com/tornadoweb/tornado/pull/2996>
                     each_frame = ensure_memoryview(each_frame)
@@ -301,7 +346,9 @@ class TCP(Comm):
                         stream._total_write_index += chunk_nbytes
 
             # start writing frames
-            stream.write(b"")
+            flushed = stream.write(b"")
+            if policy is not None:
+                self._measure_bandwidth(policy, stream, flushed, frames_nbytes_total)
         except StreamClosedError as e:
             self.stream = None
             self._closed = True
@@ -319,6 +366,26 @@ class TCP(Comm):
 
         return frames_nbytes_total
 
+    @staticmethod
+    def _measure_bandwidth(
+        policy: AdaptiveCompression, stream: IOStream, flushed: asyncio.Future, n: int
+    ) -> None:
+        # The write completes when its last bytes are handed over to the kernel, so up
+        # to a socket send buffer's worth of them may still be in flight
+        try:
+            n -= stream.socket.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        except OSError:
+            return
+        if n < BANDWIDTH_MIN_NBYTES:
+            return
+        start = time()
+
+        def done(fut: asyncio.Future) -> None:
+            if not fut.cancelled() and fut.exception() is None:
+                policy.observe_bandwidth(n, time() - start)
+
+        flushed.add_done_callback(done)
+
     @gen.coroutine
     def close(self):
         # We use gen.coroutine here rather than async def to avoid errors like
@@ -353,11 +420,13 @@ class TCP(Comm):
         return self._extra
 
 
-async def read_bytes_rw(stream: IOStream, n: int) -> memoryview:
+async def read_bytes_rw(
+    stream: IOStream, n: int, pool: BufferPool | None = None
+) -> memoryview:
     """Read n bytes from stream. Unlike stream.read_bytes, allow for
-    very large messages and return a writeable buffer.
+    very large messages and return a writeable buffer, optionally from a pool.
     """
-    buf = host_array(n)
+    buf = pool.acquire(n) if pool is not None else host_array(n)
 
     for i, j in sliding_window(
         2,
@@ -370,6 +439,56 @@ async def read_bytes_rw(stream: IOStream, n: int) -> memoryview:
     return buf
 
 
+async def _sendfile(stream: IOStream, buf: FileBuffer) -> None:
+    """Send the section of file described by buf over stream with ``os.sendfile()``,
+    after flushing all data previously enqueued on the stream.
+    """
+    # Flush the frames enqueued so far
+    await stream.write(b"")
+
+    offset = buf.offset
+    end = buf.offset + buf.nbytes
+    while offset < end:
+        if stream.closed():
+            raise StreamClosedError(stream.error)
+        try:
+            sent = os.sendfile(
+                stream.socket.fileno(), buf.fd, offset, min(end - offset, C_INT_MAX)
+            )
+        except BlockingIOError:
+            await _wait_for_writable(stream)
+            continue
+        except OSError as e:
+            raise StreamClosedError(e)
+        if not sent:
+            raise StreamClosedError(EOFError("Unexpected end of file"))
+        offset += sent
+
+
+async def _wait_for_writable(stream: IOStream) -> None:
+    """Wait until the socket of stream can accept more data.
+    Tornado does not listen for write events on an idle stream, so this doesn't
+    interfere with it; however, it also doesn't notify us if the stream is closed in
+    the meantime, hence the polling.
+    """
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    fd = stream.socket.fileno()
+
+    def on_writable() -> None:
+        if not fut.done():
+            fut.set_result(None)
+
+    loop.add_writer(fd, on_writable)
+    try:
+        while not fut.done():
+            if stream.closed():
+                raise StreamClosedError(stream.error)
+            await asyncio.wait([fut], timeout=0.5)
+    finally:
+        loop.remove_writer(fd)
+
+
 def _add_frames_header(
     frames: list[bytes | memoryview],
 ) -> tuple[list[bytes | memoryview], list[int], int]:
@@ -435,6 +554,8 @@ class TLS(TCP):
 
     # Workaround for OpenSSL 1.0.2 (can drop with OpenSSL 1.1.1)
     max_shard_size = min(C_INT_MAX, TCP.max_shard_size)
+    # The payload must go through OpenSSL
+    use_sendfile = False
 
     def _read_extra(self):
         TCP._read_extra(self)
@@ -579,6 +700,21 @@ class TCPConnector(BaseTCPConnector):
     comm_class = TCP
     encrypted = False
 
+    async def connect(self, address, deserialize=True, **connection_args):
+        from distributed.comm import unix
+
+        self._check_encryption(address, connection_args)
+        path = unix.find_tcp_alias(address)
+        if path is not None:
+            try:
+                return await unix.UnixConnector().connect_tcp_alias(
+                    path, self.prefix + address, deserialize
+                )
+            except CommClosedError:
+                # e.g. left behind by a crashed process
+                logger.debug("Can't connect to %r; falling back to TCP", path)
+        return await super().connect(address, deserialize, **connection_args)
+
     def _get_connect_args(self, **connection_args):
         return {}
 
@@ -613,6 +749,7 @@ class BaseTCPListener(BaseListener, RequireEncryptionMixin):
         self.comm_handler = comm_handler
         self.deserialize = deserialize
         self.allow_offload = allow_offload
+        self.handshake_overrides = connection_args.get("handshake_overrides")
         self.server_args = self._get_server_args(**connection_args)
         self.tcp_server = None
         self.bound_address = None
@@ -664,7 +801,7 @@ class BaseTCPListener(BaseListener, RequireEncryptionMixin):
         comm.allow_offload = self.allow_offload
 
         try:
-            await self.on_connection(comm)
+            await self.on_connection(comm, self.handshake_overrides)
         except CommClosedError:
             logger.info("Connection from %s closed before handshake completed", address)
             return
@@ -703,6 +840,34 @@ class TCPListener(BaseTCPListener):
     prefix = "tcp://"
     comm_class = TCP
     encrypted = False
+    #: Listener for the connections from the same host, if enabled
+    unix_listener = None
+
+    async def start(self):
+        from distributed.comm import unix
+
+        await super().start()
+        path = unix.tcp_alias_path(*self.get_host_port())
+        if path is not None:
+            listener = unix.UnixListener(
+                path,
+                self.comm_handler,
+                self.deserialize,
+                self.allow_offload,
+                handshake_overrides=self.handshake_overrides,
+            )
+            try:
+                await listener.start()
+            except OSError as e:
+                logger.warning("Can't listen on %r: %s", path, e)
+            else:
+                self.unix_listener = listener
+
+    def stop(self):
+        listener, self.unix_listener = self.unix_listener, None
+        if listener is not None:
+            listener.stop()
+        super().stop()
 
     def _get_server_args(self, **connection_args):
         return {}
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import dask
+
+from distributed.comm import buffer_pool, connect, listen
+from distributed.comm.buffer_pool import BufferPool, get_buffer_pool, size_class
+from distributed.protocol import to_serialize
+from distributed.utils_test import gen_test
+
+
+@pytest.mark.parametrize(
+    "n,expect",
+    [
+        (1, 1),
+        (7, 7),
+        (8, 8),
+        (9, 10),
+        (1000, 1024),
+        (1024, 1024),
+        (1025, 1280),
+        (100_000, 114_688),
+    ],
+)
+def test_size_class(n, expect):
+    assert size_class(n) == expect
+    assert n <= size_class(n) <= n * 1.25
+
+
+def test_reclaim():
+    pool = BufferPool(min_size=1000, max_size=10**6, max_free=10**7)
+    buf = pool.acquire(2000)
+    assert buf.nbytes == 2000
+    assert pool.misses == 1
+    assert pool.lent_bytes == 2048
+
+    # Still referenced through a slice
+    view = buf[10:20]
+    del buf
+    pool.collect()
+    assert pool.lent_bytes == 2048
+    assert pool.free_bytes == 0
+
+    del view
+    pool.collect()
+    assert pool.lent_bytes == 0
+    assert pool.free_bytes == 2048
+
+    buf = pool.acquire(1900)
+    assert buf.nbytes == 1900
+    assert pool.hits == 1
+    assert pool.free_bytes == 0
+
+
+def test_reclaim_numpy_view():
+    np = pytest.importorskip("numpy")
+    pool = BufferPool(min_size=1000, max_size=10**6, max_free=10**7)
+    x = np.frombuffer(pool.acquire(2000), dtype="u1")
+    x[:] = 1
+    y = pool.acquire(2000)
+    y[:] = b"\x02" * 2000
+    assert pool.misses == 2
+    assert (x == 1).all()
+    del x
+    pool.collect()
+    assert pool.free_bytes == 2048
+    assert pool.lent_bytes == 2048
+
+
+def test_unpooled():
+    pool = BufferPool(min_size=1000, max_size=10_000, max_free=10**7)
+    assert pool.acquire(10).nbytes == 10
+    assert pool.acquire(20_000).nbytes == 20_000
+    assert pool.unpooled == 2
+    assert pool.hits == pool.misses == pool.lent_bytes == 0
+
+
+def test_max_free():
+    pool = BufferPool(min_size=1000, max_size=10**6, max_free=5000)
+    bufs = [pool.acquire(2048) for _ in range(3)]
+    del bufs
+    pool.collect()
+    assert pool.free_bytes == 4096
+    assert pool.lent_bytes == 0
+    pool.clear()
+    assert pool.free_bytes == 0
+
+
+def test_max_lent(monkeypatch):
+    monkeypatch.setattr(buffer_pool, "MAX_LENT", 2)
+    pool = BufferPool(min_size=1000, max_size=10**6, max_free=10**7)
+    bufs = [pool.acquire(2048) for _ in range(3)]
+    assert pool.lent_bytes == 4096
+    del bufs
+    pool.collect()
+    # The first buffer was forgotten
+    assert pool.free_bytes == 4096
+
+
+def test_get_buffer_pool(monkeypatch):
+    monkeypatch.setattr(buffer_pool, "_pool", None)
+    assert get_buffer_pool() is None
+    with dask.config.set(
+        {
+            "distributed.comm.buffer-pool.enabled": True,
+            "distributed.comm.buffer-pool.min-size": "1kiB",
+        }
+    ):
+        pool = get_buffer_pool()
+        assert pool.min_size == 1024
+        assert get_buffer_pool() is pool
+
+
+@pytest.mark.parametrize("pool_large_frames", [False, True])
+@gen_test()
+async def test_tcp_read(monkeypatch, pool_large_frames):
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(buffer_pool, "_pool", None)
+    q = asyncio.Queue()
+
+    async def handle_comm(comm):
+        comm.pool_large_frames = pool_large_frames
+        await q.put(comm)
+
+    with dask.config.set(
+        {
+            "distributed.comm.buffer-pool.enabled": True,
+            "distributed.comm.buffer-pool.min-size": "1kiB",
+        }
+    ):
+        pool = get_buffer_pool()
+        async with listen("tcp://127.0.0.1:0", handle_comm) as listener:
+            comm = await connect(listener.contact_address)
+            serv_comm = await q.get()
+
+            for _ in range(5):
+                await comm.write({"op": "ping", "data": b"x" * 100_000})
+                msg = await serv_comm.read()
+                assert msg["data"] == b"x" * 100_000
+            assert pool.hits >= 4
+
+            # Received numpy arrays which are retained are never overwritten
+            received = []
+            for i in range(5):
+                x = np.full(100_000, i)
+                await comm.write({"op": "data", "x": to_serialize(x)})
+                received.append((await serv_comm.read())["x"])
+            for i, x in enumerate(received):
+                assert (x == i).all()
+
+            hits = pool.hits
+            del received, x
+            await comm.write({"op": "data", "x": to_serialize(np.zeros(100_000))})
+            await serv_comm.read()
+            if pool_large_frames:
+                assert pool.hits > hits
+
+            await comm.close()
+            await serv_comm.close()
@@ -29,6 +29,7 @@ from distributed.compatibility import asyncio_run
 from distributed.config import get_loop_factory
 from distributed.metrics import time
 from distributed.protocol import Serialized, deserialize, serialize, to_serialize
+from distributed.protocol.utils import file_memoryview
 from distributed.protocol.utils_test import get_host_array
 from distributed.utils import get_ip, get_ipv6, get_mp_context, wait_for
 from distributed.utils_test import (
@@ -330,6 +331,47 @@ async def test_tls_specific(tcp, sni):
     assert set(l) == {1234} | set(range(N))
 
 
+@pytest.mark.parametrize("protocol", ["tcp", "tls"])
+@gen_test()
+async def test_file_buffer(tcp, tmp_path, monkeypatch, protocol):
+    """Frames backed by a FileBuffer are sent with os.sendfile() on TCP and through
+    the regular write buffer on TLS
+    """
+    if protocol == "tcp" and not hasattr(os, "sendfile"):
+        pytest.skip("os.sendfile() not available")
+    calls = []
+    if hasattr(os, "sendfile"):
+        sendfile = os.sendfile
+
+        def counting_sendfile(*args):
+            calls.append(args)
+            return sendfile(*args)
+
+        monkeypatch.setattr(os, "sendfile", counting_sendfile)
+
+    # Larger than the socket buffers
+    payload = os.urandom(2**25)
+    fn = tmp_path / "data"
+    fn.write_bytes(b"x" * 1000 + payload)
+    with open(fn, "rb") as fh:
+        mv = file_memoryview(fh.fileno(), 1000, len(payload))
+    header, _ = serialize(memoryview(payload))
+    msg = {"op": "ping", "x": Serialized(header, [mv])}
+
+    get_comm_pair = get_tcp_comm_pair if protocol == "tcp" else get_tls_comm_pair
+    a, b = await get_comm_pair()
+    _, out = await asyncio.gather(a.write(msg), b.read())
+    assert out["op"] == "ping"
+    assert out["x"] == payload
+    assert bool(calls) == (protocol == "tcp")
+
+    # The comm is still usable
+    await a.write({"op": "pong"})
+    assert await b.read() == {"op": "pong"}
+    await a.close()
+    await b.close()
+
+
 @gen_test()
 async def test_comm_failure_threading(tcp):
     """
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
+import pytest
+
+import dask
+
+from distributed.comm import connect, listen
+from distributed.comm.core import CommClosedError
+from distributed.comm.mux import _SHARD, MuxConnection, MuxStream, can_multiplex
+from distributed.protocol import to_serialize
+from distributed.protocol import utils as protocol_utils
+from distributed.utils_test import gen_test
+
+
+@asynccontextmanager
+async def mux_pair(**config):
+    """Yield a client MuxConnection, and a queue of the streams it opens as seen
+    by the server
+    """
+    comms: asyncio.Queue = asyncio.Queue()
+    streams: asyncio.Queue = asyncio.Queue()
+
+    with dask.config.set(
+        {f"distributed.comm.multiplex.{k}": v for k, v in config.items()}
+    ):
+        async with listen("tcp://127.0.0.1:0", comms.put) as listener:
+            comm = await connect(listener.contact_address)
+            server = MuxConnection(await comms.get(), on_stream=streams.put_nowait)
+            client = MuxConnection(comm)
+            server.start()
+            client.start()
+            try:
+                yield client, streams
+            finally:
+                client.abort()
+                server.abort()
+
+
+@gen_test()
+async def test_roundtrip():
+    np = pytest.importorskip("numpy")
+    async with mux_pair() as (conn, streams):
+        comms = [conn.open_stream() for _ in range(5)]
+        for i, comm in enumerate(comms):
+            await comm.write({"i": i, "x": to_serialize(np.arange(i * 1000))})
+
+        for _ in comms:
+            serv_comm = await streams.get()
+            assert isinstance(serv_comm, MuxStream)
+            msg = await serv_comm.read()
+            await serv_comm.write({"i": msg["i"], "sum": int(msg["x"].sum())})
+
+        for i, comm in enumerate(comms):
+            assert await comm.read() == {"i": i, "sum": sum(range(i * 1000))}
+            assert comm.peer_address == conn.comm.peer_address
+        assert len(conn) == 5
+
+
+@gen_test()
+async def test_large_message_in_chunks(monkeypatch):
+    np = pytest.importorskip("numpy")
+    # Split the array into shards, which are received into a single buffer
+    monkeypatch.setattr(protocol_utils, "BIG_BYTES_SHARD_SIZE", 100_000)
+    async with mux_pair(**{"chunk-size": "64kiB", "window": "256kiB"}) as (
+        conn,
+        streams,
+    ):
+        comm = conn.open_stream()
+        x = np.random.random(1_000_000)
+        await comm.write({"x": to_serialize(x), "b": b"1" * 300_000})
+        serv_comm = await streams.get()
+        msg = await serv_comm.read()
+        assert (msg["x"] == x).all()
+        assert msg["b"] == b"1" * 300_000
+
+
+def test_shards_share_buffer():
+    conn = MuxConnection.__new__(MuxConnection)
+    conn.window = 0
+    conn.comm = type(
+        "DummyComm",
+        (),
+        {
+            "allow_offload": False,
+            "local_info": {},
+            "remote_info": {},
+            "handshake_options": {},
+        },
+    )()
+    stream = MuxStream(conn, 1)
+    stream._start_message((10, 5, 7 | _SHARD, 0, 3 | _SHARD))
+    frames = stream._incoming
+    assert [frame.nbytes for frame in frames] == [10, 5, 7, 0, 3]
+    assert frames[1].obj is frames[2].obj
+    assert frames[0].obj is not frames[1].obj
+    assert frames[3].obj is frames[4].obj
+
+    targets = list(stream._targets(25))
+    assert [target.nbytes for target in targets] == [10, 5, 7, 3]
+    stream._received(25)
+    assert stream._inbox
+    assert stream._incoming is None
+
+
+@gen_test()
+async def test_small_messages_overtake_large_transfer():
+    async with mux_pair(**{"chunk-size": "64kiB", "window": "1GiB"}) as (
+        conn,
+        streams,
+    ):
+        big = conn.open_stream()
+        small = conn.open_stream()
+        await big.write(b"0" * 50_000_000)
+        await small.write(b"1")
+
+        received = []
+
+        async def read(comm):
+            msg = await comm.read()
+            received.append(len(msg))
+
+        await asyncio.gather(
+            read(await streams.get()),
+            read(await streams.get()),
+        )
+        assert received == [1, 50_000_000]
+
+
+@gen_test()
+async def test_flow_control():
+    async with mux_pair(**{"chunk-size": "64kiB", "window": "256kiB"}) as (
+        conn,
+        streams,
+    ):
+        stalled = conn.open_stream()
+        for _ in range(3):
+            await stalled.write(b"0" * 200_000)
+        serv_stalled = await streams.get()
+
+        # The server isn't reading from the first stream; the others are unaffected
+        comm = conn.open_stream()
+        for _ in range(10):
+            await comm.write(b"1" * 100_000)
+        serv_comm = await streams.get()
+        for _ in range(10):
+            assert await serv_comm.read() == b"1" * 100_000
+
+        assert stalled._send_window <= 0
+        assert stalled._outbox
+
+        for _ in range(3):
+            assert await serv_stalled.read() == b"0" * 200_000
+        await stalled.close()
+
+
+@gen_test()
+async def test_close_stream():
+    async with mux_pair() as (conn, streams):
+        comm = conn.open_stream()
+        await comm.write("hello")
+        serv_comm = await streams.get()
+        assert await serv_comm.read() == "hello"
+        await comm.close()
+        assert comm.closed()
+        with pytest.raises(CommClosedError):
+            await serv_comm.read()
+        with pytest.raises(CommClosedError):
+            await comm.read()
+
+        # Data sent to a stream closed on the other side is discarded
+        comm = conn.open_stream()
+        await comm.write("hello")
+        serv_comm = await streams.get()
+        serv_comm.abort()
+        with contextlib.suppress(CommClosedError):
+            await comm.write(b"0" * 1_000_000)
+        comm2 = conn.open_stream()
+        await comm2.write("ping")
+        assert await (await streams.get()).read() == "ping"
+        assert not conn.closed()
+
+
+@gen_test()
+async def test_abort_connection():
+    async with mux_pair() as (conn, streams):
+        comms = [conn.open_stream() for _ in range(3)]
+        for comm in comms:
+            await comm.write("hello")
+        serv_comms = [await streams.get() for _ in comms]
+
+        conn.comm.abort()
+        for serv_comm in serv_comms:
+            assert await serv_comm.read() == "hello"
+            with pytest.raises(CommClosedError):
+                await serv_comm.read()
+        for comm in comms:
+            with pytest.raises(CommClosedError):
+                await comm.read()
+        assert conn.closed()
+        with pytest.raises(CommClosedError):
+            conn.open_stream()
+
+
+@gen_test()
+async def test_can_multiplex():
+    async def handle_comm(comm):
+        await comm.close()
+
+    async with listen("inproc://", handle_comm) as listener:
+        comm = await connect(listener.contact_address)
+        assert not can_multiplex(comm)
+        with pytest.raises(TypeError):
+            MuxConnection(comm)
+        await comm.close()
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import glob
+import mmap
+import os
+
+import pytest
+
+from distributed import Client, Scheduler, Worker
+from distributed.comm import CommClosedError, connect, listen, shm
+from distributed.comm.registry import backends, get_backend
+from distributed.comm.tests.test_comms import check_client_server
+from distributed.protocol import to_serialize
+from distributed.utils_test import gen_test, inc
+
+pytestmark = pytest.mark.skipif(
+    "shm" not in backends, reason="Requires Unix domain sockets"
+)
+
+
+def test_registered():
+    backend = get_backend("shm")
+    assert isinstance(backend, shm.SHMBackend)
+
+
+def shm_check():
+    def checker(loc):
+        assert loc.startswith(shm.get_workspace().base_dir)
+        assert loc.endswith(".sock")
+
+    return checker
+
+
+def segments():
+    return glob.glob(os.path.join(shm.get_work_dir(), shm.SEGMENT_PREFIX + "*"))
+
+
+@gen_test()
+async def test_client_server():
+    await check_client_server("shm://", shm_check())
+
+
+@gen_test()
+async def test_large_frames():
+    np = pytest.importorskip("numpy")
+    q = asyncio.Queue()
+
+    async def handle_comm(comm):
+        await q.put(comm)
+
+    async with listen("shm://", handle_comm) as listener:
+        comm = await connect(listener.contact_address)
+        serv_comm = await q.get()
+
+        x = np.arange(1_000_000)
+        small = np.arange(10)
+        nbytes = await comm.write({"x": to_serialize(x), "small": to_serialize(small)})
+        assert nbytes > x.nbytes
+        assert len(segments()) == 1
+
+        msg = await serv_comm.read()
+        np.testing.assert_array_equal(msg["x"], x)
+        np.testing.assert_array_equal(msg["small"], small)
+        assert msg["x"].flags.writeable
+        # The receiver maps the segment without copying it
+        base = msg["x"]
+        while not isinstance(base, mmap.mmap):
+            base = base.obj if isinstance(base, memoryview) else base.base
+        # The receiver unlinks the segment
+        assert not segments()
+
+        await comm.close()
+        await serv_comm.close()
+
+
+@gen_test()
+async def test_abort_unlinks_segments():
+    np = pytest.importorskip("numpy")
+    q = asyncio.Queue()
+
+    async def handle_comm(comm):
+        await q.put(comm)
+
+    async with listen("shm://", handle_comm) as listener:
+        comm = await connect(listener.contact_address)
+        serv_comm = await q.get()
+        await comm.write(to_serialize(np.arange(1_000_000)))
+        assert len(segments()) == 1
+        comm.abort()
+        assert not segments()
+        serv_comm.abort()
+
+
+@gen_test()
+async def test_peer_closed_unlinks_segments():
+    """Segments are deleted when the peer closes the comm without reading them"""
+    np = pytest.importorskip("numpy")
+    q = asyncio.Queue()
+
+    async def handle_comm(comm):
+        await q.put(comm)
+
+    async with listen("shm://", handle_comm) as listener:
+        comm = await connect(listener.contact_address)
+        serv_comm = await q.get()
+        await comm.write(to_serialize(np.arange(1_000_000)))
+        assert len(segments()) == 1
+        await serv_comm.close()
+        with pytest.raises(CommClosedError):
+            await comm.read()
+        assert not segments()
+
+
+@gen_test()
+async def test_close_unlinks_unread_segments(monkeypatch):
+    """After a graceful close(), the peer can still read the segments for a while;
+    those it doesn't read are deleted afterwards
+    """
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(shm, "CLOSE_GRACE_PERIOD", 0.2)
+    q = asyncio.Queue()
+
+    async def handle_comm(comm):
+        await q.put(comm)
+
+    async with listen("shm://", handle_comm) as listener:
+        comm = await connect(listener.contact_address)
+        serv_comm = await q.get()
+        x = np.arange(1_000_000)
+        await comm.write(to_serialize(x))
+        await comm.close()
+        np.testing.assert_array_equal(await serv_comm.read(), x)
+        assert not segments()
+        await serv_comm.close()
+
+        comm = await connect(listener.contact_address)
+        serv_comm = await q.get()
+        await comm.write(to_serialize(x))
+        await comm.close()
+        assert len(segments()) == 1
+        await asyncio.sleep(0.4)
+        assert not segments()
+        serv_comm.abort()
+
+
+def test_read_segment_outside_workspace(tmp_path):
+    path = tmp_path / f"{shm.SEGMENT_PREFIX}foo"
+    path.write_bytes(b"123")
+    with pytest.raises(ValueError, match="Not a shared memory segment"):
+        shm.read_segment(str(path), 3)
+    assert path.exists()
+
+
+def test_write_read_segment():
+    path = shm.write_segment(b"0123456789")
+    buf = shm.read_segment(path, 10)
+    assert bytes(buf) == b"0123456789"
+    assert not os.path.exists(path)
+
+
+@gen_test()
+async def test_cluster():
+    np = pytest.importorskip("numpy")
+
+    async with Scheduler(protocol="shm", dashboard_address=":0") as s:
+        assert s.address.startswith("shm://")
+        async with (
+            Worker(s.address) as a,
+            Worker(s.address) as b,
+            Client(s.address, asynchronous=True) as c,
+        ):
+            assert a.address.startswith("shm://")
+            x = c.submit(np.ones, 1_000_000, workers=[a.address])
+            y = c.submit(np.sum, x, workers=[b.address])
+            assert await y == 1_000_000
+            assert await c.submit(inc, 1) == 2
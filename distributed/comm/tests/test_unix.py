@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+
+import pytest
+
+import dask
+
+from distributed import Client, Nanny, Scheduler
+from distributed.comm import connect, listen, unix
+from distributed.comm.registry import backends, get_backend
+from distributed.comm.tests.test_comms import check_client_server
+from distributed.metrics import time
+from distributed.utils_test import gen_test, inc
+
+pytestmark = pytest.mark.skipif(
+    "unix" not in backends, reason="Requires Unix domain sockets"
+)
+
+
+def test_registered():
+    backend = get_backend("unix")
+    assert isinstance(backend, unix.UnixBackend)
+
+
+def unix_check():
+    def checker(loc):
+        assert os.path.dirname(loc) == unix.socket_directory()
+        assert loc.endswith(".sock")
+
+    return checker
+
+
+@gen_test()
+async def test_client_server():
+    await check_client_server("unix://", unix_check())
+
+
+@gen_test()
+async def test_client_server_explicit_path(tmp_path):
+    path = str(tmp_path / "test.sock")
+    await check_client_server(f"unix://{path}", lambda loc: loc == path)
+    assert not os.path.exists(path)
+
+
+def test_socket_directory(tmp_path):
+    with dask.config.set({"distributed.comm.unix.directory": str(tmp_path)}):
+        path = unix.socket_directory()
+        assert path == str(tmp_path / f"dask-unix-{os.getuid()}")
+        assert os.stat(path).st_mode & 0o777 == 0o700
+
+        # Other users could create sockets in it
+        os.chmod(path, 0o770)
+        assert unix.socket_directory() is None
+
+
+@gen_test()
+async def test_local_tcp():
+    q = asyncio.Queue()
+
+    async def handle_comm(comm):
+        await q.put(comm)
+
+    with dask.config.set({"distributed.comm.unix.local-tcp": True}):
+        async with listen("tcp://127.0.0.1:0", handle_comm) as listener:
+            path = listener.unix_listener.path
+            assert os.path.exists(path)
+            assert unix.find_tcp_alias(listener.contact_address[6:]) == path
+
+            comm = await connect(listener.contact_address)
+            serv_comm = await q.get()
+            assert isinstance(comm, unix.UNIX)
+            assert isinstance(serv_comm, unix.UNIX)
+            # The peer still has its TCP address
+            assert comm.peer_address == listener.contact_address
+
+            await comm.write({"op": "ping"})
+            assert await serv_comm.read() == {"op": "ping"}
+            await comm.close()
+            await serv_comm.close()
+
+        assert not os.path.exists(path)
+
+
+@gen_test()
+async def test_local_tcp_wildcard():
+    q = asyncio.Queue()
+
+    async def handle_comm(comm):
+        await q.put(comm)
+
+    with dask.config.set({"distributed.comm.unix.local-tcp": True}):
+        async with listen("tcp://0.0.0.0:0", handle_comm) as listener:
+            port = listener.get_host_port()[1]
+            comm = await connect(f"tcp://127.0.0.1:{port}")
+            assert isinstance(comm, unix.UNIX)
+            assert comm.peer_address == f"tcp://127.0.0.1:{port}"
+            serv_comm = await q.get()
+            await comm.close()
+            await serv_comm.close()
+
+
+@gen_test()
+async def test_local_tcp_disabled():
+    async def handle_comm(comm):
+        await comm.close()
+
+    async with listen("tcp://127.0.0.1:0", handle_comm) as listener:
+        assert listener.unix_listener is None
+        with dask.config.set({"distributed.comm.unix.local-tcp": True}):
+            comm = await connect(listener.contact_address)
+        assert not isinstance(comm, unix.UNIX)
+        await comm.close()
+
+
+@gen_test()
+async def test_local_tcp_stale_socket():
+    """A socket left behind by a crashed process is ignored"""
+
+    async def handle_comm(comm):
+        await comm.close()
+
+    async with listen("tcp://127.0.0.1:0", handle_comm) as listener:
+        with dask.config.set({"distributed.comm.unix.local-tcp": True}):
+            path = unix.tcp_alias_path(*listener.get_host_port())
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(path)
+            sock.close()
+            try:
+                assert unix.find_tcp_alias(listener.contact_address[6:]) == path
+                comm = await connect(listener.contact_address)
+                assert not isinstance(comm, unix.UNIX)
+                await comm.close()
+            finally:
+                os.unlink(path)
+
+
+@gen_test()
+async def test_local_tcp_cluster():
+    with dask.config.set({"distributed.comm.unix.local-tcp": True}):
+        async with Scheduler(dashboard_address=":0") as s:
+            assert s.address.startswith("tcp://")
+            async with (
+                Nanny(s.address) as a,
+                Nanny(s.address) as b,
+                Client(s.address, asynchronous=True) as c,
+            ):
+                assert a.worker_address.startswith("tcp://")
+                x = c.submit(inc, 1, workers=[a.worker_address])
+                y = c.submit(inc, x, workers=[b.worker_address])
+                assert await y == 3
+                comms = [
+                    comm for comm in s.stream_comms.values() if comm.comm is not None
+                ]
+                assert comms
+                assert all(isinstance(bc.comm, unix.UNIX) for bc in comms)
+
+
+async def _roundtrip_latency(address: str, n: int) -> float:
+    async def handle_comm(comm):
+        while True:
+            msg = await comm.read()
+            if msg is None:
+                break
+            await comm.write(msg)
+        await comm.close()
+
+    async with listen(address, handle_comm) as listener:
+        comm = await connect(listener.contact_address)
+        msg = {"op": "ping", "key": "x"}
+        for _ in range(100):  # warm up
+            await comm.write(msg)
+            await comm.read()
+        start = time()
+        for _ in range(n):
+            await comm.write(msg)
+            await comm.read()
+        elapsed = time() - start
+        await comm.write(None)
+        await comm.close()
+    return elapsed / n
+
+
+@pytest.mark.slow
+@gen_test(timeout=120)
+async def test_small_message_latency():
+    """Compare the round-trip latency of small messages between tcp, unix, and
+    inproc comms. Run with ``-s`` to see the results.
+    """
+    n = 5000
+    latencies = {
+        "tcp": await _roundtrip_latency("tcp://127.0.0.1:0", n),
+        "unix": await _roundtrip_latency("unix://", n),
+        "inproc": await _roundtrip_latency("inproc://", n),
+    }
+    for name, latency in latencies.items():
+        print(f"{name:>8}: {latency * 1e6:.1f} us round trip")
+    assert latencies["unix"] < latencies["tcp"] * 1.5
@@ -0,0 +1,257 @@
+"""Unix domain socket transport for processes on the same host.
+
+Besides the explicit ``unix://`` protocol, TCP listeners also listen on a Unix domain
+socket when ``distributed.comm.unix.local-tcp`` is enabled, and TCP connectors to an
+address of the same host transparently use it instead of the loopback interface.
+The sockets are created in a directory only accessible by the current user, so the
+addresses of the cluster, and the security model of plain TCP, are unchanged.
+"""
+
+from __future__ import annotations
+
+import functools
+import ipaddress
+import itertools
+import logging
+import os
+import socket
+import stat
+import tempfile
+
+import psutil
+from tornado import netutil
+from tornado.iostream import IOStream, StreamClosedError
+from tornado.tcpserver import TCPServer
+
+import dask
+
+from distributed.comm.addressing import parse_host_port
+from distributed.comm.core import BaseListener, CommClosedError, Connector
+from distributed.comm.registry import Backend
+from distributed.comm.tcp import MAX_BUFFER_SIZE, TCP, convert_stream_closed_error
+from distributed.utils import get_ip
+
+logger = logging.getLogger(__name__)
+
+#: Linux limit for the length of a socket path, including the trailing NUL
+MAX_PATH_LENGTH = 107
+
+_counter = itertools.count()
+
+
+def socket_directory() -> str | None:
+    """Return the directory where Unix domain sockets are created, or None if it
+    can't be used safely.
+
+    The directory is private to the current user: other users could otherwise
+    intercept connections by creating sockets in it.
+    """
+    directory = dask.config.get("distributed.comm.unix.directory")
+    if directory is None:
+        directory = tempfile.gettempdir()
+    path = os.path.join(directory, f"dask-unix-{os.getuid()}")
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+    except OSError as e:
+        logger.debug("Can't create socket directory %r: %s", path, e)
+        return None
+    if (
+        not stat.S_ISDIR(st.st_mode)
+        or st.st_uid != os.getuid()
+        or st.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+    ):
+        logger.warning(
+            "Not using Unix domain sockets in %r, as it is not a directory private "
+            "to the current user",
+            path,
+        )
+        return None
+    return path
+
+
+def _socket_path(name: str) -> str | None:
+    directory = socket_directory()
+    if directory is None:
+        return None
+    # Different containers may share the same temporary directory, but not the same
+    # network namespace
+    path = os.path.join(directory, f"{socket.gethostname()}-{name}.sock")
+    if len(path) > MAX_PATH_LENGTH:
+        logger.debug("Socket path %r is too long", path)
+        return None
+    return path
+
+
+@functools.lru_cache
+def _local_ips() -> frozenset[str]:
+    ips = {"127.0.0.1", "::1"}
+    for addrs in psutil.net_if_addrs().values():
+        for addr in addrs:
+            if addr.family in (socket.AF_INET, socket.AF_INET6):
+                ips.add(addr.address.split("%")[0])
+    return frozenset(ips)
+
+
+def _alias_name(host: str, port: int) -> str:
+    return f"{host}-{port}"
+
+
+def tcp_alias_path(host: str, port: int) -> str | None:
+    """Return the path of the Unix domain socket to create for a TCP listener bound
+    to host and port, or None if TCP connections should not be aliased.
+    """
+    if not dask.config.get("distributed.comm.unix.local-tcp"):
+        return None
+    if host in ("", "0.0.0.0", "::"):
+        host = "*"
+    return _socket_path(_alias_name(host, port))
+
+
+def find_tcp_alias(address: str) -> str | None:
+    """Return the path of the Unix domain socket of a TCP listener of this host
+    listening on ``address`` (``host:port``), if there is one.
+    """
+    if not dask.config.get("distributed.comm.unix.local-tcp"):
+        return None
+    host, port = parse_host_port(address)
+    if host == "localhost":
+        host = "127.0.0.1"
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        return None  # Not worth resolving hostnames
+    if not ip.is_loopback and host not in _local_ips():
+        return None
+    for name in (_alias_name(host, port), _alias_name("*", port)):
+        path = _socket_path(name)
+        if path is not None and os.path.exists(path):
+            return path
+    return None
+
+
+class UNIX(TCP):
+    """
+    An established communication over a Unix domain socket.
+    """
+
+
+class UnixConnector(Connector):
+    prefix = "unix://"
+    comm_class = UNIX
+
+    async def connect(self, address, deserialize=True, **connection_args):
+        stream = await self._connect_stream(address)
+        local_address = f"{self.prefix}{address}-client-{os.getpid()}-{next(_counter)}"
+        return self.comm_class(
+            stream, local_address, self.prefix + address, deserialize
+        )
+
+    async def connect_tcp_alias(self, path, tcp_address, deserialize=True):
+        """Connect to the Unix domain socket of a TCP listener, and return a comm
+        which reports its TCP address as peer address.
+        """
+        stream = await self._connect_stream(path)
+        local_address = f"{self.prefix}{path}-client-{os.getpid()}-{next(_counter)}"
+        return self.comm_class(stream, local_address, tcp_address, deserialize)
+
+    async def _connect_stream(self, path):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stream = IOStream(sock, max_buffer_size=MAX_BUFFER_SIZE)
+        try:
+            await stream.connect(path)
+        except StreamClosedError as e:
+            convert_stream_closed_error(self, e)
+        return stream
+
+
+class UnixListener(BaseListener):
+    prefix = "unix://"
+    comm_class = UNIX
+
+    def __init__(
+        self,
+        address,
+        comm_handler,
+        deserialize=True,
+        allow_offload=True,
+        **connection_args,
+    ):
+        super().__init__()
+        self.path = address
+        self.comm_handler = comm_handler
+        self.deserialize = deserialize
+        self.allow_offload = allow_offload
+        self.handshake_overrides = connection_args.get("handshake_overrides")
+        self.server = None
+        self._n_accepted = itertools.count()
+
+    def _default_path(self) -> str:
+        path = _socket_path(f"{os.getpid()}-{next(_counter)}")
+        if path is None:
+            raise OSError("No private directory available for Unix domain sockets")
+        return path
+
+    async def start(self):
+        if not self.path:
+            self.path = self._default_path()
+        backlog = int(dask.config.get("distributed.comm.socket-backlog"))
+        sock = netutil.bind_unix_socket(self.path, mode=0o600, backlog=backlog)
+        self.server = TCPServer(max_buffer_size=MAX_BUFFER_SIZE)
+        self.server.handle_stream = self._handle_stream
+        self.server.add_socket(sock)
+
+    def stop(self):
+        server, self.server = self.server, None
+        if server is not None:
+            server.stop()
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    async def _handle_stream(self, stream, address):
+        # Connecting Unix sockets are normally unnamed
+        address = f"{self.listen_address}-client-{next(self._n_accepted)}"
+        logger.debug("Incoming connection from %r to %r", address, self.listen_address)
+        comm = self.comm_class(stream, self.listen_address, address, self.deserialize)
+        comm.allow_offload = self.allow_offload
+
+        try:
+            await self.on_connection(comm, self.handshake_overrides)
+        except CommClosedError:
+            logger.info("Connection from %s closed before handshake completed", address)
+            return
+
+        await self.comm_handler(comm)
+
+    @property
+    def listen_address(self):
+        return self.prefix + self.path
+
+    @property
+    def contact_address(self):
+        return self.listen_address
+
+
+class UnixBackend(Backend):
+    # I/O
+
+    def get_connector(self):
+        return UnixConnector()
+
+    def get_listener(self, loc, handle_comm, deserialize, **connection_args):
+        return UnixListener(loc, handle_comm, deserialize, **connection_args)
+
+    # Address handling
+
+    def get_address_host(self, loc):
+        # Unix sockets can only be reached from the same host
+        return get_ip()
+
+    def resolve_address(self, loc):
+        return loc
+
+    def get_local_address_for(self, loc):
+        # Listen on a new socket
+        return ""
@@ -84,7 +84,9 @@ class WSHandler(WebSocketHandler):
 
     async def on_open(self):
         try:
-            await self.listener.on_connection(self.comm)
+            await self.listener.on_connection(
+                self.comm, self.listener.connection_args.get("handshake_overrides")
+            )
         except CommClosedError:
             logger.debug("Connection closed before handshake completed")
         await self.handler(self.comm)
@@ -22,7 +22,7 @@ from collections.abc import (
     Hashable,
 )
 from enum import Enum
-from functools import wraps
+from functools import partial, wraps
 from typing import TYPE_CHECKING, Any, ClassVar, Literal, TypedDict, TypeVar, final
 
 import tblib
@@ -44,9 +44,14 @@ from distributed.comm import (
     unparse_host_port,
 )
 from distributed.comm.core import Listener
+from distributed.comm.mux import MuxConnection, MuxStream, can_multiplex
 from distributed.counter import Counter
 from distributed.diskutils import WorkDir, WorkSpace
 from distributed.metrics import context_meter, time
+from distributed.protocol.cache import SerializationCache
+from distributed.protocol.compact import decode_messages
+from distributed.protocol.serialize import Serialize
+from distributed.sizeof import safe_sizeof
 from distributed.system_monitor import SystemMonitor
 from distributed.utils import (
     NoOpAwaitable,
@@ -268,6 +273,8 @@ class Server:
             "echo": self.echo,
             "connection_stream": self.handle_stream,
             "dump_state": self._to_dict,
+            "multiplex": self.handle_multiplex,
+            "tree-broadcast": self.tree_broadcast,
         }
         self.handlers.update(handlers)
         if blocked_handlers is None:
@@ -676,6 +683,84 @@ class Server:
     def echo(self, data=None):
         return data
 
+    async def handle_multiplex(self, comm: Comm) -> Status | str:
+        """Carry concurrent logical streams, opened by the peer, over this comm.
+        Each stream is handled as if it were a new incoming comm.
+
+        See Also
+        --------
+        distributed.comm.mux
+        ConnectionPool
+        """
+        if not can_multiplex(comm):
+            return f"Can't multiplex over {type(comm).__name__}"
+        await comm.write("OK")
+        conn = MuxConnection(
+            comm, on_stream=self.handle_comm, deserialize=self.deserialize
+        )
+        await conn.run()
+        return Status.dont_reply
+
+    async def tree_broadcast(
+        self,
+        comm: Comm,
+        msg: dict,
+        address: str,
+        children: list[str],
+        fanout: int,
+    ) -> dict[str, dict]:
+        """Handle ``msg`` as if it had been received directly, and forward it to
+        ``children``, through a tree rooted here.
+
+        Parameters
+        ----------
+        msg
+            The message broadcast, e.g. ``{"op": "run", ...}``
+        address
+            Address under which the sender knows this server
+        children
+            Addresses of the rest of the subtree
+        fanout
+            Number of peers that every node of the tree forwards to
+
+        Returns
+        -------
+        ``{"results": {address: reply}, "errors": {address: error message}}``, for
+        this server and all of its children
+
+        See also
+        --------
+        broadcast_tree
+        """
+        forward = asyncio.create_task(
+            broadcast_tree(self.rpc, msg, list(children), fanout=fanout)
+        )
+        results: dict[str, Any] = {}
+        errors: dict[str, dict[str, Any]] = {}
+        try:
+            kwargs = dict(msg)
+            op = kwargs.pop("op")
+            if op in self.blocked_handlers or op == "tree-broadcast":
+                raise ValueError(
+                    f"The {op!r} handler can't be broadcast to {type(self).__name__}"
+                )
+            handler = self.handlers[op]
+            if _expects_comm(handler):
+                result = handler(comm, **kwargs)
+            else:
+                result = handler(**kwargs)
+            if inspect.iscoroutine(result):
+                result = await result
+            results[address] = result
+        except Exception as e:
+            logger.exception("Exception while handling broadcast %s", msg.get("op"))
+            errors[address] = _broadcast_error_message(e)
+
+        child_results, child_errors = await forward
+        results.update(child_results)
+        errors.update(child_errors)
+        return {"results": results, "errors": errors}
+
     async def listen(self, port_or_addr=None, allow_offload=True, **kwargs):
         if port_or_addr is None:
             port_or_addr = self.default_port
@@ -861,6 +946,8 @@ class Server:
                     break
                 if not isinstance(msgs, (tuple, list)):
                     msgs = (msgs,)
+                elif comm.handshake_options.get("compact-messages"):
+                    msgs = decode_messages(msgs)
 
                 for msg in msgs:
                     if msg == "OK":
@@ -1300,6 +1387,18 @@ class ConnectionPool:
         self._pending_count = 0
         self._connecting_count = 0
         self._connecting_close_timeout = 5
+        # Shared comms carrying logical streams, see distributed.comm.mux
+        self.multiplex = dask.config.get("distributed.comm.multiplex.enabled")
+        self.multiplex_connections = dask.config.get(
+            "distributed.comm.multiplex.connections"
+        )
+        self._multiplexed: defaultdict[str, list[MuxConnection]] = defaultdict(list)
+        self._multiplexing: dict[str, asyncio.Task[MuxConnection | None]] = {}
+        # Logical streams that are not in use, ready for the next RPC
+        self._idle_streams: defaultdict[str, list[MuxStream]] = defaultdict(list)
+        self._max_idle_streams = 32
+        # Peers that don't support multiplexing
+        self._not_multiplexed: set[str] = set()
         self.status = Status.init
 
     def _validate(self) -> None:
@@ -1388,9 +1487,98 @@ class ConnectionPool:
     async def connect(self, addr: str, timeout: float | None = None) -> Comm:
         """
         Get a Comm to the given address.  For internal use.
+
+        If ``distributed.comm.multiplex.enabled`` is True, this is a logical stream
+        over a comm shared with other concurrent calls to the same address.
         """
         if self.status != Status.running:
             raise RuntimeError("ConnectionPool is closed")
+        if (
+            self.multiplex
+            and addr not in self._not_multiplexed
+            and not addr.startswith("inproc://")
+        ):
+            comm = await self._connect_multiplexed(addr, timeout)
+            if comm is not None:
+                return comm
+        return await self._connect_comm(addr, timeout)
+
+    async def _connect_multiplexed(
+        self, addr: str, timeout: float | None = None
+    ) -> Comm | None:
+        """Open a logical stream to the given address, or return None if the peer
+        doesn't support multiplexing
+        """
+        idle = self._idle_streams[addr]
+        while idle:
+            comm = idle.pop()
+            if not comm.closed():
+                return comm
+
+        conns = self._multiplexed[addr]
+        if len(conns) < self.multiplex_connections and addr not in self._multiplexing:
+            task = asyncio.create_task(self._multiplex(addr, timeout))
+            self._multiplexing[addr] = task
+            task.add_done_callback(partial(self._multiplex_done, addr))
+
+        if conns:
+            conn = min(conns, key=len)
+        else:
+            # Don't cancel the connection attempt for everybody else waiting on it
+            conn = await asyncio.shield(self._multiplexing[addr])
+            if conn is None:
+                return None
+
+        comm = conn.open_stream()
+        comm.name = "ConnectionPool"
+        comm._pool = weakref.ref(self)
+        return comm
+
+    async def _multiplex(
+        self, addr: str, timeout: float | None = None
+    ) -> MuxConnection | None:
+        """Open a new comm to the given address, to be shared by logical streams"""
+        comm = await self._connect_comm(addr, timeout)
+        if not can_multiplex(comm):
+            self._not_multiplexed.add(addr)
+            self.reuse(addr, comm)
+            return None
+        try:
+            comm.name = "ConnectionPool multiplexed"
+            await comm.write({"op": "multiplex"})
+            response = await comm.read()
+        except BaseException:
+            comm.abort()
+            self.reuse(addr, comm)
+            raise
+        if response != "OK":
+            logger.debug("%s does not support multiplexing: %s", addr, response)
+            self._not_multiplexed.add(addr)
+            self.reuse(addr, comm)
+            return None
+
+        conn = MuxConnection(comm, deserialize=self.deserialize)
+        conn.add_close_callback(partial(self._multiplexed_closed, addr, conn))
+        conn.start()
+        self._multiplexed[addr].append(conn)
+        return conn
+
+    def _multiplex_done(self, addr: str, task: asyncio.Task) -> None:
+        if self._multiplexing.get(addr) is task:
+            del self._multiplexing[addr]
+        if not task.cancelled() and task.exception():
+            logger.debug("Failed to connect to %s: %s", addr, task.exception())
+
+    def _multiplexed_closed(self, addr: str, conn: MuxConnection) -> None:
+        conns = self._multiplexed.get(addr)
+        if conns and conn in conns:
+            conns.remove(conn)
+            if not conns:
+                del self._multiplexed[addr]
+        # Release the slot of the underlying comm
+        self.reuse(addr, conn.comm)
+
+    async def _connect_comm(self, addr: str, timeout: float | None = None) -> Comm:
         available = self.available[addr]
         occupied = self.occupied[addr]
         while available:
@@ -1483,9 +1671,17 @@ class ConnectionPool:
         """
         Reuse an open communication to the given address.  For internal use.
         """
+        if isinstance(comm, MuxStream):
+            idle = self._idle_streams[addr]
+            if comm.closed():
+                pass
+            elif len(idle) < self._max_idle_streams and self.status == Status.running:
+                idle.append(comm)
+            else:
+                IOLoop.current().add_callback(comm.close)
         # if the pool is asked to reuse a comm it does not know about, ignore
         # this comm: just close it.
-        if comm not in self.occupied[addr]:
+        elif comm not in self.occupied[addr]:
             IOLoop.current().add_callback(comm.close)
         else:
             self.occupied[addr].remove(comm)
@@ -1519,6 +1715,10 @@ class ConnectionPool:
         Remove all Comms to a given address.
         """
         logger.debug("Removing comms to %s", addr)
+        self._multiplexed.pop(addr, None)
+        self._not_multiplexed.discard(addr)
+        for stream in self._idle_streams.pop(addr, ()):
+            stream.abort()
         if addr in self.available:
             comms = self.available.pop(addr)
             for comm in comms:
@@ -1566,6 +1766,131 @@ class ConnectionPool:
             await asyncio.sleep(0.01)
 
 
+async def broadcast_tree(
+    pool: ConnectionPool,
+    msg: dict,
+    addresses: list[str],
+    *,
+    fanout: int,
+    serializers: Any = None,
+    close: bool = False,
+) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+    """Send ``msg`` to all ``addresses`` through a tree of peers, rather than to each
+    of them from here.
+
+    The addresses are split into ``fanout`` groups. The first peer of each group
+    handles the message and forwards it to the rest of its group, in turn split into
+    ``fanout`` groups, and so on. Every peer thus sends the message at most
+    ``fanout`` times, and it reaches all of them in about
+    ``log(len(addresses), fanout)`` hops. Replies are aggregated on the way back.
+
+    If the first peer of a group can't be reached, the message is sent to the rest
+    of its group from here instead.
+
+    Returns
+    -------
+    The replies and the error messages of the peers, by address. Unlike
+    error_message(), the exceptions and tracebacks in the latter are pickled bytes,
+    as they may have been forwarded by several peers; pass them to
+    clean_exception().
+
+    See also
+    --------
+    Server.tree_broadcast
+    Scheduler.broadcast
+    """
+    results: dict[str, Any] = {}
+    errors: dict[str, dict[str, Any]] = {}
+    if not addresses:
+        return results, errors
+    # Serialize and compress large arguments once for all groups
+    cache = SerializationCache.from_config() if serializers is None else None
+
+    async def send_group(group: list[str]) -> None:
+        address, children = group[0], group[1:]
+        try:
+            comm = await pool.connect(address)
+        except Exception as e:
+            logger.error(f"broadcast to {address} failed: {e.__class__.__name__}: {e}")
+            errors[address] = _broadcast_error_message(e)
+            # Route around the unreachable peer
+            child_results, child_errors = await broadcast_tree(
+                pool,
+                msg,
+                children,
+                fanout=fanout,
+                serializers=serializers,
+                close=close,
+            )
+            results.update(child_results)
+            errors.update(child_errors)
+            return
+
+        comm.name = "Tree broadcast"
+        try:
+            msg2 = msg
+            if cache is not None:
+                msg2 = await _serialize_broadcast(msg, comm, cache)
+            resp = await send_recv(
+                comm,
+                op="tree-broadcast",
+                msg=msg2,
+                address=address,
+                children=children,
+                fanout=fanout,
+                serializers=serializers,
+                close=close,
+            )
+        except Exception as e:
+            # The peer may have forwarded the message already; don't send it twice
+            logger.error(f"broadcast to {address} failed: {e.__class__.__name__}: {e}")
+            err = _broadcast_error_message(e)
+            for addr in group:
+                errors[addr] = err
+        else:
+            results.update(resp["results"])
+            errors.update(resp["errors"])
+        finally:
+            pool.reuse(address, comm)
+
+    n = math.ceil(len(addresses) / fanout)
+    await asyncio.gather(
+        *(send_group(addresses[i : i + n]) for i in range(0, len(addresses), n))
+    )
+    return results, errors
+
+
+def _broadcast_error_message(e: BaseException) -> dict[str, Any]:
+    msg = error_message(e)
+    tb = msg["traceback"]
+    return {
+        **msg,
+        "exception": msg["exception"].data,
+        "traceback": tb.data if tb is not None else None,
+    }
+
+
+async def _serialize_broadcast(
+    msg: dict, comm: Comm, cache: SerializationCache
+) -> dict:
+    """Replace the large arguments of a message broadcast to several peers, e.g. the
+    pickled function of Client.run, with their frames serialized and compressed for
+    comm, which are shared with the other recipients through cache
+    """
+    out = {}
+    for k, v in msg.items():
+        if isinstance(v, Serialize):
+            data, size = v.data, safe_sizeof(v.data)
+        elif isinstance(v, bytes):
+            data, size = v, len(v)
+        else:
+            data, size = v, 0
+        if size and size >= cache.min_size:
+            v = await cache.serialize(id(data), data, comm, size)
+        out[k] = v
+    return out
+
+
 def coerce_to_address(o):
     if isinstance(o, (list, tuple)):
         o = unparse_host_port(*o)
@@ -2493,6 +2493,7 @@ class TaskGroupGraph(DashboardComponent):
                 "in_erred": [],
                 "compute_time": [],
                 "memory": [],
+                "peak_memory": [],
             }
         )
 
@@ -2582,6 +2583,10 @@ class TaskGroupGraph(DashboardComponent):
                     <span style="font-size: 12px; font-weight: bold;">Memory:</span>&nbsp;
                     <span style="font-size: 10px; font-family: Monaco, monospace;">@memory</span>
                 </div>
+                <div>
+                    <span style="font-size: 12px; font-weight: bold;">Peak task memory:</span>&nbsp;
+                    <span style="font-size: 10px; font-family: Monaco, monospace;">@peak_memory</span>
+                </div>
                 <div>
                     <span style="font-size: 12px; font-weight: bold;">Tasks:</span>&nbsp;
                     <span style="font-size: 10px; font-family: Monaco, monospace;">@tot_tasks</span>
@@ -2716,6 +2721,7 @@ class TaskGroupGraph(DashboardComponent):
             "in_erred": [],
             "compute_time": [],
             "memory": [],
+            "peak_memory": [],
         }
 
         arrows_data = {
@@ -2859,6 +2865,9 @@ class TaskGroupGraph(DashboardComponent):
             # compute_time and memory
             nodes_data["compute_time"].append(format_time(tg.duration))
             nodes_data["memory"].append(format_bytes(tg.nbytes_total))
+            nodes_data["peak_memory"].append(
+                format_bytes(tg.peak_memory_max) if tg.peak_memory_max else "unknown"
+            )
 
             # Add some status to hover
             tasks_processing = tg.states["processing"]
@@ -5,11 +5,13 @@ import logging
 import threading
 from collections import deque
 from collections.abc import Callable
+from time import perf_counter
 from typing import Final
 
 import psutil
 
-from dask.utils import format_bytes
+import dask.config
+from dask.utils import format_bytes, parse_timedelta
 
 from distributed.metrics import thread_time
 from distributed.utils import RateLimiterFilter
@@ -276,3 +278,169 @@ def gc_collect_duration() -> float:
     if _gc_diagnosis._fractional_timer is None:
         return 0
     return _gc_diagnosis._fractional_timer.duration_total
+
+
+class GCTuner:
+    """
+    An object that hooks itself into the gc callbacks to measure the pause
+    caused by each collection and to adapt the generation thresholds to them.
+
+    Whenever a collection takes longer than ``max_pause``, the threshold of its
+    generation is doubled, so that it runs less often; whenever it takes much less
+    than that, the threshold is halved, down to its original value.
+
+    Additionally, :meth:`freeze` moves all the objects that currently exist to a
+    permanent generation, which is ignored by all future collections. This is meant
+    to be called after a large number of long-lived objects, e.g. the scheduler's
+    TaskState objects, have been created. :meth:`refreeze` allows reference cycles
+    among the objects that died in the meantime to be collected.
+
+    Don't instantiate this directly except for tests.
+    Instead, use the global instance.
+    """
+
+    #: Never raise a threshold beyond this multiple of its original value
+    MAX_THRESHOLD_FACTOR = 64
+
+    max_pause: float
+    #: Number of collections, by generation
+    count: list[int]
+    #: Total time spent in collections, by generation
+    seconds: list[float]
+    #: Longest collection, by generation, since the last call to :meth:`pop_max`
+    max_seconds: list[float]
+
+    def __init__(self, max_pause: float = 0.1):
+        self.max_pause = max_pause
+        self.count = [0, 0, 0]
+        self.seconds = [0.0, 0.0, 0.0]
+        self.max_seconds = [0.0, 0.0, 0.0]
+        self._enabled = False
+        self._start: float | None = None
+        self._original_threshold: tuple[int, int, int] | None = None
+
+    def enable(self):
+        assert not self._enabled
+        self._original_threshold = gc.get_threshold()
+        cb = self._gc_callback
+        assert cb not in gc.callbacks
+        gc.callbacks.append(cb)
+        self._enabled = True
+
+    def disable(self):
+        assert self._enabled
+        gc.callbacks.remove(self._gc_callback)
+        assert self._original_threshold
+        gc.set_threshold(*self._original_threshold)
+        gc.unfreeze()
+        self._enabled = False
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    def _gc_callback(self, phase, info):
+        if phase == "start":
+            self._start = perf_counter()
+            return
+        assert phase == "stop"
+        if self._start is None:
+            return  # Enabled during a collection
+        duration = perf_counter() - self._start
+        self._start = None
+        generation = info["generation"]
+        self.count[generation] += 1
+        self.seconds[generation] += duration
+        self.max_seconds[generation] = max(self.max_seconds[generation], duration)
+        self._adapt_threshold(generation, duration)
+
+    def _adapt_threshold(self, generation, duration):
+        assert self._original_threshold
+        original = self._original_threshold[generation]
+        threshold = list(gc.get_threshold())
+        current = threshold[generation]
+        if original <= 0 or current <= 0:
+            return  # Automatic collections are disabled
+        if duration > self.max_pause:
+            new = min(current * 2, original * self.MAX_THRESHOLD_FACTOR)
+        elif duration < self.max_pause / 4:
+            new = max(current // 2, original)
+        else:
+            return
+        if new != current:
+            threshold[generation] = new
+            gc.set_threshold(*threshold)
+            logger.debug(
+                "Generation %d garbage collection took %0.3fs; "
+                "threshold changed from %d to %d",
+                generation,
+                duration,
+                current,
+                new,
+            )
+
+    def freeze(self):
+        """Exclude all objects that currently exist from all future collections"""
+        gc.freeze()
+        logger.debug("Frozen %d objects out of gc", gc.get_freeze_count())
+
+    def refreeze(self):
+        """Run a full collection over all objects, including those previously frozen,
+        and then freeze the survivors again. This causes a long pause.
+        """
+        gc.unfreeze()
+        gc.collect()
+        self.freeze()
+
+    def pop_max(self) -> list[float]:
+        """Return the longest collection, by generation, and reset it"""
+        out = self.max_seconds
+        self.max_seconds = [0.0, 0.0, 0.0]
+        return out
+
+
+_gc_tuner = GCTuner()
+_gc_tuner_users = 0
+_gc_tuner_lock = threading.Lock()
+
+
+def enable_gc_tuning():
+    """
+    Ask to enable global automatic GC management.
+    """
+    global _gc_tuner_users
+    with _gc_tuner_lock:
+        if _gc_tuner_users == 0:
+            _gc_tuner.max_pause = parse_timedelta(
+                dask.config.get("distributed.admin.gc.max-pause")
+            )
+            _gc_tuner.enable()
+        else:
+            assert _gc_tuner.enabled
+        _gc_tuner_users += 1
+
+
+def disable_gc_tuning():
+    """
+    Ask to disable global automatic GC management.
+    """
+    global _gc_tuner_users
+    with _gc_tuner_lock:
+        if _gc_tuner_users > 0:
+            _gc_tuner_users -= 1
+            if _gc_tuner_users == 0:
+                _gc_tuner.disable()
+            else:
+                assert _gc_tuner.enabled
+
+
+def gc_tuner() -> GCTuner | None:
+    """Return the global GC tuner if it is enabled, None otherwise"""
+    return _gc_tuner if _gc_tuner.enabled else None
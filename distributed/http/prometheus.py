@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import gc
 from importlib import import_module
 
 import dask.config
@@ -22,6 +23,161 @@ class PrometheusCollector:
         full_name.append(name)
         return "_".join(full_name)
 
+    def collect_buffer_pool(self):
+        """Receive buffers pool, if ``distributed.comm.buffer-pool.enabled`` is True.
+        This is shared by all servers in the same process.
+        """
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        from distributed.comm.buffer_pool import get_buffer_pool
+
+        pool = get_buffer_pool()
+        if pool is None:
+            return
+
+        requests = CounterMetricFamily(
+            self.build_name("comm_buffer_pool_requests"),
+            "Number of receive buffers requested from the pool, by outcome",
+            labels=["outcome"],
+        )
+        requests.add_metric(["hit"], pool.hits)
+        requests.add_metric(["miss"], pool.misses)
+        requests.add_metric(["unpooled"], pool.unpooled)
+        yield requests
+
+        memory = GaugeMetricFamily(
+            self.build_name("comm_buffer_pool"),
+            "Memory held by the receive buffers pool. Free buffers are part of "
+            "the unmanaged memory of the process; lent buffers may still be "
+            "referenced by received data.",
+            unit="bytes",
+            labels=["state"],
+        )
+        memory.add_metric(["free"], pool.free_bytes)
+        memory.add_metric(["lent"], pool.lent_bytes)
+        yield memory
+
+    def collect_adaptive_compression(self):
+        """Frames sent over links with adaptive compression, by codec, and the codec
+        currently chosen for each link, if
+        ``distributed.comm.adaptive-compression.enabled`` is True. This is shared by
+        all servers in the same process.
+        """
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        from distributed.protocol.compression import AdaptiveCompression
+
+        if not dask.config.get("distributed.comm.adaptive-compression.enabled"):
+            return
+
+        frames = CounterMetricFamily(
+            self.build_name("comm_adaptive_compression_frames"),
+            "Number of frames sent over links with adaptive compression, "
+            "by codec used (none for uncompressed frames)",
+            labels=["codec"],
+        )
+        for codec, n in AdaptiveCompression.total_frames.items():
+            frames.add_metric([codec], n)
+        yield frames
+
+        nbytes = CounterMetricFamily(
+            self.build_name("comm_adaptive_compression"),
+            "Size of the frames sent over links with adaptive compression, "
+            "by codec used, before and after compression",
+            unit="bytes",
+            labels=["codec", "stage"],
+        )
+        for codec, n in AdaptiveCompression.total_nbytes.items():
+            nbytes.add_metric([codec, "input"], n)
+        for codec, n in AdaptiveCompression.total_compressed_nbytes.items():
+            nbytes.add_metric([codec, "output"], n)
+        yield nbytes
+
+        links: dict[str, int] = {}
+        for policy in list(AdaptiveCompression.instances):
+            choice = policy.choice or "none"
+            links[choice] = links.get(choice, 0) + 1
+        choices = GaugeMetricFamily(
+            self.build_name("comm_adaptive_compression_links"),
+            "Number of open links by the codec currently chosen for them",
+            labels=["codec"],
+        )
+        for codec, n in links.items():
+            choices.add_metric([codec], n)
+        yield choices
+
+    def collect_batched_send(self):
+        """Time that messages spent queued in batched streams before being sent, by
+        op. This is shared by all servers in the same process.
+        """
+        from prometheus_client.core import CounterMetricFamily
+
+        from distributed.batched import BatchedSend
+
+        count = CounterMetricFamily(
+            self.build_name("batched_send_messages"),
+            "Number of messages sent over batched streams, by op",
+            labels=["op"],
+        )
+        delay = CounterMetricFamily(
+            self.build_name("batched_send_queueing_delay"),
+            "Total time that messages spent queued in batched streams before being "
+            "sent, by op",
+            unit="seconds",
+            labels=["op"],
+        )
+        for op, n in list(BatchedSend.queued_messages.items()):
+            count.add_metric([op], n)
+            delay.add_metric([op], BatchedSend.queueing_delay[op])
+        yield count
+        yield delay
+
+    def collect_gc_tuner(self):
+        """Garbage collection pauses, by generation, if
+        ``distributed.admin.gc.auto-tune`` is enabled. This is shared by all servers
+        in the same process.
+        """
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        from distributed.gc import gc_tuner
+
+        tuner = gc_tuner()
+        if tuner is None:
+            return
+
+        count = CounterMetricFamily(
+            self.build_name("gc_pause_count"),
+            "Total number of garbage collections since the process was started",
+            labels=["generation"],
+        )
+        seconds = CounterMetricFamily(
+            self.build_name("gc_pause_time"),
+            "Total time spent in garbage collections since the process was started",
+            unit="seconds",
+            labels=["generation"],
+        )
+        max_seconds = GaugeMetricFamily(
+            self.build_name("gc_pause_maximum"),
+            "Longest garbage collection since Prometheus last scraped metrics",
+            unit="seconds",
+            labels=["generation"],
+        )
+        for generation, (n, s, m) in enumerate(
+            zip(tuner.count, tuner.seconds, tuner.pop_max())
+        ):
+            count.add_metric([str(generation)], n)
+            seconds.add_metric([str(generation)], s)
+            max_seconds.add_metric([str(generation)], m)
+        yield count
+        yield seconds
+        yield max_seconds
+
+        yield GaugeMetricFamily(
+            self.build_name("gc_frozen_objects"),
+            "Number of objects frozen out of the garbage collector",
+            value=gc.get_freeze_count(),
+        )
+
 
 class PrometheusNotAvailableHandler(RequestHandler):
     def get(self):
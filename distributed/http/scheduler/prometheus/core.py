@@ -213,6 +213,11 @@ class SchedulerMetricCollector(PrometheusCollector):
 
         self.server.digests_max.clear()
 
+        yield from self.collect_gc_tuner()
+        yield from self.collect_buffer_pool()
+        yield from self.collect_adaptive_compression()
+        yield from self.collect_batched_send()
+
 
 COLLECTORS = [
     SchedulerMetricCollector,
@@ -131,6 +131,8 @@ async def test_prometheus(c, s, a, b):
         "dask_scheduler_tick_count",
         "dask_scheduler_tick_duration_maximum_seconds",
         "dask_scheduler_gc_collection_seconds",
+        "dask_scheduler_batched_send_messages",
+        "dask_scheduler_batched_send_queueing_delay_seconds",
     }
 
     try:
@@ -230,6 +232,81 @@ async def test_prometheus_collect_client_connections_totals(s):
     }
 
 
+@gen_cluster(
+    client=True,
+    clean_kwargs={"threads": False},
+    config={"distributed.admin.gc.auto-tune": True},
+)
+async def test_prometheus_collect_gc_tuner(c, s, a, b):
+    pytest.importorskip("prometheus_client")
+
+    active_metrics = await fetch_metrics(s.http_server.port, "dask_scheduler_gc_")
+    assert set(active_metrics) == {
+        "dask_scheduler_gc_collection_seconds",
+        "dask_scheduler_gc_pause_count",
+        "dask_scheduler_gc_pause_time_seconds",
+        "dask_scheduler_gc_pause_maximum_seconds",
+        "dask_scheduler_gc_frozen_objects",
+    }
+    samples = active_metrics["dask_scheduler_gc_pause_count"].samples
+    assert [sample.labels["generation"] for sample in samples] == ["0", "1", "2"]
+    assert active_metrics["dask_scheduler_gc_frozen_objects"].samples[0].value > 0
+
+
+@gen_cluster(
+    client=True,
+    clean_kwargs={"threads": False},
+    config={"distributed.comm.buffer-pool.enabled": True},
+)
+async def test_prometheus_collect_buffer_pool(c, s, a, b):
+    pytest.importorskip("prometheus_client")
+
+    active_metrics = await fetch_metrics(
+        s.http_server.port, "dask_scheduler_comm_buffer_pool"
+    )
+    assert set(active_metrics) == {
+        "dask_scheduler_comm_buffer_pool_requests",
+        "dask_scheduler_comm_buffer_pool_bytes",
+    }
+    samples = active_metrics["dask_scheduler_comm_buffer_pool_requests"].samples
+    assert {sample.labels["outcome"] for sample in samples} == {
+        "hit",
+        "miss",
+        "unpooled",
+    }
+    samples = active_metrics["dask_scheduler_comm_buffer_pool_bytes"].samples
+    assert {sample.labels["state"] for sample in samples} == {"free", "lent"}
+
+
+@gen_cluster(
+    client=True,
+    clean_kwargs={"threads": False},
+    config={"distributed.comm.adaptive-compression.enabled": True},
+)
+async def test_prometheus_collect_adaptive_compression(c, s, a, b):
+    pytest.importorskip("prometheus_client")
+    from distributed.protocol.compression import AdaptiveCompression
+
+    policy = AdaptiveCompression(["zlib"], bandwidth=1e6)
+    policy.compress(b"0" * 100_000)
+
+    active_metrics = await fetch_metrics(
+        s.http_server.port, "dask_scheduler_comm_adaptive_compression"
+    )
+    assert set(active_metrics) == {
+        "dask_scheduler_comm_adaptive_compression_frames",
+        "dask_scheduler_comm_adaptive_compression_bytes",
+        "dask_scheduler_comm_adaptive_compression_links",
+    }
+    samples = active_metrics["dask_scheduler_comm_adaptive_compression_bytes"].samples
+    assert {(sample.labels["codec"], sample.labels["stage"]) for sample in samples} >= {
+        ("zlib", "input"),
+        ("zlib", "output"),
+    }
+    samples = active_metrics["dask_scheduler_comm_adaptive_compression_links"].samples
+    assert {sample.labels["codec"] for sample in samples} >= {"zlib"}
+
+
 @gen_cluster(client=True, clean_kwargs={"threads": False})
 async def test_prometheus_collect_task_states(c, s, a, b):
     pytest.importorskip("prometheus_client")
@@ -11,6 +11,7 @@ from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metri
 from distributed.gc import gc_collect_duration
 from distributed.http.prometheus import PrometheusCollector
 from distributed.http.utils import RequestHandler
+from distributed.sizeof import cumulative_metrics as sizeof_metrics
 from distributed.worker import Worker
 
 logger = logging.getLogger("distributed.prometheus.worker")
@@ -84,8 +85,9 @@ class WorkerMetricCollector(PrometheusCollector):
             spilled_memory, spilled_disk = self.server.data.spilled_total  # type: ignore
         except AttributeError:
             spilled_memory, spilled_disk = 0, 0  # spilling is disabled
+        compressed = getattr(self.server.data, "compressed_total", 0)
         process_memory = self.server.monitor.get_process_memory()
-        managed_memory = min(process_memory, ws.nbytes - spilled_memory)
+        managed_memory = min(process_memory, ws.nbytes - spilled_memory + compressed)
 
         memory = GaugeMetricFamily(
             self.build_name("memory_bytes"),
@@ -148,6 +150,12 @@ class WorkerMetricCollector(PrometheusCollector):
 
         yield from self.collect_crick()
         yield from self.collect_spillbuffer()
+        yield from self.collect_serialization_cache()
+        yield from self.collect_sizeof()
+        yield from self.collect_gc_tuner()
+        yield from self.collect_buffer_pool()
+        yield from self.collect_adaptive_compression()
+        yield from self.collect_batched_send()
 
         now = time()
         max_tick_duration = max(
@@ -244,11 +252,93 @@ class WorkerMetricCollector(PrometheusCollector):
         }
 
         # Note: memory_read is used to calculate cache hit ratios (see docstring)
-        for (label, unit), value in metrics.items():
+        for (label, unit), value in list(metrics.items()):
             counters[unit].add_metric([label], value)
 
         yield from counters.values()
 
+        store = self.server.data.striped_store  # type: ignore
+        if store is None:
+            return  # Single spill directory
+
+        spilled = GaugeMetricFamily(
+            self.build_name("spilled_directory"),
+            "Number of bytes spilled to each spill directory",
+            unit="bytes",
+            labels=["directory"],
+        )
+        for directory, weight in zip(store.directories, store.weights):
+            spilled.add_metric([directory], weight)
+        yield spilled
+
+        counters = {
+            "bytes": CounterMetricFamily(
+                self.build_name("spill_directory_bytes"),
+                "Total size of disk accesses to each spill directory "
+                "since the latest worker restart",
+                labels=["directory", "activity"],
+            ),
+            "count": CounterMetricFamily(
+                self.build_name("spill_directory_count"),
+                "Total number of disk accesses to each spill directory "
+                "since the latest worker restart",
+                labels=["directory", "activity"],
+            ),
+        }
+        for (directory, label, unit), value in list(store.cumulative_metrics.items()):
+            counters[unit].add_metric([directory, label], value)
+        yield from counters.values()
+
+    def collect_serialization_cache(self) -> Iterator[Metric]:
+        """Serialized frames of keys sent to several workers, if
+        ``distributed.comm.serialization-cache.enabled`` is True
+        """
+        cache = self.server.serialization_cache
+        if cache is None:
+            return
+
+        yield GaugeMetricFamily(
+            self.build_name("serialization_cache"),
+            "Size of the serialized and compressed frames held to be sent to other "
+            "workers, including those that are views of managed data",
+            unit="bytes",
+            value=cache.nbytes,
+        )
+        requests = CounterMetricFamily(
+            self.build_name("serialization_cache_requests"),
+            "Number of large values sent to other workers, by whether they were "
+            "already serialized and compressed",
+            labels=["outcome"],
+        )
+        requests.add_metric(["hit"], cache.hits)
+        requests.add_metric(["miss"], cache.misses)
+        yield requests
+
+    def collect_sizeof(self) -> Iterator[Metric]:
+        """Cost of measuring the size of managed data, by type. This is shared by all
+        workers in the same process.
+
+        mean time per call = sizeof_time / sizeof_count
+        """
+        counters = {
+            "count": CounterMetricFamily(
+                self.build_name("sizeof_count"),
+                "Total number of calls to sizeof() on managed data "
+                "since the process was started",
+                labels=["type"],
+            ),
+            "seconds": CounterMetricFamily(
+                self.build_name("sizeof_time"),
+                "Total time spent in sizeof() on managed data "
+                "since the process was started",
+                unit="seconds",
+                labels=["type"],
+            ),
+        }
+        for (label, unit), value in list(sizeof_metrics.items()):
+            counters[unit].add_metric([label], value)
+        yield from counters.values()
+
 
 class PrometheusHandler(RequestHandler):
     _collector: ClassVar[WorkerMetricCollector | None] = None
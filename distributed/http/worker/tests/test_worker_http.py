@@ -40,6 +40,8 @@ async def test_prometheus(c, s, a):
         "dask_worker_spill_bytes_total",
         "dask_worker_spill_count_total",
         "dask_worker_spill_time_seconds_total",
+        "dask_worker_sizeof_count_total",
+        "dask_worker_sizeof_time_seconds_total",
         "dask_worker_tasks",
         "dask_worker_threads",
         "dask_worker_tick_count_total",
@@ -52,6 +54,8 @@ async def test_prometheus(c, s, a):
         "dask_worker_transfer_outgoing_count_total",
         "dask_worker_transfer_outgoing_bytes_total",
         "dask_worker_gc_collection_seconds_total",
+        "dask_worker_batched_send_messages_total",
+        "dask_worker_batched_send_queueing_delay_seconds_total",
     }
 
     try:
@@ -369,6 +369,7 @@ class Nanny(ServerNode):
         assert self.worker_address
 
         self.start_periodic_callbacks()
+        self.memory_manager.start_cgroup_watcher(self)
 
         return self
 
@@ -590,6 +591,7 @@ class Nanny(ServerNode):
         await asyncio.gather(*(self.plugin_remove(name) for name in self.plugins))
 
         self.stop()
+        self.memory_manager.close()
         if self.process is not None:
             await self.kill(timeout=timeout, reason=reason)
 
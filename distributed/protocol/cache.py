@@ -0,0 +1,278 @@
+"""
+Serialize-once cache for values that are sent to several peers
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Hashable, KeysView
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+import dask
+from dask.utils import parse_bytes, parse_timedelta
+
+from distributed.comm.utils import OFFLOAD_THRESHOLD
+from distributed.metrics import time
+from distributed.protocol.compression import AdaptiveCompression, maybe_compress
+from distributed.protocol.serialize import Serialized, serialize_and_split
+from distributed.utils import nbytes, offload
+
+if TYPE_CHECKING:
+    from distributed.comm import Comm
+
+
+class _Entry:
+    """A serialized value, and its compressed variants"""
+
+    __slots__ = ("value", "header", "frames", "variants", "nbytes", "last_used")
+
+    value: object
+    header: dict
+    frames: list
+    #: {compression key: (compression of each frame, frames)}
+    variants: dict[Hashable, tuple[tuple, list]]
+    nbytes: int
+    last_used: float
+
+    def __init__(self, value: object, header: dict, frames: list):
+        self.value = value
+        self.header = header
+        self.frames = frames
+        self.variants = {}
+        self.nbytes = sum(map(nbytes, frames))
+        self.last_used = time()
+
+
+class SerializationCache:
+    """Serialized and compressed frames of values that are sent to several peers
+    within a short time, e.g. a key that many workers fetch at once with get_data, so
+    that they're serialized and compressed once rather than once per peer.
+
+    Entries are looked up by key, e.g. the task key or ``id(value)``, and are only
+    valid for the very same value object. They expire after ``ttl`` seconds without
+    being used, and the least recently used ones are dropped when the cached frames
+    exceed ``max_size`` bytes. Note that frames may be views of the values, e.g. the
+    buffers of numpy arrays, which are counted as well. Owners of the values must
+    call :meth:`discard` when they release them, so that the cache doesn't keep
+    them alive.
+
+    Parameters
+    ----------
+    max_size
+        Maximum total size of the cached frames, in bytes
+    ttl
+        Seconds after which unused entries expire
+    min_size
+        Size below which callers should not bother with the cache. This is not
+        enforced by the cache itself.
+    """
+
+    max_size: float
+    ttl: float
+    min_size: int
+    #: Total size of the cached frames
+    nbytes: int
+    #: Number of values returned from the cache, and serialized or compressed anew
+    hits: int
+    misses: int
+
+    _entries: dict[Hashable, _Entry]
+    #: {key: keys of its entries in _entries}
+    _by_key: dict[Hashable, set[Hashable]]
+    _pending: dict[Hashable, asyncio.Future]
+
+    def __init__(self, max_size: float, ttl: float, min_size: int = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.min_size = min_size
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._by_key = {}
+        self._pending = {}
+
+    @classmethod
+    def from_config(cls) -> SerializationCache | None:
+        """Create a cache from ``distributed.comm.serialization-cache``, or return
+        None if it's disabled
+        """
+        config = dask.config.get("distributed.comm.serialization-cache")
+        if not config["enabled"]:
+            return None
+        return cls(
+            max_size=parse_bytes(config["max-size"]),
+            ttl=parse_timedelta(config["ttl"]),
+            min_size=parse_bytes(config["min-size"]),
+        )
+
+    def __repr__(self) -> str:
+        return f"<SerializationCache: {len(self)} entries, {self.nbytes} bytes>"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> KeysView[Hashable]:
+        """Keys that have at least one entry in the cache"""
+        return self._by_key.keys()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_key.clear()
+        self.nbytes = 0
+
+    def discard(self, key: Hashable) -> None:
+        """Drop all entries for key, e.g. because its value was released"""
+        for ekey in list(self._by_key.get(key, ())):
+            self._drop(ekey)
+
+    def purge(self) -> None:
+        """Drop expired entries, then the least recently used ones until the cache
+        fits in max_size
+        """
+        deadline = time() - self.ttl
+        while self._entries:
+            ekey, entry = next(iter(self._entries.items()))
+            if entry.last_used > deadline and self.nbytes <= self.max_size:
+                break
+            self._drop(ekey)
+
+    async def serialize(
+        self, key: Hashable, value: object, comm: Comm, size: int = 0
+    ) -> Serialized:
+        """Return value, serialized and compressed for comm, from the cache if
+        possible. ``size`` is an estimate of the size of the value, which
+        determines whether serialization is offloaded to another thread.
+        """
+        context = {
+            "sender": comm.local_info,
+            "recipient": comm.remote_info,
+            **comm.handshake_options,
+        }
+        split_size = getattr(comm, "max_shard_size", None)
+        use_offload = bool(
+            OFFLOAD_THRESHOLD and comm.allow_offload and size > OFFLOAD_THRESHOLD
+        )
+
+        ekey = (key, context.get("pickle-protocol"), split_size)
+        entry, serialized = await self._get(
+            ekey,
+            lambda: self._lookup(ekey, value),
+            partial(self._serialize, value, context, split_size),
+            partial(self._store, ekey),
+            use_offload,
+        )
+
+        compression = context.get("compression", "auto")
+        blocks = any(
+            name.endswith("-blocks") for name in context.get("decompression", ())
+        )
+        if isinstance(compression, AdaptiveCompression):
+            ckey: Hashable = ("adaptive", compression.choice, blocks)
+        else:
+            ckey = (compression, blocks)
+        (compressions, frames), compressed = await self._get(
+            (ekey, ckey),
+            lambda: entry.variants.get(ckey),
+            partial(self._compress, entry, compression, blocks),
+            partial(self._store_variant, ekey, entry, ckey),
+            use_offload,
+        )
+
+        if serialized or compressed:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return Serialized({**entry.header, "compression": compressions}, frames)
+
+    async def _get(
+        self,
+        pkey: Hashable,
+        lookup: Callable[[], Any],
+        create: Callable[[], Any],
+        store: Callable[[Any], None],
+        use_offload: bool,
+    ) -> tuple[Any, bool]:
+        """Return lookup(), or else create() after passing it to store(), and whether
+        it was created. Only one coroutine at a time creates a given object; the
+        others wait for it. create() may run in another thread.
+        """
+        while (fut := self._pending.get(pkey)) is not None:
+            await asyncio.shield(fut)
+        if (out := lookup()) is not None:
+            return out, False
+
+        fut = self._pending[pkey] = asyncio.get_running_loop().create_future()
+        try:
+            out = await offload(create) if use_offload else create()
+            store(out)
+            return out, True
+        finally:
+            del self._pending[pkey]
+            fut.set_result(None)
+
+    def _drop(self, ekey: tuple) -> None:
+        entry = self._entries.pop(ekey)
+        self.nbytes -= entry.nbytes
+        ekeys = self._by_key[ekey[0]]
+        ekeys.discard(ekey)
+        if not ekeys:
+            del self._by_key[ekey[0]]
+
+    def _lookup(self, ekey: tuple, value: object) -> _Entry | None:
+        entry = self._entries.get(ekey)
+        if entry is None:
+            return None
+        if entry.value is not value:
+            # The key now has a different value
+            self._drop(ekey)
+            return None
+        del self._entries[ekey]
+        # Move to the end, i.e. most recently used
+        entry.last_used = time()
+        self._entries[ekey] = entry
+        return entry
+
+    @staticmethod
+    def _serialize(
+        value: object, context: dict[str, Any], split_size: int | None
+    ) -> _Entry:
+        header, frames = serialize_and_split(
+            value, on_error="raise", context=context, size=split_size
+        )
+        return _Entry(value, header, frames)
+
+    def _store(self, ekey: tuple, entry: _Entry) -> None:
+        if entry.nbytes <= self.max_size:
+            self._entries[ekey] = entry
+            self._by_key.setdefault(ekey[0], set()).add(ekey)
+            self.nbytes += entry.nbytes
+            self.purge()
+
+    @staticmethod
+    def _compress(entry: _Entry, compression: Any, blocks: bool) -> tuple[tuple, list]:
+        # Same as protocol.core.dumps
+        compressions = list(
+            entry.header.get("compression") or [None] * len(entry.frames)
+        )
+        frames = list(entry.frames)
+        for i, frame in enumerate(frames):
+            if compressions[i] is None:
+                compressions[i], frames[i] = maybe_compress(
+                    frame, compression=compression, blocks=blocks
+                )
+        return tuple(compressions), frames
+
+    def _store_variant(
+        self, ekey: Hashable, entry: _Entry, ckey: Hashable, variant: tuple
+    ) -> None:
+        # Don't count frames that were sent uncompressed twice
+        added = sum(
+            nbytes(new) for new, old in zip(variant[1], entry.frames) if new is not old
+        )
+        if self._entries.get(ekey) is entry and entry.nbytes + added <= self.max_size:
+            entry.variants[ckey] = variant
+            entry.nbytes += added
+            self.nbytes += added
+            self.purge()
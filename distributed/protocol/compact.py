@@ -0,0 +1,131 @@
+"""
+Compact encoding of the most frequent messages on batched streams
+
+Messages between the scheduler and the workers, e.g. ``compute-task`` or
+``task-finished``, are dicts with the same keys every time. Sending them as msgpack
+maps repeats all the keys in every message, which takes a sizeable share of the time
+spent encoding and decoding them at high task throughput.
+
+When both ends of a comm use the same :data:`SCHEMA`, which is negotiated in the
+handshake, :class:`~distributed.batched.BatchedSend` instead sends the messages that
+match it as tuples of ``(op code, *values)``, and the receiving end turns them back
+into dicts. Any other message is sent as it is.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable
+from typing import Any
+
+#: (op, fields) of the messages that are encoded compactly. The op code of a message
+#: is its position in the schema. Changing it in any way changes SCHEMA_DIGEST, so
+#: that peers with a different schema fall back to dicts.
+SCHEMA: tuple[tuple[str, tuple[str, ...]], ...] = (
+    # Scheduler -> Worker
+    (
+        "compute-task",
+        (
+            "key",
+            "run_id",
+            "priority",
+            "stimulus_id",
+            "who_has",
+            "nbytes",
+            "run_spec",
+            "resource_restrictions",
+            "actor",
+            "annotations",
+            "span_id",
+        ),
+    ),
+    ("free-keys", ("keys", "stimulus_id")),
+    ("remove-replicas", ("keys", "stimulus_id")),
+    ("acquire-replicas", ("who_has", "nbytes", "stimulus_id")),
+    ("steal-request", ("key", "stimulus_id")),
+    # Worker -> Scheduler
+    (
+        "task-finished",
+        (
+            "key",
+            "run_id",
+            "nbytes",
+            "type",
+            "typename",
+            "metadata",
+            "thread",
+            "startstops",
+            "peak_memory",
+            "stimulus_id",
+            "status",
+        ),
+    ),
+    (
+        "task-erred",
+        (
+            "key",
+            "run_id",
+            "exception",
+            "traceback",
+            "exception_text",
+            "traceback_text",
+            "thread",
+            "startstops",
+            "stimulus_id",
+            "status",
+        ),
+    ),
+    ("release-worker-data", ("key", "stimulus_id")),
+    ("add-keys", ("keys", "stimulus_id")),
+    ("long-running", ("key", "run_id", "compute_duration", "stimulus_id")),
+    ("reschedule", ("key", "stimulus_id")),
+    ("steal-response", ("key", "state", "stimulus_id")),
+    ("request-refresh-who-has", ("keys", "stimulus_id")),
+    # Scheduler -> Client
+    ("key-in-memory", ("key", "type")),
+)
+
+#: Identifies SCHEMA in the handshake
+SCHEMA_DIGEST = hashlib.sha1(repr(SCHEMA).encode()).hexdigest()[:16]
+
+_encoders: dict[str, tuple[int, tuple[str, ...]]] = {
+    op: (code, fields) for code, (op, fields) in enumerate(SCHEMA)
+}
+
+
+def encode_messages(msgs: list) -> list:
+    """Replace the messages that match SCHEMA with tuples of (op code, *values)
+
+    Messages with missing or extra keys are left as they are.
+
+    See also
+    --------
+    decode_messages
+    """
+    out = []
+    for msg in msgs:
+        try:
+            code, fields = _encoders[msg["op"]]
+            if len(msg) == len(fields) + 1:
+                msg = (code, *[msg[field] for field in fields])
+        except (KeyError, TypeError):
+            # Unknown op, missing field, or not a dict
+            pass
+        out.append(msg)
+    return out
+
+
+def decode_messages(msgs: Iterable[Any]) -> list:
+    """Inverse of encode_messages
+
+    msgpack decodes arrays into tuples. Other messages, i.e. dicts, are returned as
+    they are.
+    """
+    out = []
+    for msg in msgs:
+        if type(msg) is tuple:
+            op, fields = SCHEMA[msg[0]]
+            msg = dict(zip(fields, msg[1:]))
+            msg["op"] = op
+        out.append(msg)
+    return out
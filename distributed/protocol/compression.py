@@ -6,19 +6,27 @@ Includes utilities for determining whether or not to compress
 
 from __future__ import annotations
 
+import struct
+import threading
+import weakref
 import zlib
+from collections import defaultdict
 from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from functools import partial
+from itertools import cycle
 from random import randint
-from typing import TYPE_CHECKING, Any, Literal, NamedTuple
+from typing import TYPE_CHECKING, Any, ClassVar, Literal, NamedTuple
 
 from packaging.version import parse as parse_version
 from tlz import identity
 
 import dask
+from dask.system import CPU_COUNT
+from dask.utils import format_bytes, parse_bytes
 
-from distributed.metrics import context_meter
+from distributed.metrics import context_meter, time
 from distributed.utils import ensure_memoryview, nbytes
 
 if TYPE_CHECKING:
@@ -88,9 +96,11 @@ with suppress(ImportError):
     if parse_version(zstandard.__version__) < parse_version("0.9.0"):
         raise ImportError("Need zstandard >= 0.9.0")
 
-    def zstd_compress(data):
+    def zstd_compress(data, level=None):
+        if level is None:
+            level = dask.config.get("distributed.comm.zstd.level")
         zstd_compressor = zstandard.ZstdCompressor(
-            level=dask.config.get("distributed.comm.zstd.level"),
+            level=level,
             threads=dask.config.get("distributed.comm.zstd.threads"),
         )
         return zstd_compressor.compress(data)
@@ -102,6 +112,129 @@ with suppress(ImportError):
     compressions["zstd"] = Compression("zstd", zstd_compress, zstd_decompress)
 
 
+# Large frames can be compressed in independent blocks, which are compressed and
+# decompressed in parallel. A frame compressed this way starts with the number of
+# blocks, followed by the size of each block before and after compression.
+BLOCKS_HEADER = struct.Struct("!I")
+BLOCK_SIZES = struct.Struct("!QQ")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all block (de)compressions in the process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            threads = dask.config.get("distributed.comm.compression-blocks.threads")
+            _executor = ThreadPoolExecutor(
+                threads or CPU_COUNT, thread_name_prefix="Dask-Compression"
+            )
+        return _executor
+
+
+def _map(func: Callable, items: list) -> list:
+    if len(items) < 2:
+        return list(map(func, items))
+    return list(_get_executor().map(func, items))
+
+
+def compress_blocks(
+    compress: Callable[[AnyBytes], AnyBytes],
+    data: AnyBytes,
+    block_size: int | None = None,
+) -> bytes:
+    """Compress data in independent blocks in parallel. block_size defaults to
+    ``distributed.comm.compression-blocks.size``.
+    """
+    if block_size is None:
+        block_size = parse_bytes(
+            dask.config.get("distributed.comm.compression-blocks.size")
+        )
+    mv = ensure_memoryview(data)
+    blocks = [mv[i : i + block_size] for i in range(0, mv.nbytes, block_size)]
+    compressed = _map(compress, blocks)
+    parts = [BLOCKS_HEADER.pack(len(blocks))]
+    for block, out in zip(blocks, compressed):
+        parts.append(BLOCK_SIZES.pack(block.nbytes, nbytes(out)))
+    return b"".join(parts + compressed)
+
+
+def decompress_blocks(
+    decompress: Callable[[AnyBytes], AnyBytes], data: AnyBytes
+) -> bytearray:
+    """Decompress the output of :func:`compress_blocks` in parallel"""
+    mv = ensure_memoryview(data)
+    (n,) = BLOCKS_HEADER.unpack_from(mv)
+    sizes = [
+        BLOCK_SIZES.unpack_from(mv, BLOCKS_HEADER.size + i * BLOCK_SIZES.size)
+        for i in range(n)
+    ]
+    out = bytearray(sum(size for size, _ in sizes))
+    out_mv = memoryview(out)
+
+    # Pairs of (target, compressed block)
+    tasks = []
+    offset = BLOCKS_HEADER.size + n * BLOCK_SIZES.size
+    out_offset = 0
+    for size, compressed_size in sizes:
+        tasks.append(
+            (
+                out_mv[out_offset : out_offset + size],
+                mv[offset : offset + compressed_size],
+            )
+        )
+        offset += compressed_size
+        out_offset += size
+    if offset != mv.nbytes:
+        raise ValueError("Truncated or corrupted block-compressed frame")
+
+    def decompress_into(task: tuple[memoryview, memoryview]) -> None:
+        target, block = task
+        decompressed = ensure_memoryview(decompress(block))
+        if decompressed.nbytes != target.nbytes:
+            raise ValueError("Corrupted block-compressed frame")
+        target[:] = decompressed
+
+    _map(decompress_into, tasks)
+    return out
+
+
+# Register a block variant of every codec, e.g. "lz4-blocks". These can be used
+# directly, but they're typically chosen by maybe_compress for large payloads; see
+# blocks_compression.
+for _comp in [c for n, c in compressions.items() if isinstance(n, str) and c.name == n]:
+    compressions[f"{_comp.name}-blocks"] = Compression(
+        f"{_comp.name}-blocks",
+        partial(compress_blocks, _comp.compress),
+        partial(decompress_blocks, _comp.decompress),
+    )
+del _comp
+
+
+def blocks_compression(comp: Compression, size: int) -> Compression:
+    """Return a variant of comp that compresses a payload of the given size in
+    parallel blocks, or comp itself if the payload isn't at least two blocks large or
+    ``distributed.comm.compression-blocks.enabled`` is False
+    """
+    name = f"{comp.name}-blocks"
+    if name not in compressions or not dask.config.get(
+        "distributed.comm.compression-blocks.enabled"
+    ):
+        return comp
+    block_size = parse_bytes(
+        dask.config.get("distributed.comm.compression-blocks.size")
+    )
+    if size < 2 * block_size:
+        return comp
+    return Compression(
+        name,
+        partial(compress_blocks, comp.compress, block_size=block_size),
+        compressions[name].decompress,
+    )
+
+
 def get_compression_settings(key: str) -> str | None:
     """Fetch and validate compression settings, with a nice error message in case of
     failure. This also resolves 'auto', which may differ between different hosts of the
@@ -157,7 +290,8 @@ def maybe_compress(
     sample_size: int = 10_000,
     nsamples: int = 5,
     min_ratio: float = 0.7,
-    compression: str | None | Literal[False] = "auto",
+    compression: str | None | Literal[False] | AdaptiveCompression = "auto",
+    blocks: bool = False,
 ) -> tuple[str | None, AnyBytes]:
     """Maybe compress payload
 
@@ -168,15 +302,26 @@ def maybe_compress(
        return the original
     4. Return the compressed output
 
+    If ``compression`` is an :class:`AdaptiveCompression`, it makes the decision
+    instead.
+
+    If ``blocks`` is True, large payloads are compressed in parallel blocks, e.g. with
+    ``lz4-blocks`` instead of ``lz4``; see :func:`blocks_compression`. The receiver
+    must be able to decompress them.
+
     Returns
     -------
     - Name of compression algorithm used
     - Either compressed or original payload
     """
+    if isinstance(compression, AdaptiveCompression):
+        return compression.compress(payload)
     comp = compressions[compression]
     if not comp.name:
         return None, payload
-    if not (min_size <= nbytes(payload) <= 2**31):
+    size = nbytes(payload)
+    full_comp = blocks_compression(comp, size) if blocks else comp
+    if size < min_size or (size > 2**31 and full_comp is comp):
         # Either too small to bother
         # or too large (compression libraries often fail)
         return None, payload
@@ -188,13 +333,230 @@ def maybe_compress(
     sample = byte_sample(mv, sample_size, nsamples)
     if len(comp.compress(sample)) <= min_ratio * sample.nbytes:
         # Try compressing the real thing and check how compressed it is
-        compressed = comp.compress(mv)
+        compressed = full_comp.compress(mv)
         if len(compressed) <= min_ratio * mv.nbytes:
-            return comp.name, compressed
+            return full_comp.name, compressed
     # Skip compression as the sample or the data didn't compress well
     return None, payload
 
 
+class AdaptiveCompression:
+    """Per-link compression policy, used instead of a fixed codec when
+    ``distributed.comm.adaptive-compression.enabled`` is True.
+
+    It keeps moving averages of the speed and compression ratio of each candidate
+    codec, as measured on the frames sent over the link, and of the bandwidth of the
+    link itself, as reported by the comm through :meth:`observe_bandwidth`. Frames are
+    compressed with the codec that minimizes the estimated time to compress and send
+    them, or not at all when sending them as they are is faster, e.g. over a fast
+    local network. Every ``explore_interval`` frames, another codec is tried on a
+    sample of the frame, so that the decision follows changes in the data and in the
+    link.
+
+    Parameters
+    ----------
+    candidates
+        Codecs to choose from, e.g. ``"lz4"`` or ``"zstd:1"`` for zstd at level 1.
+        The ones not installed are ignored.
+    bandwidth
+        Initial estimate of the bandwidth of the link, in bytes/s
+    blocks
+        Whether the peer can decompress frames compressed in parallel blocks; see
+        :func:`maybe_compress`
+    """
+
+    candidates: dict[str, Compression]
+    bandwidth: float
+    #: Moving averages of the compression speed in bytes/s and of the compression
+    #: ratio of each candidate, or None until it's been tried
+    speed: dict[str, float | None]
+    ratio: dict[str, float | None]
+    #: Number of frames, and their size before and after compression, by codec used
+    #: ("none" for frames sent as they are)
+    frames: defaultdict[str, int]
+    nbytes: defaultdict[str, int]
+    compressed_nbytes: defaultdict[str, int]
+
+    #: Same as frames, nbytes, and compressed_nbytes, but for all the links of the
+    #: process since it started
+    total_frames: ClassVar[defaultdict[str, int]] = defaultdict(int)
+    total_nbytes: ClassVar[defaultdict[str, int]] = defaultdict(int)
+    total_compressed_nbytes: ClassVar[defaultdict[str, int]] = defaultdict(int)
+    instances: ClassVar[weakref.WeakSet[AdaptiveCompression]] = weakref.WeakSet()
+
+    def __init__(
+        self,
+        candidates: Iterable[str],
+        *,
+        bandwidth: float,
+        min_size: int = 10_000,
+        sample_size: int = 10_000,
+        nsamples: int = 5,
+        explore_interval: int = 32,
+        alpha: float = 0.2,
+        blocks: bool = False,
+    ):
+        self.candidates = {}
+        for label in candidates:
+            name, _, level = label.partition(":")
+            comp = compressions.get(name)
+            if comp is None or comp.name != name:
+                continue
+            if level:
+                if name != "zstd":
+                    raise ValueError(f"Compression level not supported: {label}")
+                comp = comp._replace(compress=partial(zstd_compress, level=int(level)))
+            self.candidates[label] = comp
+
+        self.bandwidth = bandwidth
+        self._bandwidth_measured = False
+        self.min_size = min_size
+        self.sample_size = sample_size
+        self.nsamples = nsamples
+        self.explore_interval = explore_interval
+        self.alpha = alpha
+        self.blocks = blocks
+        self.speed = dict.fromkeys(self.candidates)
+        self.ratio = dict.fromkeys(self.candidates)
+        self.frames = defaultdict(int)
+        self.nbytes = defaultdict(int)
+        self.compressed_nbytes = defaultdict(int)
+        self._count = 0
+        self._explore = cycle(list(self.candidates))
+        AdaptiveCompression.instances.add(self)
+
+    @classmethod
+    def from_config(cls, decompression: Iterable[str]) -> AdaptiveCompression:
+        """Create a policy from the ``distributed.comm.adaptive-compression`` config,
+        restricted to the codecs that the peer is able to decompress
+        """
+        decompression = set(decompression)
+        candidates = dask.config.get("distributed.comm.adaptive-compression.codecs")
+        return cls(
+            [label for label in candidates if label.partition(":")[0] in decompression],
+            bandwidth=parse_bytes(dask.config.get("distributed.scheduler.bandwidth")),
+            blocks=any(name.endswith("-blocks") for name in decompression),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"<AdaptiveCompression: {self.choice or 'none'}, "
+            f"bandwidth={format_bytes(int(self.bandwidth))}/s>"
+        )
+
+    def _cost(self, label: str, ratio: float | None = None) -> float:
+        """Estimated time to compress and send a byte with a codec"""
+        speed = self.speed[label]
+        if ratio is None:
+            ratio = self.ratio[label]
+        assert speed and ratio is not None
+        return 1 / speed + ratio / self.bandwidth
+
+    @property
+    def choice(self) -> str | None:
+        """The codec currently deemed best for the link, or None to not compress"""
+        best = None
+        best_cost = 1 / self.bandwidth
+        for label in self.candidates:
+            if self.speed[label] is not None:
+                cost = self._cost(label)
+                if cost < best_cost:
+                    best, best_cost = label, cost
+        return best
+
+    def observe_bandwidth(self, nbytes: int, duration: float) -> None:
+        """Update the bandwidth estimate with a transfer of nbytes over the link"""
+        if duration <= 0:
+            return
+        if self._bandwidth_measured:
+            self.bandwidth += self.alpha * (nbytes / duration - self.bandwidth)
+        else:
+            # Replace the initial guess
+            self.bandwidth = nbytes / duration
+            self._bandwidth_measured = True
+
+    def _measure(
+        self, label: str, data: memoryview, comp: Compression | None = None
+    ) -> tuple[AnyBytes, float]:
+        if comp is None:
+            comp = self.candidates[label]
+        start = time()
+        compressed = comp.compress(data)
+        elapsed = time() - start
+        ratio = nbytes(compressed) / data.nbytes
+
+        speed = self.speed[label]
+        prev_ratio = self.ratio[label]
+        if speed is None or prev_ratio is None:
+            self.speed[label] = data.nbytes / max(elapsed, 1e-7)
+            self.ratio[label] = ratio
+        else:
+            if elapsed > 0:
+                self.speed[label] = speed + self.alpha * (data.nbytes / elapsed - speed)
+            self.ratio[label] = prev_ratio + self.alpha * (ratio - prev_ratio)
+        return compressed, ratio
+
+    def _record(self, label: str, n: int, compressed_nbytes: int) -> None:
+        for counters, value in (
+            ((self.frames, AdaptiveCompression.total_frames), 1),
+            ((self.nbytes, AdaptiveCompression.total_nbytes), n),
+            (
+                (self.compressed_nbytes, AdaptiveCompression.total_compressed_nbytes),
+                compressed_nbytes,
+            ),
+        ):
+            for counter in counters:
+                counter[label] += value
+
+    def compress(self, payload: AnyBytes) -> tuple[str | None, AnyBytes]:
+        """Compress a frame or not; see :func:`maybe_compress`"""
+        n = nbytes(payload)
+        if not self.candidates or n < self.min_size:
+            return None, payload
+
+        self._count += 1
+        if self._count % self.explore_interval == 0 or None in self.speed.values():
+            label: str | None = next(self._explore)
+        else:
+            label = self.choice
+        if label is None:
+            self._record("none", n, n)
+            return None, payload
+        comp = self.candidates[label]
+        if self.blocks:
+            comp = blocks_compression(comp, n)
+        if n > 2**31 and comp is self.candidates[label]:
+            # Compression libraries often fail with such large payloads
+            self._record("none", n, n)
+            return None, payload
+
+        # Try compressing a sample first, so that incompressible frames cost little
+        mv = ensure_memoryview(payload)
+        sample = byte_sample(mv, self.sample_size, self.nsamples)
+        _, ratio = self._measure(label, sample)
+        if self._cost(label, ratio) < 1 / self.bandwidth:
+            compressed, ratio = self._measure(label, mv, comp)
+            if self._cost(label, ratio) < 1 / self.bandwidth:
+                self._record(label, n, nbytes(compressed))
+                return comp.name, compressed
+        self._record("none", n, n)
+        return None, payload
+
+    def metrics(self) -> dict[str, Any]:
+        """Current estimates and decisions, for diagnostics"""
+        return {
+            "choice": self.choice,
+            "bandwidth": self.bandwidth,
+            "codecs": {
+                label: {"speed": self.speed[label], "ratio": self.ratio[label]}
+                for label in self.candidates
+            },
+            "frames": dict(self.frames),
+            "nbytes": dict(self.nbytes),
+            "compressed_nbytes": dict(self.compressed_nbytes),
+        }
+
+
 @context_meter.meter("decompress")
 def decompress(header: dict[str, Any], frames: Iterable[AnyBytes]) -> list[AnyBytes]:
     """Decompress frames according to information in the header"""
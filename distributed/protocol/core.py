@@ -37,7 +37,15 @@ def dumps(  # type: ignore[no-untyped-def]
     """
     try:
         if context and "compression" in context:
-            compress_opts = {"compression": context["compression"]}
+            compress_opts = {
+                "compression": context["compression"],
+                # Large frames may be compressed in parallel blocks if the peer can
+                # decompress them
+                "blocks": any(
+                    name.endswith("-blocks")
+                    for name in context.get("decompression", ())
+                ),
+            }
         else:
             compress_opts = {}
 
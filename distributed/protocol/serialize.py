@@ -633,6 +633,13 @@ def _nested_deserialize(x, emulate_deserialize=True):
     {'op': 'update', 'data': 123}
     """
 
+    def deserialize_serialized(obj: Serialized) -> object:
+        # Same as what protocol.loads does upon receiving a Serialized object
+        frames = obj.frames
+        if "compression" in obj.header:
+            frames = decompress(obj.header, frames)
+        return merge_and_deserialize(obj.header, frames)
+
     def replace_inner(x):
         if type(x) is dict:
             x = x.copy()
@@ -644,7 +651,7 @@ def _nested_deserialize(x, emulate_deserialize=True):
                     if typ is Serialize:
                         x[k] = v.data
                     elif typ is Serialized:
-                        x[k] = deserialize(v.header, v.frames)
+                        x[k] = deserialize_serialized(v)
                 if typ is ToPickle:
                     x[k] = v.data
 
@@ -658,7 +665,7 @@ def _nested_deserialize(x, emulate_deserialize=True):
                     if typ is Serialize:
                         x[k] = v.data
                     elif typ is Serialized:
-                        x[k] = deserialize(v.header, v.frames)
+                        x[k] = deserialize_serialized(v)
                 if typ is ToPickle:
                     x[k] = v.data
 
@@ -680,12 +687,18 @@ def sizeof_serialized(obj):
 
 
 def serialize_bytelist(
-    x: object, compression: str | None | Literal[False] = "auto", **kwargs: Any
+    x: object,
+    compression: str | None | Literal[False] = "auto",
+    blocks: bool = False,
+    **kwargs: Any,
 ) -> list[bytes | bytearray | memoryview]:
     header, frames = serialize_and_split(x, **kwargs)
     if frames:
         header["compression"], frames = zip(
-            *(maybe_compress(frame, compression=compression) for frame in frames)
+            *(
+                maybe_compress(frame, compression=compression, blocks=blocks)
+                for frame in frames
+            )
         )
     header["count"] = len(frames)
 
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+import dask
+
+from distributed.comm import connect, listen
+from distributed.protocol import deserialize
+from distributed.protocol.cache import SerializationCache
+from distributed.protocol.compression import decompress
+from distributed.utils_test import gen_test
+
+
+@asynccontextmanager
+async def comm_pair():
+    comms: asyncio.Queue = asyncio.Queue()
+    async with listen("tcp://127.0.0.1:0", comms.put) as listener:
+        comm = await connect(listener.contact_address)
+        serv_comm = await comms.get()
+        try:
+            yield comm, serv_comm
+        finally:
+            await comm.close()
+            await serv_comm.close()
+
+
+def load(ser):
+    return deserialize(ser.header, decompress(ser.header, ser.frames))
+
+
+@gen_test()
+async def test_serialize_once():
+    np = pytest.importorskip("numpy")
+    cache = SerializationCache(max_size=10**7, ttl=60)
+    x = np.arange(100_000)
+    async with comm_pair() as (comm, serv_comm):
+        ser1 = await cache.serialize("x", x, comm)
+        ser2 = await cache.serialize("x", x, comm)
+        assert cache.misses == 1
+        assert cache.hits == 1
+        assert ser1.frames == ser2.frames
+        assert ser1.header is not ser2.header
+        assert (load(ser1) == x).all()
+        assert len(cache) == 1
+        assert cache.nbytes >= x.nbytes
+
+        # The value is sent as is over the comm
+        await comm.write({"x": ser1})
+        assert (((await serv_comm.read())["x"]) == x).all()
+
+        # Same key, different value
+        y = x + 1
+        ser3 = await cache.serialize("x", y, comm)
+        assert cache.misses == 2
+        assert (load(ser3) == y).all()
+        assert len(cache) == 1
+
+
+@gen_test()
+async def test_compressed_variants():
+    cache = SerializationCache(max_size=10**7, ttl=60)
+    x = b"0" * 1_000_000
+    async with comm_pair() as (comm, _):
+        ser = await cache.serialize("x", x, comm)
+        assert ser.header["compression"] == (None,)
+        nbytes = cache.nbytes
+
+        comm.handshake_options["compression"] = "zlib"
+        ser = await cache.serialize("x", x, comm)
+        assert ser.header["compression"] == ("zlib",)
+        assert load(ser) == x
+        assert cache.misses == 2
+        assert nbytes < cache.nbytes < nbytes + 10_000
+
+        ser = await cache.serialize("x", x, comm)
+        assert ser.header["compression"] == ("zlib",)
+        assert cache.hits == 1
+
+
+@gen_test()
+async def test_concurrent_requests():
+    cache = SerializationCache(max_size=10**7, ttl=60)
+    x = b"0" * 1_000_000
+    async with comm_pair() as (comm, _):
+        # Offloaded to a thread; the other requests wait for it
+        sers = await asyncio.gather(
+            *(cache.serialize("x", x, comm, size=10**9) for _ in range(5))
+        )
+    assert cache.misses == 1
+    assert cache.hits == 4
+    assert all(ser.frames == sers[0].frames for ser in sers)
+
+
+@gen_test()
+async def test_eviction():
+    cache = SerializationCache(max_size=250_000, ttl=60)
+    values = {k: k.encode() * 100_000 for k in "abc"}
+    async with comm_pair() as (comm, _):
+        for k, v in values.items():
+            await cache.serialize(k, v, comm)
+        assert len(cache) == 2
+        assert cache.nbytes == 200_000
+
+        # Too large to be cached
+        ser = await cache.serialize("d", b"d" * 300_000, comm)
+        assert load(ser) == b"d" * 300_000
+        assert len(cache) == 2
+
+        await cache.serialize("b", values["b"], comm)
+        assert cache.hits == 1
+        cache.ttl = 0
+        cache.purge()
+        assert len(cache) == 0
+        assert cache.nbytes == 0
+
+
+@gen_test()
+async def test_discard():
+    cache = SerializationCache(max_size=10**7, ttl=60)
+    values = {k: k.encode() * 100_000 for k in "ab"}
+    async with comm_pair() as (comm, _):
+        for k, v in values.items():
+            await cache.serialize(k, v, comm)
+        comm.handshake_options["compression"] = "zlib"
+        await cache.serialize("a", values["a"], comm)
+    assert set(cache.keys()) == {"a", "b"}
+
+    cache.discard("a")
+    assert set(cache.keys()) == {"b"}
+    assert len(cache) == 1
+    assert cache.nbytes == 100_000
+    # Not in the cache
+    cache.discard("a")
+    cache.discard("c")
+    cache.discard("b")
+    assert not cache.keys()
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_from_config():
+    assert SerializationCache.from_config() is None
+    with dask.config.set(
+        {
+            "distributed.comm.serialization-cache.enabled": True,
+            "distributed.comm.serialization-cache.max-size": "1 MiB",
+        }
+    ):
+        cache = SerializationCache.from_config()
+    assert cache.max_size == 2**20
+    assert cache.min_size == 2**20
+    assert cache.ttl == 10
+
+
+@gen_test()
+async def test_unserializable():
+    class C:
+        def __reduce__(self):
+            raise TypeError("nope")
+
+    cache = SerializationCache(max_size=10**7, ttl=60)
+    async with comm_pair() as (comm, _):
+        with pytest.raises(TypeError, match="Could not serialize"):
+            await cache.serialize("x", C(), comm)
+        assert len(cache) == 0
+        assert not cache._pending
+        assert load(await cache.serialize("x", 1, comm)) == 1
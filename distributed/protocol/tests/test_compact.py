@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import dask
+
+from distributed.batched import BatchedSend
+from distributed.comm import connect, listen
+from distributed.protocol import dumps, loads
+from distributed.protocol.compact import SCHEMA, decode_messages, encode_messages
+from distributed.utils_test import gen_cluster, gen_test
+
+
+def test_roundtrip():
+    msgs = [
+        {"op": "free-keys", "keys": ["x", ("y", 1)], "stimulus_id": "s1"},
+        {"op": "steal-response", "key": "x", "state": None, "stimulus_id": "s2"},
+        # Keys in a different order
+        {"stimulus_id": "s3", "key": "z", "op": "release-worker-data"},
+    ]
+    encoded = encode_messages(msgs)
+    assert all(type(msg) is tuple for msg in encoded)
+    ops = [op for op, _ in SCHEMA]
+    assert [ops[msg[0]] for msg in encoded] == [msg["op"] for msg in msgs]
+
+    decoded = decode_messages(loads(dumps(encoded)))
+    assert decoded == [
+        {"op": "free-keys", "keys": ("x", ("y", 1)), "stimulus_id": "s1"},
+        {"op": "steal-response", "key": "x", "state": None, "stimulus_id": "s2"},
+        {"op": "release-worker-data", "key": "z", "stimulus_id": "s3"},
+    ]
+    assert len(dumps(encoded)[0]) < len(dumps(msgs)[0]) / 2
+
+
+def test_fallback():
+    msgs = [
+        {"op": "free-keys", "keys": ["x"]},  # missing field
+        {"op": "free-keys", "keys": ["x"], "stimulus_id": "s1", "extra": 1},
+        {"op": "unknown-op", "x": 1},
+        {"x": 1},
+        "OK",
+        ["add", {"workers": {}}],
+    ]
+    assert encode_messages(msgs) == msgs
+    assert decode_messages(msgs) == msgs
+
+
+@pytest.mark.parametrize(
+    "overrides,compact",
+    [
+        ({}, True),
+        ({"compact-messages": None}, False),
+        # Different schema
+        ({"compact-messages": "0123456789abcdef"}, False),
+    ],
+)
+@gen_test()
+async def test_handshake(overrides, compact):
+    comms: asyncio.Queue = asyncio.Queue()
+    async with listen("tcp://127.0.0.1:0", comms.put) as listener:
+        comm = await connect(listener.contact_address, handshake_overrides=overrides)
+        serv_comm = await comms.get()
+        assert comm.handshake_options["compact-messages"] is compact
+        assert serv_comm.handshake_options["compact-messages"] is compact
+
+        b = BatchedSend(interval="1ms")
+        b.start(comm)
+        msg = {"op": "add-keys", "keys": ["x"], "stimulus_id": "s1"}
+        b.send(msg)
+        msgs = await serv_comm.read()
+        assert (type(msgs[0]) is tuple) is compact
+        assert decode_messages(msgs) == [{**msg, "keys": ("x",)}]
+        assert list(b.recent_message_log) == [[msg]]
+        await b.close()
+        await serv_comm.close()
+
+
+@gen_test()
+async def test_inproc():
+    comms: asyncio.Queue = asyncio.Queue()
+    async with listen("inproc://", comms.put) as listener:
+        comm = await connect(listener.contact_address)
+        serv_comm = await comms.get()
+        assert not comm.handshake_options["compact-messages"]
+        assert not serv_comm.handshake_options["compact-messages"]
+        await comm.close()
+        await serv_comm.close()
+
+
+@pytest.mark.parametrize("compact", [True, False])
+@gen_cluster(client=True)
+async def test_cluster(c, s, a, b, compact):
+    with dask.config.set({"distributed.comm.compact-messages": compact}):
+        async with c.__class__(s.address, asynchronous=True) as c2:
+            comm = c2.scheduler_comm.comm
+            assert comm.handshake_options["compact-messages"] is compact
+            futs = c2.map(lambda x: x + 1, range(20))
+            assert await c2.gather(futs) == list(range(1, 21))
+            assert await c2.submit(sum, futs) == sum(range(1, 21))
+
+    for w in (a, b):
+        assert w.batched_stream.comm.handshake_options["compact-messages"]
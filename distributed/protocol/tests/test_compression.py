@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import threading
 import zlib
 from concurrent.futures import ThreadPoolExecutor
@@ -7,17 +8,24 @@ from concurrent.futures import ThreadPoolExecutor
 import pytest
 
 import dask.config
+from dask.system import CPU_COUNT
+from dask.utils import format_bytes, parse_bytes
 
 from distributed import Worker, wait
+from distributed.comm import Comm, connect, listen
 from distributed.compatibility import LINUX
+from distributed.metrics import time
 from distributed.protocol import dumps, loads, maybe_compress, msgpack, to_serialize
 from distributed.protocol.compression import (
+    AdaptiveCompression,
     Compression,
+    compress_blocks,
     compressions,
+    decompress_blocks,
     get_compression_settings,
 )
 from distributed.utils import nbytes
-from distributed.utils_test import gen_cluster
+from distributed.utils_test import gen_cluster, gen_test
 
 
 @pytest.fixture(params=[None, "zlib", "lz4", "snappy", "zstd"])
@@ -245,3 +253,273 @@ async def test_disable_compression_on_localhost(c, s, compression_counters, host
             y = c.submit(lambda x: None, x, workers=[b.address])
             await wait(y)
             assert compression_counters == [0, 0]
+
+
+def test_compress_blocks(compression):
+    if compression is None:
+        pytest.skip()
+    comp = compressions[f"{compression}-blocks"]
+    assert comp.name == f"{compression}-blocks"
+    payload = b"".join(i.to_bytes(4, "big") * 1000 for i in range(250))
+    for block_size in (1000, 100_000, 10**7):
+        compressed = compress_blocks(
+            compressions[compression].compress, payload, block_size
+        )
+        assert len(compressed) < len(payload)
+        out = comp.decompress(compressed)
+        assert isinstance(out, bytearray)
+        assert out == payload
+
+    assert comp.decompress(comp.compress(b"")) == b""
+
+
+def test_compress_blocks_in_parallel():
+    threads = set()
+
+    def compress(data):
+        threads.add(threading.current_thread().name)
+        return zlib.compress(data)
+
+    payload = b"0" * 100_000
+    compressed = compress_blocks(compress, payload, block_size=1000)
+    assert compressed.startswith((100).to_bytes(4, "big"))
+    assert all(name.startswith("Dask-Compression") for name in threads)
+    assert compressions["zlib-blocks"].decompress(compressed) == payload
+
+
+def test_decompress_blocks_corrupted():
+    compressed = compress_blocks(zlib.compress, b"0" * 100_000, block_size=1000)
+    with pytest.raises(ValueError, match="Truncated"):
+        decompress_blocks(zlib.decompress, compressed[:-1])
+    with pytest.raises(ValueError, match="Truncated"):
+        decompress_blocks(zlib.decompress, compressed + b"0")
+
+
+def test_maybe_compress_blocks():
+    payload = b"0" * 1_000_000
+    with dask.config.set({"distributed.comm.compression-blocks.size": "100kB"}):
+        rc, rd = maybe_compress(payload, compression="zlib", blocks=True)
+        assert rc == "zlib-blocks"
+        assert compressions[rc].decompress(rd) == payload
+
+        # Too small to be split
+        rc, _ = maybe_compress(payload[:150_000], compression="zlib", blocks=True)
+        assert rc == "zlib"
+        # The receiver doesn't support blocks
+        assert maybe_compress(payload, compression="zlib")[0] == "zlib"
+        # Adaptive compression
+        policy = AdaptiveCompression(["zlib"], bandwidth=1e6, blocks=True)
+        assert policy.compress(payload)[0] == "zlib-blocks"
+
+        with dask.config.set({"distributed.comm.compression-blocks.enabled": False}):
+            rc, _ = maybe_compress(payload, compression="zlib", blocks=True)
+            assert rc == "zlib"
+
+
+def test_dumps_blocks():
+    np = pytest.importorskip("numpy")
+    x = np.ones(1_000_000)
+    with dask.config.set({"distributed.comm.compression-blocks.size": "100kB"}):
+        frames = dumps(
+            {"x": to_serialize(x)},
+            context={"compression": "zlib", "decompression": ("zlib", "zlib-blocks")},
+        )
+        assert sum(map(nbytes, frames)) < x.nbytes / 10
+        msg = loads(frames, deserialize=False)
+        assert msg["x"].header["compression"] == ("zlib-blocks",)
+        assert (loads(frames)["x"] == x).all()
+
+        # Old peer
+        frames = dumps(
+            {"x": to_serialize(x)},
+            context={"compression": "zlib", "decompression": ("zlib",)},
+        )
+        msg = loads(frames, deserialize=False)
+        assert msg["x"].header["compression"] == ("zlib",)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("size", ["1MiB", "16MiB", "128MiB"])
+def test_compress_blocks_throughput(compression, size):
+    """Benchmark of compressing and decompressing a frame of moderately compressible
+    data, in a single block or in parallel blocks. Run with ``pytest -s`` to see the
+    results.
+    """
+    np = pytest.importorskip("numpy")
+    if compression is None:
+        pytest.skip()
+    rng = np.random.default_rng(0)
+    payload = rng.integers(0, 2**16, parse_bytes(size) // 8).tobytes()
+    comp = compressions[compression]
+    blocks = compressions[f"{compression}-blocks"]
+
+    results = []
+    for c in (comp, blocks):
+        start = time()
+        compressed = c.compress(payload)
+        compress_time = time() - start
+        start = time()
+        assert c.decompress(compressed) == payload
+        decompress_time = time() - start
+        results.append(
+            f"{c.name}: compress {format_bytes(len(payload) / compress_time)}/s, "
+            f"decompress {format_bytes(len(payload) / decompress_time)}/s, "
+            f"ratio {len(compressed) / len(payload):.2f}"
+        )
+    print(f"\n{size} on {CPU_COUNT} CPUs: " + "; ".join(results))
+
+
+def test_adaptive_compression_slow_link():
+    policy = AdaptiveCompression(["zlib"], bandwidth=1e6)
+    payload = b"0" * 100_000
+    rc, rd = maybe_compress(payload, compression=policy)
+    assert rc == "zlib"
+    assert zlib.decompress(rd) == payload
+    assert policy.choice == "zlib"
+
+    # Incompressible frames are sent as they are
+    np = pytest.importorskip("numpy")
+    payload = np.random.randint(0, 255, size=100_000).astype("u1").tobytes()
+    assert policy.compress(payload) == (None, payload)
+
+    # Too small
+    assert policy.compress(b"0" * 100) == (None, b"0" * 100)
+
+    metrics = policy.metrics()
+    assert metrics["choice"] == "zlib"
+    assert metrics["frames"] == {"zlib": 1, "none": 1}
+    assert metrics["nbytes"] == {"zlib": 100_000, "none": 100_000}
+    assert metrics["compressed_nbytes"]["zlib"] < 1000
+    assert 0 < metrics["codecs"]["zlib"]["ratio"] < 0.5
+
+
+def test_adaptive_compression_fast_link(compression_counters):
+    policy = AdaptiveCompression(["dummy"], bandwidth=1e15, explore_interval=10)
+    payload = b"0" * 100_000
+    # Codecs are tried on a sample of the first frame
+    assert policy.compress(payload) == (None, payload)
+    assert compression_counters == [1, 0]
+    assert policy.choice is None
+
+    # Further frames are neither compressed nor sampled, except once in a while
+    for _ in range(18):
+        assert policy.compress(payload) == (None, payload)
+    assert compression_counters == [2, 0]
+    assert policy.frames == {"none": 19}
+
+
+def test_adaptive_compression_follows_bandwidth():
+    policy = AdaptiveCompression(["zlib"], bandwidth=1e6)
+    payload = b"0" * 100_000
+    assert policy.compress(payload)[0] == "zlib"
+    for _ in range(100):
+        policy.observe_bandwidth(10**12, 1)
+    assert policy.bandwidth > 10**11
+    assert policy.choice is None
+    assert policy.compress(payload) == (None, payload)
+    for _ in range(100):
+        policy.observe_bandwidth(10**6, 1)
+    assert policy.choice == "zlib"
+
+
+def test_adaptive_compression_candidates():
+    with dask.config.set(
+        {"distributed.comm.adaptive-compression.codecs": ["zlib", "zstd:1", "nope"]}
+    ):
+        policy = AdaptiveCompression.from_config(["lz4", "zlib"])
+    assert list(policy.candidates) == ["zlib"]
+    assert AdaptiveCompression.from_config([]).compress(b"0" * 100_000)[0] is None
+
+    with pytest.raises(ValueError, match="level"):
+        AdaptiveCompression(["zlib:3"], bandwidth=1e6)
+
+
+def test_adaptive_compression_zstd_levels():
+    pytest.importorskip("zstandard")
+    policy = AdaptiveCompression(["zstd:1", "zstd:19"], bandwidth=1e6)
+    payload = b"0123456789" * 100_000
+    for _ in range(5):
+        rc, rd = policy.compress(payload)
+        assert rc in (None, "zstd")
+        if rc:
+            assert compressions["zstd"].decompress(rd) == payload
+    assert policy.speed["zstd:1"] > policy.speed["zstd:19"]
+
+
+@pytest.mark.skipif(not LINUX, reason="Need 127.0.0.2 to mean localhost")
+@gen_cluster(
+    client=True,
+    nthreads=[],
+    config={
+        "distributed.comm.adaptive-compression.enabled": True,
+        "distributed.comm.adaptive-compression.codecs": ["dummy"],
+        # Compressing is always worth it, however slow
+        "distributed.scheduler.bandwidth": "1kB",
+    },
+)
+async def test_adaptive_compression_remote_comms(c, s, compression_counters):
+    async with Worker(s.address, host="127.0.0.2") as a:
+        async with Worker(s.address, host="127.0.0.1") as b:
+            x = c.submit(lambda: "x" * 11_000, workers=[a.address])
+            y = c.submit(lambda x: None, x, workers=[b.address])
+            await wait(y)
+            # Sample and full frame, when sending x to b
+            assert compression_counters == [2, 1]
+            assert AdaptiveCompression.total_frames["dummy"] >= 1
+
+
+@gen_cluster(
+    nthreads=[],
+    config={
+        "distributed.comm.adaptive-compression.enabled": True,
+        "distributed.comm.adaptive-compression.codecs": ["dummy"],
+    },
+)
+async def test_adaptive_compression_disabled_on_scheduler(s, monkeypatch):
+    """The scheduler doesn't compress on its event loop, not even adaptively"""
+    monkeypatch.setattr(Comm, "same_host", property(lambda self: False))
+    async with Worker(s.address) as a:
+        scheduler_comm = s.stream_comms[a.address].comm
+        assert scheduler_comm.handshake_options["compression"] is None
+        # The worker still compresses what it sends to the scheduler
+        worker_comm = a.batched_stream.comm
+        assert isinstance(
+            worker_comm.handshake_options["compression"], AdaptiveCompression
+        )
+
+
+@gen_cluster(
+    client=True,
+    nthreads=[],
+    config={
+        "distributed.comm.adaptive-compression.enabled": True,
+        "distributed.comm.adaptive-compression.codecs": ["dummy"],
+    },
+)
+async def test_adaptive_compression_disabled_on_localhost(c, s, compression_counters):
+    async with Worker(s.address) as a:
+        async with Worker(s.address) as b:
+            x = c.submit(lambda: "x" * 11_000, workers=[a.address])
+            y = c.submit(lambda x: None, x, workers=[b.address])
+            await wait(y)
+            assert compression_counters == [0, 0]
+
+
+@gen_test()
+async def test_adaptive_compression_measures_bandwidth():
+    comms = []
+
+    async def handle_comm(comm):
+        comms.append(comm)
+
+    async with listen("tcp://127.0.0.1:0", handle_comm) as listener:
+        comm = await connect(listener.contact_address)
+        policy = AdaptiveCompression(["zlib"], bandwidth=1)
+        comm.handshake_options["compression"] = policy
+        await comm.write(b"\x01" * 50_000_000)
+        while not comms:
+            await asyncio.sleep(0.01)
+        assert await comms[0].read() == b"\x01" * 50_000_000
+        await comm.close()
+        await comms[0].close()
+    assert policy.bandwidth > 10**6
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import os
+
 import pytest
 
+from distributed.compatibility import WINDOWS
 from distributed.protocol.utils import (
+    FileBuffer,
+    file_memoryview,
+    frame_split_size,
     merge_memoryviews,
     pack_frames,
     pack_frames_prelude,
@@ -52,6 +58,27 @@ def test_unpack_frames_partial():
         unpack_frames(b"".join(frames[:-1]))
 
 
+@pytest.mark.skipif(WINDOWS, reason="Requires a POSIX file descriptor")
+def test_frame_split_size_file_buffer(tmp_path):
+    """A FileBuffer is split into FileBuffers over sections of the same file"""
+    payload = os.urandom(10_000)
+    fn = tmp_path / "data"
+    fn.write_bytes(b"x" * 100 + payload)
+    with open(fn, "rb") as fh:
+        mv = file_memoryview(fh.fileno(), 100, len(payload))
+    shards = frame_split_size(mv, n=4096)
+    assert [len(s) for s in shards] == [4096, 4096, 1808]
+    for i, shard in enumerate(shards):
+        assert isinstance(shard.obj, FileBuffer)
+        assert shard.obj.offset == 100 + 4096 * i
+        assert shard.obj.nbytes == len(shard)
+    assert b"".join(shards) == payload
+
+    # Slices of a FileBuffer are split as usual
+    shards = frame_split_size(mv[1:], n=4096)
+    assert all(shard.obj is mv.obj for shard in shards)
+
+
 class TestMergeMemoryviews:
     def test_empty(self):
         empty = merge_memoryviews([])
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import ctypes
+import mmap
+import os
 import struct
+import weakref
 from collections.abc import Collection, Iterable, Sequence
 from typing import Literal, overload
 
@@ -46,6 +49,51 @@ def host_array_from_buffers(
     return out
 
 
+class FileBuffer(mmap.mmap):
+    """Read-only memory map of a section of a file, as returned by
+    :func:`file_memoryview`.
+
+    Besides exposing the data through the buffer protocol, it retains an open file
+    descriptor together with the offset and size of the section in the file, so that
+    comms can send it over the network with ``os.sendfile()`` without ever reading it
+    into the memory of the process.
+    """
+
+    #: File descriptor; closed when the buffer is garbage collected
+    fd: int
+    #: Offset of the section in the file
+    offset: int
+    #: Size of the section in the file
+    nbytes: int
+
+
+def file_memoryview(
+    fd: int, offset: int, nbytes: int, *, writeable: bool = False
+) -> memoryview:
+    """Return a memoryview of a section of an open file, which is paged in lazily.
+    The file descriptor can be closed afterwards.
+
+    By default, the memoryview is read-only and backed by a :class:`FileBuffer`.
+    If writeable=True, it is instead backed by a private copy-on-write memory map;
+    writes are never propagated to the file.
+    """
+    start = offset - offset % mmap.ALLOCATIONGRANULARITY
+    if writeable:
+        buf = mmap.mmap(
+            fd, offset - start + nbytes, access=mmap.ACCESS_COPY, offset=start
+        )
+        return memoryview(buf)[offset - start :]
+
+    fbuf = FileBuffer(
+        fd, offset - start + nbytes, access=mmap.ACCESS_READ, offset=start
+    )
+    fbuf.fd = os.dup(fd)
+    fbuf.offset = offset
+    fbuf.nbytes = nbytes
+    weakref.finalize(fbuf, os.close, fbuf.fd)
+    return memoryview(fbuf)[offset - start :]
+
+
 def frame_split_size(
     frame: bytes | memoryview, n: int = BIG_BYTES_SHARD_SIZE
 ) -> list[memoryview]:
@@ -54,6 +102,10 @@ def frame_split_size(
 
     This helps us to avoid passing around very large bytestrings.
 
+    A frame that spans a whole :class:`FileBuffer` is split into new FileBuffers over
+    consecutive sections of the file, so that comms can still send each shard with
+    ``os.sendfile()``.
+
     Examples
     --------
     >>> frame_split_size([b'12345', b'678'], n=3)  # doctest: +SKIP
@@ -65,6 +117,13 @@ def frame_split_size(
     if frame.nbytes <= n:
         return [frame]
 
+    fbuf = frame.obj
+    if isinstance(fbuf, FileBuffer) and frame.nbytes == fbuf.nbytes:
+        return [
+            file_memoryview(fbuf.fd, fbuf.offset + i, min(n, fbuf.nbytes - i))
+            for i in range(0, fbuf.nbytes, n)
+        ]
+
     nitems = frame.nbytes // frame.itemsize
     items_per_shard = n // frame.itemsize
 
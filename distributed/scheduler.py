@@ -98,6 +98,8 @@ from distributed.core import (
     ErrorMessage,
     OKMessage,
     Status,
+    _serialize_broadcast,
+    broadcast_tree,
     clean_exception,
     error_message,
     rpc,
@@ -106,13 +108,20 @@ from distributed.core import (
 from distributed.diagnostics.memory_sampler import MemorySamplerExtension
 from distributed.diagnostics.plugin import SchedulerPlugin, _get_plugin_name
 from distributed.event import EventExtension
-from distributed.gc import disable_gc_diagnosis, enable_gc_diagnosis
+from distributed.gc import (
+    disable_gc_diagnosis,
+    disable_gc_tuning,
+    enable_gc_diagnosis,
+    enable_gc_tuning,
+    gc_tuner,
+)
 from distributed.http import get_handlers
 from distributed.metrics import monotonic, time
 from distributed.multi_lock import MultiLockExtension
 from distributed.node import ServerNode
 from distributed.proctitle import setproctitle
 from distributed.protocol import deserialize
+from distributed.protocol.cache import SerializationCache
 from distributed.protocol.pickle import dumps, loads
 from distributed.protocol.serialize import Serialized, ToPickle, serialize
 from distributed.publish import PublishExtension
@@ -278,6 +287,11 @@ class MemoryState:
         Sum of the output of sizeof() for the dask keys held in RAM. Note that this may
         be inaccurate, which may cause inaccurate unmanaged memory (see below).
 
+    compressed
+        Number of bytes of the dask keys spilled out of the managed memory, but held in
+        RAM in serialized and compressed form instead of being written to disk (see
+        ``distributed.worker.memory.max-compressed``). This is a part of 'managed'.
+
     spilled
         Number of bytes  for the dask keys spilled to the hard drive.
         Note that this is the size on disk; size in memory may be different due to
@@ -317,6 +331,7 @@ class MemoryState:
     process: int
     unmanaged_old: int
     managed: int
+    compressed: int
     spilled: int
 
     __slots__ = tuple(__annotations__)
@@ -328,6 +343,7 @@ class MemoryState:
         unmanaged_old: int,
         managed: int,
         spilled: int,
+        compressed: int = 0,
     ):
         # Some data arrives with the heartbeat, some other arrives in realtime as the
         # tasks progress. Also, sizeof() is not guaranteed to return correct results.
@@ -335,6 +351,7 @@ class MemoryState:
         # we need to force all numbers to add up exactly by definition.
         self.process = process
         self.managed = min(self.process, managed)
+        self.compressed = min(self.managed, compressed)
         self.spilled = spilled
         # Subtractions between unsigned ints guaranteed by construction to be >= 0
         self.unmanaged_old = min(unmanaged_old, process - self.managed)
@@ -344,17 +361,20 @@ class MemoryState:
         process = 0
         unmanaged_old = 0
         managed = 0
+        compressed = 0
         spilled = 0
         for ms in infos:
             process += ms.process
             unmanaged_old += ms.unmanaged_old
             spilled += ms.spilled
             managed += ms.managed
+            compressed += ms.compressed
         return MemoryState(
             process=process,
             unmanaged_old=unmanaged_old,
             managed=managed,
             spilled=spilled,
+            compressed=compressed,
         )
 
     @property
@@ -641,10 +661,13 @@ class WorkerState:
 
         :issue:`6002` will let us solve this.
         """
+        spilled = self.metrics["spilled_bytes"]
+        compressed = spilled.get("compressed", 0)
         return MemoryState(
             process=self.metrics["memory"],
-            managed=max(0, self.nbytes - self.metrics["spilled_bytes"]["memory"]),
-            spilled=self.metrics["spilled_bytes"]["disk"],
+            managed=max(0, self.nbytes - spilled["memory"] + compressed),
+            spilled=spilled["disk"],
+            compressed=compressed,
             unmanaged_old=self._memory_unmanaged_old,
         )
 
@@ -937,6 +960,11 @@ class TaskCollection:
     #: The total number of bytes that tasks belonging to this collection have produced
     nbytes_total: int
 
+    #: The highest memory that a task belonging to this collection allocated while
+    #: running, on top of what the worker was using when it started, in bytes;
+    #: 0 if unknown. See ``distributed.worker.memory.task-peak-memory``.
+    peak_memory_max: int
+
     #: The number of tasks belonging to this collection in each state,
     #: like ``{"memory": 10, "processing": 3, "released": 4, ...}``
     states: dict[TaskStateState, int]
@@ -956,6 +984,7 @@ class TaskCollection:
         self._all_durations_us = defaultdict(int)
         self._duration_us = 0
         self.nbytes_total = 0
+        self.peak_memory_max = 0
         self.states = dict.fromkeys(ALL_TASK_STATES, 0)
         self._size = 0
         self._types = defaultdict(int)
@@ -996,6 +1025,10 @@ class TaskPrefix(TaskCollection):
     #: An exponentially weighted moving average duration of all tasks with this prefix
     duration_average: float
 
+    #: An exponentially weighted moving average of the peak memory allocated by the
+    #: tasks with this prefix while running, in bytes; -1 if unknown
+    peak_memory_average: float
+
     #: Numbers of times a task was marked as suspicious with this prefix
     suspicious: int
 
@@ -1019,6 +1052,7 @@ class TaskPrefix(TaskCollection):
         else:
             self.duration_average = -1
         self.max_exec_time = -1
+        self.peak_memory_average = -1
         self.suspicious = 0
         self._groups = {}
 
@@ -1040,6 +1074,14 @@ class TaskPrefix(TaskCollection):
             else:
                 self.duration_average = 0.5 * duration_s + 0.5 * old
 
+    def add_peak_memory(self, nbytes: int) -> None:
+        self.peak_memory_max = max(self.peak_memory_max, nbytes)
+        old = self.peak_memory_average
+        if old < 0:
+            self.peak_memory_average = nbytes
+        else:
+            self.peak_memory_average = 0.5 * nbytes + 0.5 * old
+
     def add_group(self, tg: TaskGroup) -> None:
         self._groups[tg] = None
 
@@ -1152,6 +1194,10 @@ class TaskGroup(TaskCollection):
         self.nbytes_total += diff
         self.prefix.nbytes_total += diff
 
+    def add_peak_memory(self, nbytes: int) -> None:
+        self.peak_memory_max = max(self.peak_memory_max, nbytes)
+        self.prefix.add_peak_memory(nbytes)
+
     def __repr__(self) -> str:
         return (
             "<"
@@ -2483,6 +2529,7 @@ class SchedulerState:
         typename: str,
         worker: str,
         startstops: list[StartStop],
+        peak_memory: int | None = None,
         # Other fields such as thread. They are unused here but are passed to
         # SchedulerPlugin.transition and might be consumed by third-party plugins.
         **kwargs: Any,
@@ -2525,6 +2572,9 @@ class SchedulerState:
                 action=startstop["action"],
             )
 
+        if peak_memory is not None:
+            ts.group.add_peak_memory(peak_memory)
+
         ############################
         # Update State Information #
         ############################
@@ -4256,6 +4306,9 @@ class Scheduler(SchedulerState, ServerNode):
         self._workers_added_total = 0
         self._workers_removed_total = 0
         self._active_graph_updates = 0
+        self._gc_tuning = False
+        #: A large graph has been frozen out of gc since the scheduler was last idle
+        self._gc_refreeze_when_idle = False
 
     ##################
     # Administration #
@@ -4407,6 +4460,9 @@ class Scheduler(SchedulerState, ServerNode):
         await super().start_unsafe()
 
         enable_gc_diagnosis()
+        if dask.config.get("distributed.admin.gc.auto-tune"):
+            enable_gc_tuning()
+            self._gc_tuning = True
 
         self._clear_task_state()
 
@@ -4414,7 +4470,11 @@ class Scheduler(SchedulerState, ServerNode):
             await self.listen(
                 addr,
                 allow_offload=False,
-                handshake_overrides={"pickle-protocol": 4, "compression": None},
+                handshake_overrides={
+                    "pickle-protocol": 4,
+                    "compression": None,
+                    "adaptive-compression": False,
+                },
                 **self.security.get_listen_args("scheduler"),
             )
             self.ip = get_address_host(self.listen_address)
@@ -4473,6 +4533,10 @@ class Scheduler(SchedulerState, ServerNode):
 
         self.start_periodic_callbacks()
 
+        if tuner := gc_tuner():
+            # Modules, comms, extensions, etc. will live as long as the scheduler
+            tuner.freeze()
+
         setproctitle(f"dask scheduler [{self.address}]")
         return self
 
@@ -4545,6 +4609,9 @@ class Scheduler(SchedulerState, ServerNode):
 
         setproctitle("dask scheduler [closed]")
         disable_gc_diagnosis()
+        if self._gc_tuning:
+            disable_gc_tuning()
+            self._gc_tuning = False
 
     ###########
     # Stimuli #
@@ -4626,8 +4693,13 @@ class Scheduler(SchedulerState, ServerNode):
 
         # ws._nbytes is updated at a different time and sizeof() may not be accurate,
         # so size may be (temporarily) negative; floor it to zero.
+        spilled = metrics["spilled_bytes"]
         size = max(
-            0, metrics["memory"] - ws.nbytes + metrics["spilled_bytes"]["memory"]
+            0,
+            metrics["memory"]
+            - ws.nbytes
+            + spilled["memory"]
+            - spilled.get("compressed", 0),
         )
 
         ws._memory_unmanaged_history.append((local_now, size))
@@ -5115,6 +5187,13 @@ class Scheduler(SchedulerState, ServerNode):
             }
             self.log_event(["scheduler", client], evt_msg)
             logger.debug("Task state created. %i new tasks", len(self.tasks) - before)
+            if (tuner := gc_tuner()) and len(self.tasks) - before >= dask.config.get(
+                "distributed.admin.gc.freeze-graph-size"
+            ):
+                # Don't traverse the new TaskState objects at every full collection
+                # for as long as the graph is being computed
+                tuner.freeze()
+                self._gc_refreeze_when_idle = True
         except Exception as e:
             evt_msg = {
                 "action": "update-graph",
@@ -6663,8 +6742,19 @@ class Scheduler(SchedulerState, ServerNode):
         nanny: bool = False,
         serializers: Any = None,
         on_error: Literal["raise", "return", "return_pickle", "ignore"] = "raise",
+        tree: bool | None = None,
     ) -> dict[str, Any]:
-        """Broadcast message to workers, return all results"""
+        """Broadcast message to workers, return all results
+
+        If ``tree`` is True, or if it's None and there are at least
+        ``distributed.scheduler.broadcast-tree.min-workers`` recipients, the message
+        is sent to a few workers only, which forward it to the others through a
+        tree, instead of being sent to every worker by the scheduler.
+
+        See also
+        --------
+        distributed.core.broadcast_tree
+        """
         if workers is None:
             if hosts is None:
                 workers = list(self.workers)
@@ -6685,37 +6775,72 @@ class Scheduler(SchedulerState, ServerNode):
 
         ERROR = object()
 
+        def handle_error(e: Exception) -> Any:
+            if on_error == "raise":
+                raise e
+            elif on_error == "return":
+                return e
+            elif on_error == "return_pickle":
+                return dumps(e)
+            elif on_error == "ignore":
+                return ERROR
+            else:
+                raise ValueError(
+                    "on_error must be 'raise', 'return', 'return_pickle', "
+                    f"or 'ignore'; got {on_error!r}"
+                )
+
         reuse_broadcast_comm = dask.config.get(
             "distributed.scheduler.reuse-broadcast-comm", False
         )
         close = not reuse_broadcast_comm
 
+        tree_config = dask.config.get("distributed.scheduler.broadcast-tree")
+        if tree is None:
+            tree = (
+                tree_config["enabled"] and len(addresses) >= tree_config["min-workers"]
+            )
+        if tree:
+            results, errors = await broadcast_tree(
+                self.rpc,
+                msg,
+                list(dict.fromkeys(addresses)),
+                fanout=tree_config["fanout"],
+                serializers=serializers,
+                close=close,
+            )
+            out = {}
+            for w, addr in zip(workers, addresses):
+                if addr in errors:
+                    _, exc, tb = clean_exception(**errors[addr])
+                    assert exc
+                    v = handle_error(exc.with_traceback(tb))
+                else:
+                    v = results[addr]
+                if v is not ERROR:
+                    out[w] = v
+            return out
+
+        # Serialize and compress large arguments once for all workers
+        cache = SerializationCache.from_config() if serializers is None else None
+
         async def send_message(addr: str) -> Any:
             try:
                 comm = await self.rpc.connect(addr)
                 comm.name = "Scheduler Broadcast"
                 try:
+                    msg2 = msg
+                    if cache is not None:
+                        msg2 = await _serialize_broadcast(msg, comm, cache)
                     resp = await send_recv(
-                        comm, close=close, serializers=serializers, **msg
+                        comm, close=close, serializers=serializers, **msg2
                     )
                 finally:
                     self.rpc.reuse(addr, comm)
                 return resp
             except Exception as e:
                 logger.error(f"broadcast to {addr} failed: {e.__class__.__name__}: {e}")
-                if on_error == "raise":
-                    raise
-                elif on_error == "return":
-                    return e
-                elif on_error == "return_pickle":
-                    return dumps(e)
-                elif on_error == "ignore":
-                    return ERROR
-                else:
-                    raise ValueError(
-                        "on_error must be 'raise', 'return', 'return_pickle', "
-                        f"or 'ignore'; got {on_error!r}"
-                    )
+                return handle_error(e)
 
         results = await All([send_message(address) for address in addresses])
         return {k: v for k, v in zip(workers, results) if v is not ERROR}
@@ -7203,10 +7328,11 @@ class Scheduler(SchedulerState, ServerNode):
         n: int
             Number of replications we expect to see within the cluster
         branching_factor: int, optional
-            The number of workers that can copy data in each generation.
-            The larger the branching factor, the more data we copy in
-            a single step, but the more a given worker risks being
-            swamped by data requests.
+            The number of workers that can copy data from each worker holding it
+            at the same time. Workers that receive a copy serve it to others as
+            soon as they have it. The larger the branching factor, the more data we
+            copy at once, but the more a given worker risks being swamped by data
+            requests.
 
         See also
         --------
@@ -7256,39 +7382,63 @@ class Scheduler(SchedulerState, ServerNode):
                     ]
                 )
 
-            # Copy not-yet-filled data
-            gathers: defaultdict[str, dict[Key, list[str]]]
-            while tasks:
+            # Copy not-yet-filled data. Every worker that receives a key becomes a
+            # source for it as soon as it has it, rather than at the end of the
+            # generation, so that a slow transfer doesn't hold up the others.
+            receiving: defaultdict[TaskState, set[WorkerState]] = defaultdict(set)
+            in_flight: dict[
+                asyncio.Task, tuple[WorkerState, dict[Key, list[str]], list[TaskState]]
+            ] = {}
+            while True:
+                gathers: defaultdict[WorkerState, dict[Key, list[str]]]
                 gathers = defaultdict(dict)
+                gathered: defaultdict[WorkerState, list[TaskState]]
+                gathered = defaultdict(list)
                 for ts in list(tasks):
                     if ts.state == "forgotten":
                         # task is no longer needed by any client or dependent task
                         tasks.remove(ts)
                         continue
                     assert ts.who_has is not None
-                    n_missing = n - len(ts.who_has & workers)
+                    n_missing = n - len(ts.who_has & workers) - len(receiving[ts])
                     if n_missing <= 0:
-                        # Already replicated enough
-                        tasks.remove(ts)
+                        if not receiving[ts]:
+                            # Already replicated enough
+                            tasks.remove(ts)
                         continue
 
-                    count = min(n_missing, branching_factor * len(ts.who_has))
-                    assert count > 0
-
-                    for ws in random.sample(tuple(workers - ts.who_has), count):
-                        gathers[ws.address][ts.key] = [
-                            wws.address for wws in ts.who_has
-                        ]
-
-                await asyncio.gather(
-                    *(
-                        # Note: this never raises exceptions
-                        self.gather_on_worker(w, who_has)
-                        for w, who_has in gathers.items()
+                    count = min(
+                        n_missing,
+                        branching_factor * len(ts.who_has) - len(receiving[ts]),
                     )
+                    if count <= 0:
+                        # Wait for the transfers in flight
+                        continue
+                    candidates = tuple(workers - ts.who_has - receiving[ts])
+                    for ws in random.sample(candidates, min(count, len(candidates))):
+                        gathers[ws][ts.key] = [wws.address for wws in ts.who_has]
+                        gathered[ws].append(ts)
+                        receiving[ts].add(ws)
+
+                for ws, who_has in gathers.items():
+                    # Note: this never raises exceptions
+                    task = asyncio.create_task(
+                        self.gather_on_worker(ws.address, who_has)
+                    )
+                    in_flight[task] = ws, who_has, gathered[ws]
+                if not in_flight:
+                    break
+
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
                 )
-                for r, v in gathers.items():
-                    self.log_event(r, {"action": "replicate-add", "who_has": v})
+                for task in done:
+                    ws, who_has, tss = in_flight.pop(task)
+                    for ts in tss:
+                        receiving[ts].discard(ws)
+                    self.log_event(
+                        ws.address, {"action": "replicate-add", "who_has": who_has}
+                    )
 
             self.log_event(
                 "all",
@@ -8683,6 +8833,11 @@ class Scheduler(SchedulerState, ServerNode):
 
         if not self.idle_since:
             self.idle_since = time()
+            if self._gc_refreeze_when_idle and (tuner := gc_tuner()):
+                # Collect the reference cycles among the objects of the graphs
+                # that have been computed since they were frozen
+                tuner.refreeze()
+                self._gc_refreeze_when_idle = False
             return self.idle_since
 
         if self.jupyter:
@@ -98,7 +98,7 @@ class ShuffleRun(Generic[_T_partition_id, _T_partition_type]):
         run_id: int,
         span_id: str | None,
         local_address: str,
-        directory: str,
+        directory: str | list[str],
         executor: ThreadPoolExecutor,
         rpc: Callable[[str], PooledRPCCall],
         digest_metric: Callable[[Hashable, float], None],
@@ -5,7 +5,7 @@ import errno
 import pathlib
 import shutil
 import threading
-from collections.abc import Callable, Generator, Iterable
+from collections.abc import Callable, Generator, Iterable, Sequence
 from contextlib import contextmanager
 from typing import Any
 
@@ -114,8 +114,10 @@ class DiskShardsBuffer(ShardsBuffer):
 
     Parameters
     ----------
-    directory : str or pathlib.Path
+    directory : str or pathlib.Path, or a list thereof
         Where to write and read data.  Ideally points to fast disk.
+        If there are multiple directories, e.g. one for each local disk, the files
+        are spread across them in round-robin.
     memory_limiter : ResourceLimiter
         Limiter for in-memory buffering (at most this much data)
         before writes to disk occur. If the incoming data that has yet
@@ -124,9 +126,13 @@ class DiskShardsBuffer(ShardsBuffer):
         implementation of this scheme.
     """
 
+    directories: list[pathlib.Path]
+    #: id -> file where its shards are written
+    _paths: dict[str, pathlib.Path]
+
     def __init__(
         self,
-        directory: str | pathlib.Path,
+        directory: str | pathlib.Path | Sequence[str | pathlib.Path],
         read: Callable[[pathlib.Path], tuple[Any, int]],
         memory_limiter: ResourceLimiter,
     ):
@@ -135,8 +141,12 @@ class DiskShardsBuffer(ShardsBuffer):
             # Disk is not able to run concurrently atm
             concurrency_limit=1,
         )
-        self.directory = pathlib.Path(directory)
-        self.directory.mkdir(exist_ok=True)
+        if isinstance(directory, (str, pathlib.Path)):
+            directory = [directory]
+        self.directories = [pathlib.Path(d) for d in directory]
+        for d in self.directories:
+            d.mkdir(exist_ok=True)
+        self._paths = {}
         self._closed = False
         self._read = read
         self._directory_lock = ReadWriteLock()
@@ -190,7 +200,12 @@ class DiskShardsBuffer(ShardsBuffer):
     def _write_frames(
         self, frames: Iterable[bytes | bytearray | memoryview], id: str
     ) -> None:
-        with open(self.directory / str(id), mode="ab") as f:
+        try:
+            path = self._paths[str(id)]
+        except KeyError:
+            directory = self.directories[len(self._paths) % len(self.directories)]
+            path = self._paths[str(id)] = directory / str(id)
+        with open(path, mode="ab") as f:
             f.writelines(frames)
 
     def read(self, id: str) -> Any:
@@ -203,7 +218,10 @@ class DiskShardsBuffer(ShardsBuffer):
             with self._directory_lock.read():
                 if self._closed:
                     raise RuntimeError("Already closed")
-                fname = (self.directory / str(id)).resolve()
+                try:
+                    fname = self._paths[str(id)].resolve()
+                except KeyError:
+                    raise FileNotFoundError(id)
                 # Note: don't add `with context_meter.meter("p2p-disk-read"):` to
                 # measure seconds here, as it would shadow "p2p-get-output-cpu" and
                 # "p2p-get-output-noncpu". Also, for rechunk it would not measure
@@ -224,5 +242,6 @@ class DiskShardsBuffer(ShardsBuffer):
         await super().close()
         with self._directory_lock.write():
             self._closed = True
-            with contextlib.suppress(FileNotFoundError):
-                shutil.rmtree(self.directory)
+            for directory in self.directories:
+                with contextlib.suppress(FileNotFoundError):
+                    shutil.rmtree(directory)
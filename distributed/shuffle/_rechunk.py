@@ -98,7 +98,6 @@ from __future__ import annotations
 
 import math
 import mmap
-import os
 from collections import defaultdict
 from collections.abc import (
     Callable,
@@ -1143,10 +1142,7 @@ class ArrayRechunkSpec(ShuffleSpec[NDIndex]):
             id=self.id,
             run_id=run_id,
             span_id=span_id,
-            directory=os.path.join(
-                plugin.worker.local_directory,
-                f"shuffle-{self.id}-{run_id}",
-            ),
+            directory=plugin._directory(f"shuffle-{self.id}-{run_id}"),
             executor=plugin._executor,
             local_address=plugin.worker.address,
             rpc=plugin.worker.rpc,
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import logging
-import os
 from collections import defaultdict
 from collections.abc import Callable, Generator, Hashable, Sequence
 from concurrent.futures import ThreadPoolExecutor
@@ -360,10 +359,7 @@ class DataFrameShuffleSpec(ShuffleSpec[int]):
             id=self.id,
             run_id=run_id,
             span_id=span_id,
-            directory=os.path.join(
-                plugin.worker.local_directory,
-                f"shuffle-{self.id}-{run_id}",
-            ),
+            directory=plugin._directory(f"shuffle-{self.id}-{run_id}"),
             executor=plugin._executor,
             local_address=plugin.worker.address,
             rpc=plugin.worker.rpc,
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import os
 from collections import defaultdict
 from collections.abc import Sequence
 from concurrent.futures import ThreadPoolExecutor
@@ -295,6 +296,14 @@ class ShuffleWorkerPlugin(WorkerPlugin):
     def __repr__(self) -> str:
         return f"<ShuffleWorkerPlugin, worker={self.worker.address_safe!r}, closed={self.closed}>"
 
+    def _directory(self, name: str) -> str | list[str]:
+        """Directory where a shuffle run stores its data on disk, or directories to
+        spread it across if the worker spills to multiple local disks
+        """
+        if directories := self.worker.memory_manager.spill_directories:
+            return [os.path.join(d, name) for d in directories]
+        return os.path.join(self.worker.local_directory, name)
+
     # Handlers
     ##########
     # NOTE: handlers are not threadsafe, but they're called from async comms, so that's okay
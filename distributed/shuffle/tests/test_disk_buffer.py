@@ -42,6 +42,26 @@ async def test_basic(tmp_path):
     assert not os.path.exists(tmp_path)
 
 
+@gen_test()
+async def test_multiple_directories(tmp_path):
+    dirs = [tmp_path / "d0", tmp_path / "d1"]
+    async with DiskShardsBuffer(
+        directory=dirs, read=read_bytes, memory_limiter=ResourceLimiter(None)
+    ) as mf:
+        await mf.write({"x": b"0" * 1000, "y": b"1" * 500})
+        await mf.write({"x": b"0" * 1000, "y": b"1" * 500})
+        await mf.flush()
+
+        assert os.listdir(dirs[0]) == ["x"]
+        assert os.listdir(dirs[1]) == ["y"]
+        assert mf.read("x") == b"0" * 2000
+        assert mf.read("y") == b"1" * 1000
+        with pytest.raises(DataUnavailable):
+            mf.read("z")
+
+    assert not any(os.path.exists(d) for d in dirs)
+
+
 @gen_test()
 async def test_read_before_flush(tmp_path):
     payload = {"1": b"foo"}
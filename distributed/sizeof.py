@@ -1,20 +1,73 @@
 from __future__ import annotations
 
+import itertools
 import logging
+import sys
+import threading
+import weakref
+from collections import defaultdict
+from functools import partial
 
 from dask.sizeof import sizeof
-from dask.utils import format_bytes, typename
+from dask.utils import Dispatch, format_bytes, typename
+
+from distributed.metrics import time
 
 logger = logging.getLogger(__name__)
 
+#: Only memoize the output of sizeof() if it took longer than this many seconds
+CACHE_THRESHOLD = 0.001
+#: Estimate the size of dicts with more than this many items from a sample of them
+SAMPLE_THRESHOLD = 1000
+SAMPLE_SIZE = 100
+
+#: id(obj) -> (weak reference to obj, sizeof(obj))
+_cache: dict[int, tuple[weakref.ref, int]] = {}
+# Reentrant, as _evict() may be called by the garbage collector while the lock is held
+_cache_lock = threading.RLock()
+#: (type name, unit) -> ever-increasing cumulative value
+cumulative_metrics: defaultdict[tuple[str, str], float] = defaultdict(float)
+_metrics_lock = threading.Lock()
+
+#: Whether an object can't be modified in place, so that the output of sizeof() can be
+#: memoized for as long as it is alive. Register more types with
+#: ``is_immutable.register(cls)(lambda obj: True)``.
+is_immutable = Dispatch("is_immutable")
+
+
+@is_immutable.register(object)
+def _is_immutable_default(obj: object) -> bool:
+    return False
+
+
+@is_immutable.register_lazy("pyarrow")
+def _register_pyarrow() -> None:
+    import pyarrow as pa
+
+    @is_immutable.register((pa.Array, pa.ChunkedArray, pa.RecordBatch, pa.Table))
+    def _is_immutable_pyarrow(obj: object) -> bool:
+        return True
+
 
 def safe_sizeof(obj: object, default_size: float = 1e6) -> int:
     """Safe variant of sizeof that captures and logs exceptions
 
-    This returns a default size of 1e6 if the sizeof function fails
+    This returns a default size of 1e6 if the sizeof function fails.
+
+    Outputs that were expensive to calculate are memoized for as long as the object is
+    alive, but only for the types registered with :data:`is_immutable`, as the size
+    of mutable objects may change. Objects that don't support weak references are
+    never memoized.
+    The time spent in this function is recorded by type in :data:`cumulative_metrics`.
     """
+    with _cache_lock:
+        entry = _cache.get(id(obj))
+    if entry is not None and entry[0]() is obj:
+        return entry[1]
+
+    start = time()
     try:
-        return sizeof(obj)
+        size = _sampled_sizeof(obj)
     except Exception:
         error_message = (
             f"Sizeof calculation for object of type '{typename(obj)}' failed. "
@@ -23,3 +76,40 @@ def safe_sizeof(obj: object, default_size: float = 1e6) -> int:
         logger.warning(error_message)
         logger.debug(error_message, exc_info=True)
         return int(default_size)
+    elapsed = time() - start
+
+    label = typename(type(obj))
+    with _metrics_lock:
+        cumulative_metrics[label, "seconds"] += elapsed
+        cumulative_metrics[label, "count"] += 1
+
+    if elapsed > CACHE_THRESHOLD and is_immutable(obj):
+        try:
+            ref = weakref.ref(obj, partial(_evict, id(obj)))
+        except TypeError:
+            pass  # e.g. list, dict, tuple
+        else:
+            with _cache_lock:
+                _cache[id(obj)] = ref, size
+    return size
+
+
+def _evict(obj_id: int, ref: weakref.ref) -> None:
+    """Weakref callback, called from whatever thread releases the object"""
+    with _cache_lock:
+        # Don't evict a more recent object which reused the same id
+        entry = _cache.get(obj_id)
+        if entry is not None and entry[0] is ref:
+            del _cache[obj_id]
+
+
+def _sampled_sizeof(obj: object) -> int:
+    """dask.sizeof.sizeof, but estimate the size of large dicts from a sample of their
+    items instead of walking all of them.
+    dask.sizeof already samples lists, tuples, sets, and object-dtype pandas objects.
+    """
+    if type(obj) is not dict or len(obj) <= SAMPLE_THRESHOLD:
+        return sizeof(obj)
+    sample = itertools.islice(obj.items(), SAMPLE_SIZE)
+    sample_size = sum(sizeof(k) + sizeof(v) for k, v in sample)
+    return sys.getsizeof(obj) + int(sample_size * len(obj) / SAMPLE_SIZE)
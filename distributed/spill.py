@@ -1,25 +1,43 @@
 from __future__ import annotations
 
 import logging
+import mmap
+import os
+import struct
+import threading
+import weakref
 from collections import defaultdict
 from collections.abc import (
     Callable,
     Generator,
     Hashable,
+    Iterator,
     Mapping,
     MutableMapping,
+    Sequence,
     Sized,
 )
 from contextlib import contextmanager
 from functools import partial
+from itertools import islice
 from typing import Literal, NamedTuple, Protocol, cast
 
+import msgpack
+
 import zict
 from dask.typing import Key
+from zict.common import NoDefault, ZictBase, nodefault
 
 from distributed.metrics import context_meter
-from distributed.protocol import deserialize_bytes, serialize_bytelist
-from distributed.protocol.compression import get_compression_settings
+from distributed.protocol import Serialized, deserialize_bytes, serialize_bytelist
+from distributed.protocol.compression import decompress, get_compression_settings
+from distributed.protocol.serialize import merge_and_deserialize
+from distributed.protocol.utils import (
+    file_memoryview,
+    pack_frames,
+    pack_frames_prelude,
+    unpack_frames,
+)
 from distributed.sizeof import safe_sizeof
 from distributed.utils import RateLimiterFilter, nbytes
 
@@ -80,32 +98,67 @@ class SpillBuffer(zict.Buffer[Key, object]):
 
     Parameters
     ----------
-    spill_directory: str
-        Location on disk to write the spill files to
+    spill_directory: str | list[str]
+        Location on disk to write the spill files to. If there are multiple
+        directories, e.g. one for each local disk, keys are spread across them;
+        see :class:`StripedStore`.
     target: int
         Managed memory, in bytes, to start spilling at
     max_spill: int | False, optional
-        Limit of number of bytes to be spilled on disk. Set to False to disable.
+        Limit of number of bytes to be spilled on disk, for each spill directory.
+        Set to False to disable.
+    max_compressed: int | False, optional
+        Limit of number of bytes of spilled data to hold in memory, serialized and
+        compressed, before writing it to disk. Set to False to disable.
+    spill_backend: "files" | "log", optional
+        "files" writes each key to its own file. "log" appends keys to a few large
+        files, which are compacted in the background; see :class:`SegmentedLog`.
     """
 
+    fast: NextUseLRU
     logged_pickle_errors: set[Key]
     #: (label, unit) -> ever-increasing cumulative value
     cumulative_metrics: defaultdict[tuple[str, str], float]
 
     def __init__(
         self,
-        spill_directory: str,
+        spill_directory: str | list[str],
         target: int,
         max_spill: int | Literal[False] = False,
+        max_compressed: int | Literal[False] = False,
+        spill_backend: Literal["files", "log"] = "files",
     ):
         # If a value is still in use somewhere on the worker since the last time it was
         # unspilled, don't duplicate it
-        slow = Slow(spill_directory, max_spill)
+        slow = Slow(spill_directory, max_spill, max_compressed, spill_backend)
         slow_cached = zict.Cache(slow, zict.WeakValueMapping())
 
         super().__init__(fast={}, slow=slow_cached, n=target, weight=_in_memory_weight)
+        # Replace the plain LRU created by zict.Buffer.__init__
+        self.fast = NextUseLRU(
+            target,
+            {},
+            weight=_in_memory_weight,
+            on_evict=[self.fast_to_slow],
+            on_cancel_evict=[self._cancel_evict],
+        )
         self.logged_pickle_errors = set()  # keys logged with pickle error
         self.cumulative_metrics = defaultdict(float)
+        # evict() may run in a different thread than the other methods
+        self._metrics_lock = threading.Lock()
+
+    @property
+    def next_use(self) -> Callable[[Key], tuple[int, ...] | None] | None:
+        """Optional function that, given a key, returns the priority of the first task
+        that is going to need it, or None if no task is waiting for it. When set, keys
+        that are not going to be needed soon are spilled first, instead of the least
+        recently used ones. See :class:`NextUseLRU`.
+        """
+        return self.fast.next_use
+
+    @next_use.setter
+    def next_use(self, value: Callable[[Key], tuple[int, ...] | None] | None) -> None:
+        self.fast.next_use = value
 
     @contextmanager
     def _capture_metrics(self) -> Generator[None]:
@@ -120,7 +173,8 @@ class SpillBuffer(zict.Buffer[Key, object]):
 
         def metrics_callback(label: Hashable, value: float, unit: str) -> None:
             assert isinstance(label, str)
-            self.cumulative_metrics[label, unit] += value
+            with self._metrics_lock:
+                self.cumulative_metrics[label, unit] += value
 
         with context_meter.add_callback(metrics_callback):
             yield
@@ -130,10 +184,12 @@ class SpillBuffer(zict.Buffer[Key, object]):
         try:
             yield
         except MaxSpillExceeded as e:
-            # key is in self.fast; no keys have been lost on eviction
+            # key is in self.fast; no keys have been lost on eviction.
+            # When called from evict(), another thread may have deleted the key since.
             (key_e,) = e.args
-            assert key_e in self.fast
-            assert key_e not in self.slow
+            if key is not None:
+                assert key_e in self.fast
+                assert key_e not in self.slow
             logger.warning(
                 "Spill file on disk reached capacity; keeping data in memory"
             )
@@ -143,8 +199,9 @@ class SpillBuffer(zict.Buffer[Key, object]):
             logger.error("Spill to disk failed; keeping data in memory", exc_info=True)
             raise HandledError()
         except PickleError as e:
-            assert e.key in self.fast
-            assert e.key not in self.slow
+            if key is not None:
+                assert e.key in self.fast
+                assert e.key not in self.slow
             if e.key == key:
                 assert key is not None
                 # The key we just inserted failed to serialize.
@@ -199,7 +256,12 @@ class SpillBuffer(zict.Buffer[Key, object]):
         If the eviction failed (value failed to pickle, disk full, or max_spill
         exceeded), return -1; the key/value pair that caused the issue will remain in
         fast. The exception has been logged internally.
+        If there is nothing to evict, or if the key was deleted or updated by another
+        thread while it was being evicted, return 0.
         This method never raises.
+
+        This method is thread-safe, as long as all other accesses happen from a single
+        thread; see :meth:`WorkerMemoryManager._spill`.
         """
         try:
             with self._capture_metrics(), self._handle_errors(None):
@@ -207,6 +269,9 @@ class SpillBuffer(zict.Buffer[Key, object]):
                 return cast(int, weight)
         except HandledError:
             return -1
+        except KeyError:
+            # Race condition: fast was emptied by another thread
+            return 0
 
     def __getitem__(self, key: Key) -> object:
         with self._capture_metrics():
@@ -232,6 +297,52 @@ class SpillBuffer(zict.Buffer[Key, object]):
             "It may cause data to be read back from disk! Please use `del` instead."
         )
 
+    def get_for_transfer(self, key: Key) -> object:
+        """Return the value for key if it is in memory; otherwise, return its spilled
+        serialized form, without unspilling it and without evicting anything else.
+        Large frames are not read from disk, but memory-mapped; see
+        :meth:`AnyKeyFile.get_frames`.
+        """
+        if key in self.fast:
+            return self[key]
+        try:
+            # Spilled, but still referenced elsewhere
+            return cast(zict.Cache, self.slow).cache[key]
+        except KeyError:
+            pass
+        with self._capture_metrics():
+            return self._slow_uncached.get_serialized(key)
+
+    def prefetch(self, key: Key) -> bool:
+        """Unspill a key ahead of it being needed, but only if it fits in fast without
+        exceeding target, so that it does not cause other keys to be spilled.
+
+        Returns False if there is not enough room in fast; True otherwise, including
+        when the key is not spilled, e.g. because it was unspilled or deleted by another
+        thread in the meantime.
+
+        This method is thread-safe, like :meth:`evict`.
+        """
+        try:
+            weight = self._slow_uncached.weight_by_key[key].memory
+        except KeyError:
+            return True  # Not spilled
+        if self.fast.total_weight + weight > self.n:
+            return False
+        slow = self._slow_uncached
+        slow.prefetching.active = True
+        try:
+            with self._capture_metrics():
+                super().__getitem__(key)
+        except (KeyError, OSError):
+            # Deleted by another thread, or it was not possible to read it back from
+            # disk. In the latter case, the error will be raised again when the key is
+            # actually needed.
+            pass
+        finally:
+            slow.prefetching.active = False
+        return True
+
     @property
     def memory(self) -> Mapping[Key, object]:
         """Key/value pairs stored in RAM. Alias of zict.Buffer.fast.
@@ -253,21 +364,84 @@ class SpillBuffer(zict.Buffer[Key, object]):
 
     @property
     def spilled_total(self) -> SpilledSize:
-        """Number of bytes spilled to disk. Tuple of
+        """Number of bytes spilled out of fast. Tuple of
 
-        - output of sizeof()
-        - pickled size
+        - output of sizeof(), including the keys held in compressed memory
+        - pickled size on disk, excluding the keys held in compressed memory
 
         The two may differ substantially, e.g. if sizeof() is inaccurate or in case of
         compression.
         """
-        return self._slow_uncached.total_weight
+        slow = self._slow_uncached
+        return SpilledSize(slow.total_weight.memory, slow.disk_weight)
+
+    @property
+    def compressed_total(self) -> int:
+        """Number of bytes of spilled data held in memory, serialized and compressed"""
+        return self._slow_uncached.compressed_weight
+
+    @property
+    def striped_store(self) -> StripedStore | None:
+        """Per-directory spill sizes and metrics, if there are multiple spill
+        directories
+        """
+        d = self._slow_uncached.d
+        return d if isinstance(d, StripedStore) else None
 
 
 def _in_memory_weight(key: Key, value: object) -> int:
     return safe_sizeof(value)
 
 
+# Number of least recently used keys that NextUseLRU considers for eviction.
+# This caps the cost of choosing a key when there are many keys in memory.
+NEXT_USE_CANDIDATES = 256
+
+
+class NextUseLRU(zict.LRU[Key, object]):
+    """LRU mapping that, when it needs to evict a key, picks the one that is going to
+    be needed last by the tasks waiting to run on the worker, instead of the least
+    recently used one:
+
+    1. keys that no task is waiting for, in LRU order;
+    2. keys whose first waiting task has the lowest priority.
+
+    Only the :data:`NEXT_USE_CANDIDATES` least recently used keys are considered.
+    Heavy keys, which individually exceed the target, are always evicted first.
+    Without a ``next_use`` function, this behaves exactly like :class:`zict.LRU`.
+    """
+
+    #: See :attr:`SpillBuffer.next_use`
+    next_use: Callable[[Key], tuple[int, ...] | None] | None = None
+
+    def evict(
+        self, key: Key | NoDefault = nodefault
+    ) -> tuple[Key, object, float] | tuple[None, None, float]:
+        if key is nodefault and self.next_use is not None:
+            # Don't hold the lock while super().evict() spills the key; it releases it
+            # only once. If the key is deleted in the meantime, it raises KeyError.
+            with self.lock:
+                if not self.heavy:
+                    key = self._pick_key()
+        return super().evict(key)
+
+    def _pick_key(self) -> Key | NoDefault:
+        assert self.next_use is not None
+        best_key: Key | NoDefault = nodefault
+        best_priority: tuple[int, ...] | None = None
+        for key in islice(self.order, NEXT_USE_CANDIDATES):
+            if key in self._cancel_evict:
+                # Being evicted by another thread
+                continue
+            priority = self.next_use(key)
+            if priority is None:
+                return key
+            if best_priority is None or priority > best_priority:
+                best_key = key
+                best_priority = priority
+        return best_key
+
+
 # Internal exceptions. These are never raised by SpillBuffer.
 class MaxSpillExceeded(Exception):
     pass
@@ -286,18 +460,543 @@ class HandledError(Exception):
     pass
 
 
+# Frames at least this large are memory-mapped by AnyKeyFile.get_frames instead of
+# being read. This is the threshold under which TCP concatenates all frames of a
+# message into a single buffer.
+MMAP_THRESHOLD = 2**17
+
+
+def _frame_offsets(lengths: Sequence[int], start: int = 0) -> list[int]:
+    """Offsets of the frames of a value written by :class:`AnyKeyFile` or
+    :class:`SegmentedLog` at offset ``start`` of a file, after the prelude.
+    Frames that are going to be memory-mapped start on a page boundary, so that the
+    mapping doesn't need to cover the tail of the previous frame and so that the
+    buffers of deserialized arrays are aligned.
+    """
+    offset = start + 8 * (len(lengths) + 1)
+    offsets = []
+    for length in lengths:
+        if length >= MMAP_THRESHOLD:
+            offset += -offset % mmap.PAGESIZE
+        offsets.append(offset)
+        offset += length
+    return offsets
+
+
+def _pad_frames(
+    frames: Sequence[bytes | bytearray | memoryview], start: int = 0
+) -> tuple[list[bytes | bytearray | memoryview], int]:
+    """Lay out frames to be written at offset ``start`` of a file, as expected by
+    :func:`_frame_offsets`. Return the buffers to write, prelude and padding included,
+    and the offset where they end.
+    """
+    lengths = [nbytes(frame) for frame in frames]
+    out = [pack_frames_prelude(frames)]
+    offset = start + len(out[0])
+    for frame, frame_offset, length in zip(
+        frames, _frame_offsets(lengths, start), lengths
+    ):
+        if frame_offset > offset:
+            out.append(bytes(frame_offset - offset))
+        out.append(frame)
+        offset = frame_offset + length
+    return out, offset
+
+
+def _read_frames(
+    fd: int, start: int = 0, *, writeable: bool = False
+) -> list[bytes | memoryview]:
+    """Read back the frames written by :func:`_pad_frames` at offset ``start`` of an
+    open file. See :meth:`AnyKeyFile.get_frames`.
+    """
+    (nframes,) = struct.unpack("Q", os.pread(fd, 8, start))
+    lengths = struct.unpack(f"{nframes}Q", os.pread(fd, 8 * nframes, start + 8))
+    frames: list[bytes | memoryview] = []
+    for offset, length in zip(_frame_offsets(lengths, start), lengths):
+        if length < MMAP_THRESHOLD:
+            frame = os.pread(fd, length, offset)
+            assert len(frame) == length
+            frames.append(frame)
+        else:
+            frames.append(file_memoryview(fd, offset, length, writeable=writeable))
+    return frames
+
+
+def _populate(frame: memoryview) -> None:
+    """Read all pages of a memory-mapped frame from disk"""
+    mm = cast(mmap.mmap, frame.obj)
+    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+        # Let the kernel read the whole mapping ahead, instead of page by page
+        mm.madvise(mmap.MADV_WILLNEED)
+    # Touch one byte of every page
+    frame[:: mmap.PAGESIZE].tobytes()
+
+
+def _on_unmap(frames: Sequence[bytes | memoryview], callback: Callable) -> int:
+    """Call ``callback()`` whenever one of the memory-mapped frames returned by
+    :func:`_read_frames` is garbage collected. Return the number of such frames.
+    """
+    n = 0
+    for frame in frames:
+        if isinstance(frame, memoryview):
+            weakref.finalize(frame.obj, callback).atexit = False
+            n += 1
+    return n
+
+
 class AnyKeyFile(zict.File):
+    #: Bytes on disk that are not used by any key. These are the files that have been
+    #: deleted, but are kept alive by the memory maps returned by get_frames().
+    dead_bytes: int
+    #: file name -> [number of live memory maps of the file, size of the file,
+    #: whether the file has been deleted]
+    _maps: dict[str, list]
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.dead_bytes = 0
+        self._maps = {}
+
     def _safe_key(self, key: Key) -> str:
         # We don't need _proper_ stringification, just a unique mapping
         return super()._safe_key(str(key))
 
+    def __setitem__(  # type: ignore[override]
+        self, key: Key, value: list[bytes | bytearray | memoryview]
+    ) -> None:
+        """Write the output of :func:`~distributed.protocol.serialize_bytelist`.
+        Large frames are padded to start on a page boundary; see :func:`_frame_offsets`.
+        """
+        if not hasattr(os, "pread"):  # Windows; see get_frames()
+            super().__setitem__(key, value)
+            return
+
+        out, _ = _pad_frames(value[1:])  # Discard prelude
+        super().__setitem__(key, out)
+
+    def get_frames(
+        self, key: Key, *, writeable: bool = False
+    ) -> list[bytes | memoryview]:
+        """Read back the frames of a value that was written by
+        :func:`~distributed.protocol.serialize_bytelist`, without the prelude.
+
+        Large frames are returned as memory maps of the file, which are paged in lazily
+        and remain valid after the file is deleted. If writeable=False, they are
+        read-only and can be sent over the network with ``os.sendfile()``; otherwise
+        they are private copy-on-write mappings, which can be deserialized into
+        writeable arrays without copying them. See :func:`file_memoryview`.
+        """
+        if not hasattr(os, "pread"):  # Windows
+            return list(unpack_frames(self[key]))
+
+        with self.lock:
+            fname = self.filenames[key]
+            fd = os.open(os.path.join(self.directory, fname), os.O_RDONLY)
+        try:
+            frames = _read_frames(fd, writeable=writeable)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+        with self.lock:
+            entry = self._maps.setdefault(fname, [0, size, False])
+            entry[0] += _on_unmap(frames, partial(self._unmap, fname))
+            if not entry[0]:
+                del self._maps[fname]
+        return frames
+
+    def __delitem__(self, key: Key) -> None:
+        with self.lock:
+            fname = self.filenames[key]
+            super().__delitem__(key)
+            # The disk space won't be freed until the file is unmapped
+            entry = self._maps.get(fname)
+            if entry:
+                entry[2] = True
+                self.dead_bytes += entry[1]
+
+    def _unmap(self, fname: str) -> None:
+        with self.lock:
+            entry = self._maps[fname]
+            entry[0] -= 1
+            if not entry[0]:
+                del self._maps[fname]
+                if entry[2]:
+                    self.dead_bytes -= entry[1]
+
+
+# A new segment of SegmentedLog is started when the current one reaches this size
+SEGMENT_SIZE = 2**28
+# Segments of SegmentedLog are compacted when at least this fraction of their size is
+# taken by deleted keys
+COMPACTION_THRESHOLD = 0.5
+
+
+class _Segment:
+    """Append-only file of a :class:`SegmentedLog`"""
+
+    __slots__ = ("path", "fd", "size", "live", "maps")
+
+    path: str
+    fd: int
+    #: Bytes written or reserved so far
+    size: int
+    #: Bytes used by keys that have not been deleted, padding included
+    live: int
+    #: Number of live memory maps of the file returned by SegmentedLog.get_frames()
+    maps: int
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        self.size = 0
+        self.live = 0
+        self.maps = 0
+
+    def delete(self) -> None:
+        os.close(self.fd)
+        os.unlink(self.path)
+
+
+class SegmentedLog(ZictBase[Key, bytes]):
+    """Alternative to :class:`AnyKeyFile`, which appends all spilled values to a few
+    large segment files instead of creating and deleting one file per key. This is much
+    lighter on the file system when there are many small keys.
+
+    An in-memory index maps each key to its location. Deleting a key only marks its
+    space as dead; a segment file is deleted as soon as it doesn't contain any live
+    keys anymore. Once the current segment reaches ``segment_size``, a new one is
+    started; older segments where dead space exceeds :data:`COMPACTION_THRESHOLD` are
+    compacted by a background thread, which moves their live keys to the current
+    segment.
+
+    The disk space of a deleted segment is not freed for as long as any of its values
+    is memory-mapped, e.g. because it was unspilled with ``get_frames()``; until then
+    it is still counted in ``dead_bytes``.
+
+    Values are laid out like in :class:`AnyKeyFile`. This requires ``os.pwrite`` and
+    is not available on Windows.
+    """
+
+    directory: str
+    segment_size: int
+    #: segment id -> segment
+    segments: dict[int, _Segment]
+    #: key -> (segment id, start offset, end offset)
+    index: dict[Key, tuple[int, int, int]]
+    #: Bytes on disk that are not used by any key and have not been compacted yet, or
+    #: that belong to deleted segments that are still memory-mapped
+    dead_bytes: int
+    _current: int
+    #: Deleted segments that are still memory-mapped
+    _unlinked: set[_Segment]
+    #: segment id -> thread compacting it
+    _compacting: dict[int, threading.Thread]
+
+    def __init__(self, directory: str, segment_size: int = SEGMENT_SIZE):
+        if not hasattr(os, "pwrite"):
+            raise NotImplementedError("SegmentedLog is not supported on this platform")
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.segment_size = segment_size
+        self.segments = {}
+        self.index = {}
+        self.dead_bytes = 0
+        self._current = -1
+        self._compacting = {}
+        self._unlinked = set()
+
+    def __getitem__(self, key: Key) -> bytes:
+        return pack_frames(self.get_frames(key))
+
+    def get_frames(
+        self, key: Key, *, writeable: bool = False
+    ) -> list[bytes | memoryview]:
+        """See :meth:`AnyKeyFile.get_frames`"""
+        with self.lock:
+            segment_id, start, _ = self.index[key]
+            segment = self.segments[segment_id]
+            frames = _read_frames(segment.fd, start, writeable=writeable)
+            segment.maps += _on_unmap(frames, partial(self._unmap, segment))
+            return frames
+
+    def _unmap(self, segment: _Segment) -> None:
+        with self.lock:
+            segment.maps -= 1
+            if not segment.maps and segment in self._unlinked:
+                self._unlinked.remove(segment)
+                self.dead_bytes -= segment.size
+
+    def __setitem__(  # type: ignore[override]
+        self, key: Key, value: list[bytes | bytearray | memoryview]
+    ) -> None:
+        """Write the output of :func:`~distributed.protocol.serialize_bytelist`"""
+        self.discard(key)
+        location = self._append(value[1:])  # Discard prelude
+        with self.lock:
+            if key in self.index:
+                # Race condition: two calls to __setitem__ from different threads on
+                # the same key at the same time
+                self._release(*location)
+            else:
+                self.index[key] = location
+
+    def _append(
+        self, frames: Sequence[bytes | bytearray | memoryview]
+    ) -> tuple[int, int, int]:
+        """Write frames at the end of the current segment. The space is reserved while
+        holding the lock, but written without it.
+        """
+        with self.lock:
+            segment = self.segments.get(self._current)
+            if segment is None or segment.size >= self.segment_size:
+                old = self._current
+                self._current += 1
+                segment = _Segment(
+                    os.path.join(self.directory, f"segment-{self._current}")
+                )
+                self.segments[self._current] = segment
+                if old in self.segments:
+                    # The old segment is no longer current; it can now be deleted or
+                    # compacted
+                    self._maybe_compact(old)
+            segment_id = self._current
+            start = segment.size
+            out, end = _pad_frames(frames, start)
+            segment.size = end
+            segment.live += end - start
+
+        try:
+            offset = start
+            for buf in out:
+                mv = memoryview(buf).cast("B")
+                while mv:
+                    n = os.pwrite(segment.fd, mv, offset)
+                    mv = mv[n:]
+                    offset += n
+        except BaseException:
+            with self.lock:
+                self._release(segment_id, start, end)
+            raise
+        return segment_id, start, end
+
+    def __delitem__(self, key: Key) -> None:
+        with self.lock:
+            self._release(*self.index.pop(key))
+
+    def _release(self, segment_id: int, start: int, end: int) -> None:
+        """Mark space as dead. Must be called while holding the lock."""
+        self.segments[segment_id].live -= end - start
+        self.dead_bytes += end - start
+        self._maybe_compact(segment_id)
+
+    def _maybe_compact(self, segment_id: int) -> None:
+        """Delete a segment if it's all dead space, or compact an old segment if it's
+        mostly dead space. Must be called while holding the lock.
+        """
+        if segment_id in self._compacting:
+            return
+        segment = self.segments[segment_id]
+        if not segment.live:
+            # If this is the current segment, _append() will start a new one
+            del self.segments[segment_id]
+            segment.delete()
+            if segment.maps:
+                # The disk space won't be freed until the file is unmapped
+                self._unlinked.add(segment)
+            else:
+                self.dead_bytes -= segment.size
+        elif (
+            segment_id != self._current
+            and segment.size - segment.live >= segment.size * COMPACTION_THRESHOLD
+        ):
+            thread = threading.Thread(
+                target=self._compact,
+                args=(segment_id,),
+                name="Dask-Spill-Compaction",
+                daemon=True,
+            )
+            self._compacting[segment_id] = thread
+            thread.start()
+
+    def _compact(self, segment_id: int) -> None:
+        """Move all live keys of an old segment to the current one, then delete it"""
+        with self.lock:
+            keys = [k for k, loc in self.index.items() if loc[0] == segment_id]
+        try:
+            for key in keys:
+                with self.lock:
+                    location = self.index.get(key)
+                    if location is None or location[0] != segment_id:
+                        continue  # Deleted in the meantime
+                    frames = _read_frames(self.segments[segment_id].fd, location[1])
+                new_location = self._append(frames)
+                with self.lock:
+                    if self.index.get(key) == location:
+                        self.index[key] = new_location
+                        self._release(*location)
+                    else:
+                        self._release(*new_location)
+        except Exception:
+            # Typically, this is a disk full error. Leave the segment as it is.
+            logger.error("Failed to compact spill segment", exc_info=True)
+            with self.lock:
+                del self._compacting[segment_id]
+            return
+
+        with self.lock:
+            del self._compacting[segment_id]
+            self._maybe_compact(segment_id)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.index
+
+    def __iter__(self) -> Iterator[Key]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def close(self) -> None:
+        """Wait for compaction to complete and delete all segment files"""
+        for thread in list(self._compacting.values()):
+            thread.join()
+        with self.lock:
+            for segment in self.segments.values():
+                segment.delete()
+                if segment.maps:
+                    self._unlinked.add(segment)
+            self.segments.clear()
+            self.index.clear()
+            self.dead_bytes = sum(segment.size for segment in self._unlinked)
+
+
+class StripedStore(ZictBase[Key, bytes]):
+    """Spread spilled keys across several :class:`AnyKeyFile` or :class:`SegmentedLog`,
+    typically one for each local disk, so that spilling can use the bandwidth of all
+    of them. Keys are assigned in round-robin, skipping the stores that would exceed
+    ``max_weight``.
+    """
+
+    stores: list[AnyKeyFile | SegmentedLog]
+    directories: list[str]
+    #: Maximum number of bytes on disk for each store, or False for no limit
+    max_weight: int | Literal[False]
+    #: Number of bytes on disk of the live keys of each store
+    weights: list[int]
+    #: key -> (index of the store, number of bytes)
+    location: dict[Key, tuple[int, int]]
+    #: (directory, activity, unit) -> ever-increasing cumulative value
+    cumulative_metrics: defaultdict[tuple[str, str, str], float]
+    _next: int
+
+    def __init__(
+        self,
+        stores: list[AnyKeyFile | SegmentedLog],
+        directories: list[str],
+        max_weight: int | Literal[False] = False,
+    ):
+        super().__init__()
+        self.stores = stores
+        self.directories = directories
+        self.max_weight = max_weight
+        self.weights = [0] * len(stores)
+        self.location = {}
+        self.cumulative_metrics = defaultdict(float)
+        self._next = 0
+
+    @property
+    def dead_bytes(self) -> int:
+        return sum(store.dead_bytes for store in self.stores)
+
+    def __getitem__(self, key: Key) -> bytes:
+        return pack_frames(self.get_frames(key))
+
+    def get_frames(
+        self, key: Key, *, writeable: bool = False
+    ) -> list[bytes | memoryview]:
+        """See :meth:`AnyKeyFile.get_frames`"""
+        i, size = self.location[key]
+        frames = self.stores[i].get_frames(key, writeable=writeable)
+        with self.lock:
+            self.cumulative_metrics[self.directories[i], "disk-read", "count"] += 1
+            self.cumulative_metrics[self.directories[i], "disk-read", "bytes"] += size
+        return frames
+
+    def __setitem__(  # type: ignore[override]
+        self, key: Key, value: list[bytes | bytearray | memoryview]
+    ) -> None:
+        size = sum(map(nbytes, value))
+        with self.lock:
+            assert key not in self.location
+            for _ in self.stores:
+                i = self._next
+                self._next = (i + 1) % len(self.stores)
+                if self.max_weight is False or (
+                    self.weights[i] + self.stores[i].dead_bytes + size
+                    <= self.max_weight
+                ):
+                    break
+            else:
+                # All stores are full. To be caught by SpillBuffer.__setitem__
+                raise MaxSpillExceeded(key)
+            self.weights[i] += size
+            self.location[key] = i, size
+
+        try:
+            self.stores[i][key] = value
+        except BaseException:
+            with self.lock:
+                self.weights[i] -= size
+                del self.location[key]
+            raise
+
+        with self.lock:
+            self.cumulative_metrics[self.directories[i], "disk-write", "count"] += 1
+            self.cumulative_metrics[self.directories[i], "disk-write", "bytes"] += size
+
+    def __delitem__(self, key: Key) -> None:
+        with self.lock:
+            i, size = self.location.pop(key)
+            self.weights[i] -= size
+        del self.stores[i][key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.location
+
+    def __iter__(self) -> Iterator[Key]:
+        return iter(self.location)
+
+    def __len__(self) -> int:
+        return len(self.location)
+
+    def close(self) -> None:
+        for store in self.stores:
+            store.close()
+
 
 class Slow(zict.Func[Key, object, bytes]):
     max_weight: int | Literal[False]
+    max_compressed: int | Literal[False]
     weight_by_key: dict[Key, SpilledSize]
     total_weight: SpilledSize
+    #: Spilled values that are held in memory, serialized and compressed, before they
+    #: are written to disk. When it exceeds max_compressed, the oldest values are
+    #: written to disk first.
+    compressed: dict[Key, bytes]
+    #: Total size of the values in compressed
+    compressed_weight: int
+    #: ``active`` is True in the thread that is running :meth:`SpillBuffer.prefetch`
+    prefetching: threading.local
 
-    def __init__(self, spill_directory: str, max_weight: int | Literal[False] = False):
+    def __init__(
+        self,
+        spill_directory: str | list[str],
+        max_weight: int | Literal[False] = False,
+        max_compressed: int | Literal[False] = False,
+        backend: Literal["files", "log"] = "files",
+    ):
         compression = get_compression_settings(
             "distributed.worker.memory.spill-compression"
         )
@@ -309,24 +1008,86 @@ class Slow(zict.Func[Key, object, bytes]):
         # asymmetric VT in __getitem__ and __setitem__.
         dump = cast(
             Callable[[object], bytes],
-            partial(serialize_bytelist, compression=compression, on_error="raise"),
-        )
-        super().__init__(
-            dump,
-            deserialize_bytes,
-            cast(MutableMapping[Key, bytes], AnyKeyFile(spill_directory)),
+            partial(
+                serialize_bytelist,
+                compression=compression,
+                blocks=True,
+                on_error="raise",
+            ),
         )
+        if backend == "files":
+            store_cls: type[AnyKeyFile | SegmentedLog] = AnyKeyFile
+        elif backend == "log":
+            store_cls = SegmentedLog
+        else:
+            raise ValueError(f"Invalid spill backend: {backend!r}")
+        d: AnyKeyFile | SegmentedLog | StripedStore
+        if not isinstance(spill_directory, list):
+            d = store_cls(spill_directory)
+        elif len(spill_directory) == 1:
+            d = store_cls(spill_directory[0])
+        else:
+            # max_weight applies to each directory individually
+            d = StripedStore(
+                [store_cls(path) for path in spill_directory],
+                spill_directory,
+                max_weight,
+            )
+        super().__init__(dump, deserialize_bytes, cast(MutableMapping[Key, bytes], d))
         self.max_weight = max_weight
+        self.max_compressed = max_compressed
         self.weight_by_key = {}
         self.total_weight = SpilledSize(0, 0)
+        self.compressed = {}
+        self.compressed_weight = 0
+        self.prefetching = threading.local()
+
+    @property
+    def disk_weight(self) -> int:
+        """Number of bytes spilled to disk, excluding those held in compressed and
+        including space on disk that is waiting to be reclaimed by compaction
+        """
+        return (
+            self.total_weight.disk
+            - self.compressed_weight
+            + cast("AnyKeyFile | SegmentedLog | StripedStore", self.d).dead_bytes
+        )
 
     def __getitem__(self, key: Key) -> object:
-        with context_meter.meter("disk-read", "seconds"):
-            pickled = self.d[key]
-        context_meter.digest_metric("disk-read", 1, "count")
-        context_meter.digest_metric("disk-read", len(pickled), "bytes")
-        out = self.load(pickled)
-        return out
+        """Unspill a value. Large uncompressed frames, e.g. the buffers of numpy arrays,
+        are not read from disk; the deserialized object is backed by a memory map of
+        the spill file instead. See :meth:`AnyKeyFile.get_frames`.
+
+        When prefetching, the memory maps are paged in right away, so that the task
+        that uses the value doesn't wait for the disk.
+        """
+        ser = self._get_serialized(key, writeable=True)
+        if getattr(self.prefetching, "active", False):
+            for frame in ser.frames:
+                if isinstance(frame, memoryview) and isinstance(frame.obj, mmap.mmap):
+                    _populate(frame)
+        frames = decompress(ser.header, ser.frames)
+        return merge_and_deserialize(ser.header, frames)
+
+    def get_serialized(self, key: Key) -> Serialized:
+        """Return the spilled value for key in serialized form, as it would be
+        sent over the network. See :meth:`AnyKeyFile.get_frames`.
+        """
+        return self._get_serialized(key, writeable=False)
+
+    def _get_serialized(self, key: Key, writeable: bool) -> Serialized:
+        try:
+            frames = unpack_frames(self.compressed[key])
+        except KeyError:
+            with context_meter.meter("disk-read", "seconds"):
+                d = cast("AnyKeyFile | SegmentedLog | StripedStore", self.d)
+                frames = d.get_frames(key, writeable=writeable)
+            context_meter.digest_metric("disk-read", 1, "count")
+            # Include the prelude, to match disk-write
+            nbytes_read = sum(map(nbytes, frames)) + 8 * (len(frames) + 1)
+            context_meter.digest_metric("disk-read", nbytes_read, "bytes")
+        header = msgpack.loads(frames[0], raw=False, use_list=False)
+        return Serialized(header, frames[1:])
 
     def __setitem__(self, key: Key, value: object) -> None:
         try:
@@ -340,13 +1101,53 @@ class Slow(zict.Func[Key, object, bytes]):
         # Thanks to Buffer.__setitem__, we never update existing
         # keys in slow, but always delete them and reinsert them.
         assert key not in self.d
+        assert key not in self.compressed
         assert key not in self.weight_by_key
 
         pickled_size = sum(map(nbytes, pickled))
+        weight = SpilledSize(safe_sizeof(value), pickled_size)
 
+        if (
+            self.max_compressed is not False
+            and pickled_size <= self.max_compressed
+            # Don't hold in memory values that wouldn't take less space than before
+            and pickled_size < weight.memory
+        ):
+            # Copy the frames into a single buffer. Besides reducing fragmentation,
+            # this releases uncompressed frames, which may be views of value.
+            buf = b"".join(pickled)
+            # SpillBuffer.evict() may run in a separate thread from everything else.
+            # Moving values from compressed to disk is not atomic, so hold the lock
+            # throughout; these are small writes.
+            with self.lock:
+                # Make room by writing the oldest compressed values to disk
+                while self.compressed_weight + pickled_size > self.max_compressed:
+                    old_key = next(iter(self.compressed))
+                    old_frames = unpack_frames(self.compressed[old_key])
+                    try:
+                        self._write(
+                            old_key, [pack_frames_prelude(old_frames), *old_frames]
+                        )
+                    except MaxSpillExceeded:
+                        raise MaxSpillExceeded(key)
+                    self.compressed_weight -= nbytes(self.compressed.pop(old_key))
+                self.compressed[key] = buf
+                self.compressed_weight += pickled_size
+                self.weight_by_key[key] = weight
+                self.total_weight += weight
+        else:
+            self._write(key, pickled)
+            with self.lock:
+                self.weight_by_key[key] = weight
+                self.total_weight += weight
+
+    def _write(self, key: Key, pickled: list[bytes | bytearray | memoryview]) -> None:
+        pickled_size = sum(map(nbytes, pickled))
         if (
             self.max_weight is not False
-            and self.total_weight.disk + pickled_size > self.max_weight
+            # StripedStore applies max_weight to each directory
+            and not isinstance(self.d, StripedStore)
+            and self.disk_weight + pickled_size > self.max_weight
         ):
             # Stop callbacks and ensure that the key ends up in SpillBuffer.fast
             # To be caught by SpillBuffer.__setitem__
@@ -355,14 +1156,24 @@ class Slow(zict.Func[Key, object, bytes]):
         # Store to disk through File.
         # This may raise OSError, which is caught by SpillBuffer above.
         with context_meter.meter("disk-write", "seconds"):
-            self.d[key] = pickled
+            self.d[key] = cast(bytes, pickled)
         context_meter.digest_metric("disk-write", 1, "count")
         context_meter.digest_metric("disk-write", pickled_size, "bytes")
 
-        weight = SpilledSize(safe_sizeof(value), pickled_size)
-        self.weight_by_key[key] = weight
-        self.total_weight += weight
+    def __contains__(self, key: object) -> bool:
+        return key in self.compressed or key in self.d
+
+    def __iter__(self) -> Iterator[Key]:
+        yield from self.compressed
+        yield from self.d
+
+    def __len__(self) -> int:
+        return len(self.compressed) + len(self.d)
 
     def __delitem__(self, key: Key) -> None:
-        super().__delitem__(key)
-        self.total_weight -= self.weight_by_key.pop(key)
+        with self.lock:
+            try:
+                self.compressed_weight -= nbytes(self.compressed.pop(key))
+            except KeyError:
+                super().__delitem__(key)
+            self.total_weight -= self.weight_by_key.pop(key)
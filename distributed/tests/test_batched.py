@@ -6,6 +6,8 @@ import random
 import pytest
 from tlz import assoc
 
+import dask
+
 from distributed.batched import BatchedSend
 from distributed.core import CommClosedError, connect, listen
 from distributed.metrics import time
@@ -254,3 +256,96 @@ async def test_serializers():
         assert "function" in value
 
         assert comm.closed()
+
+
+@gen_test()
+async def test_flush_size():
+    """A burst of messages larger than flush-size is sent right away, in several
+    batches, without waiting for the interval
+    """
+    with dask.config.set({"distributed.comm.batched-send.flush-size": "10kB"}):
+        async with EchoServer() as e:
+            comm = await connect(e.address)
+            b = BatchedSend(interval="10s")
+            b.start(comm)
+            b.send({"x": b"0" * 100})
+            assert len(await comm.read()) == 1
+
+            start = time()
+            for i in range(1000):
+                b.send({"x": b"0" * 100, "i": i})
+            results = []
+            while len(results) < 1000:
+                msgs = await comm.read()
+                assert len(msgs) <= 100
+                results.extend(msg["i"] for msg in msgs)
+            assert results == list(range(1000))
+            assert time() < start + 5
+            assert b.batch_count > 10
+            await comm.close()
+            await b.close()
+
+
+@gen_test()
+async def test_priority_ops():
+    async with EchoServer() as e:
+        comm = await connect(e.address)
+        b = BatchedSend(interval="10s")
+        b.start(comm)
+        b.send("hello")
+        assert await comm.read() == ("hello",)
+
+        before = BatchedSend.queued_messages["steal-request"]
+        start = time()
+        b.send({"op": "foo"})
+        b.send({"op": "steal-request", "key": "x"})
+        # Messages queued before are sent first
+        assert await comm.read() == ({"op": "foo"}, {"op": "steal-request", "key": "x"})
+        assert time() < start + 5
+        assert BatchedSend.queued_messages["steal-request"] == before + 1
+        assert BatchedSend.queueing_delay["steal-request"] > 0
+
+        with dask.config.set({"distributed.comm.batched-send.priority-ops": []}):
+            b2 = BatchedSend(interval="10s")
+        b2.start(comm)
+        b2.send("hello")
+        assert await comm.read() == ("hello",)
+        b2.send({"op": "steal-request", "key": "x"})
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for(comm.read(), 0.2)
+
+        await comm.close()
+        await b.close()
+        await b2.close()
+
+
+@pytest.mark.parametrize("adaptive", [True, False])
+@gen_test()
+async def test_adaptive_interval(adaptive):
+    with dask.config.set(
+        {
+            "distributed.comm.batched-send.adaptive-interval.enabled": adaptive,
+            "distributed.comm.batched-send.adaptive-interval.minimum": "1ms",
+            "distributed.comm.batched-send.adaptive-interval.target-length": 10,
+        }
+    ):
+        async with EchoServer() as e:
+            comm = await connect(e.address)
+            b = BatchedSend(interval="50ms")
+            b.start(comm)
+            for i in range(50):
+                for j in range(20):
+                    b.send(i * 20 + j)
+                await asyncio.sleep(0.005)
+            assert b.message_rate > 0
+            if adaptive:
+                assert b.min_interval <= b.current_interval < b.interval
+            else:
+                assert b.current_interval == b.interval
+
+            results = []
+            while len(results) < 1000:
+                results.extend(await comm.read())
+            assert results == list(range(1000))
+            await comm.close()
+            await b.close()
@@ -237,6 +237,33 @@ def test_heapset_sorted_flag_left():
     assert_heap_sorted(heap)
 
 
+@pytest.mark.parametrize("seed", range(20))
+def test_heapset_peekn(seed):
+    """peekn() returns the same as sorted() without sorting the heap, including when
+    elements have been discarded and re-added
+    """
+    rng = random.Random(seed)
+    heap = HeapSet(key=operator.attrgetter("i"))
+    cs = [C(str(i), rng.randint(0, 20)) for i in range(50)]
+    for c in cs:
+        heap.add(c)
+    for c in rng.sample(cs, 20):
+        heap.discard(c)
+    for c in rng.sample(cs, 10):
+        heap.add(c)
+    heap.pop()
+    assert not heap._sorted
+
+    for n in (2, 5, 40, 100):
+        actual = list(heap.peekn(n))
+        assert not heap._sorted
+        assert actual == list(heap.sorted())[:n]
+        # Shuffle the heap again
+        heap._heap.reverse()
+        heapq.heapify(heap._heap)
+        heap._sorted = False
+
+
 def test_heapset_sorted_flag_right():
     "Verify right operations don't affect sortedness"
     heap = HeapSet(key=operator.attrgetter("i"))
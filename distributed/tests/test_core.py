@@ -887,6 +887,59 @@ async def test_connection_pool_remove():
     await asyncio.gather(*[server.close() for server in servers])
 
 
+@gen_test()
+async def test_connection_pool_multiplex():
+    np = pytest.importorskip("numpy")
+
+    async def ping(comm, delay=0.01):
+        await asyncio.sleep(delay)
+        return "pong"
+
+    async def big():
+        return to_serialize(np.ones(2_000_000))
+
+    with dask.config.set({"distributed.comm.multiplex.enabled": True}):
+        async with Server({"ping": ping, "big": big}) as server:
+            await server.listen(0)
+            async with ConnectionPool(limit=5) as pool:
+                r = pool(server.address)
+                results = await asyncio.gather(r.big(), *(r.ping() for _ in range(20)))
+                assert results[0].sum() == 2_000_000
+                assert results[1:] == ["pong"] * 20
+
+                # All calls went through a single connection
+                assert pool.open == 1
+                assert pool.active == 1
+                assert len(pool._multiplexed[server.address]) == 1
+                # Streams are kept around for the next calls
+                idle = pool._idle_streams[server.address]
+                assert 0 < len(idle) <= 21
+                assert await r.ping() == "pong"
+                assert len(pool._idle_streams[server.address]) == len(idle)
+
+                pool.remove(server.address)
+                assert not pool._idle_streams.get(server.address)
+                assert await r.ping() == "pong"
+
+
+@gen_test()
+async def test_connection_pool_multiplex_unsupported():
+    async def ping(comm):
+        return "pong"
+
+    with dask.config.set({"distributed.comm.multiplex.enabled": True}):
+        async with Server({"ping": ping}, blocked_handlers=["multiplex"]) as server:
+            await server.listen(0)
+            async with ConnectionPool(limit=5) as pool:
+                results = await asyncio.gather(
+                    *(pool(server.address).ping() for _ in range(3))
+                )
+                assert results == ["pong"] * 3
+                assert server.address in pool._not_multiplexed
+                assert not pool._multiplexed.get(server.address)
+                assert await pool(server.address).ping() == "pong"
+
+
 @gen_test()
 async def test_counters():
     async with Server({"div": stream_div}) as server:
@@ -5,12 +5,27 @@ import gc
 import itertools
 import random
 import re
+import weakref
+from time import perf_counter
+from unittest import mock
 
 import pytest
 
-from distributed.gc import FractionalTimer, GCDiagnosis, disable_gc_diagnosis
+from distributed.gc import (
+    FractionalTimer,
+    GCDiagnosis,
+    GCTuner,
+    disable_gc_diagnosis,
+    gc_tuner,
+)
 from distributed.metrics import thread_time
-from distributed.utils_test import captured_logger, run_for
+from distributed.utils_test import (
+    async_poll_for,
+    captured_logger,
+    gen_cluster,
+    inc,
+    run_for,
+)
 
 
 class RandomTimer:
@@ -148,3 +163,107 @@ def test_gc_diagnosis_rss_win():
             r"from [1-9]\d* reference cycles",
             lines[0],
         )
+
+
+def test_gc_tuner_pauses():
+    with GCTuner() as tuner:
+        gc.collect()
+        gc.collect(0)
+        assert tuner.count[2] >= 1
+        assert tuner.count[0] >= 1
+        assert tuner.seconds[2] > 0
+        max_seconds = tuner.pop_max()
+        assert 0 < max_seconds[2] <= tuner.seconds[2]
+        assert tuner.max_seconds == [0, 0, 0]
+    count = tuner.count[2]
+    gc.collect()
+    assert tuner.count[2] == count
+
+
+def test_gc_tuner_thresholds():
+    original = gc.get_threshold()
+    with GCTuner(max_pause=0.1) as tuner:
+        tuner._adapt_threshold(2, 1.0)
+        assert gc.get_threshold() == (original[0], original[1], original[2] * 2)
+        tuner._adapt_threshold(2, 1.0)
+        assert gc.get_threshold()[2] == original[2] * 4
+        # Between max_pause / 4 and max_pause
+        tuner._adapt_threshold(2, 0.05)
+        assert gc.get_threshold()[2] == original[2] * 4
+        tuner._adapt_threshold(2, 0.001)
+        assert gc.get_threshold()[2] == original[2] * 2
+        for _ in range(3):
+            tuner._adapt_threshold(2, 0.001)
+        assert gc.get_threshold()[2] == original[2]
+        for _ in range(100):
+            tuner._adapt_threshold(1, 1.0)
+        assert gc.get_threshold()[1] == original[1] * tuner.MAX_THRESHOLD_FACTOR
+    assert gc.get_threshold() == original
+
+
+class Node:
+    def __init__(self):
+        self.ref = self
+
+
+def test_gc_tuner_freeze():
+    with GCTuner() as tuner:
+        node = Node()
+        ref = weakref.ref(node)
+        tuner.freeze()
+        assert gc.get_freeze_count() > 0
+        del node
+        gc.collect()
+        # Frozen objects are never collected
+        assert ref() is not None
+        tuner.refreeze()
+        assert ref() is None
+        assert gc.get_freeze_count() > 0
+    assert gc.get_freeze_count() == 0
+
+
+@pytest.mark.slow
+def test_gc_tuner_freeze_shortens_pauses():
+    """Benchmark the longest event loop stall caused by a full collection, with and
+    without the long-lived objects frozen out of gc
+    """
+    long_lived = [Node() for _ in range(300_000)]
+
+    def max_pause():
+        out = 0.0
+        for _ in range(3):
+            start = perf_counter()
+            gc.collect()
+            out = max(out, perf_counter() - start)
+        return out
+
+    with GCTuner() as tuner:
+        before = max_pause()
+        tuner.freeze()
+        after = max_pause()
+    print(f"Longest full collection: {before:.3f}s before freeze, {after:.3f}s after")
+    assert after < before / 2
+    del long_lived
+
+
+@gen_cluster(
+    client=True,
+    config={
+        "distributed.admin.gc.auto-tune": True,
+        "distributed.admin.gc.freeze-graph-size": 10,
+    },
+)
+async def test_gc_tuning_scheduler(c, s, a, b):
+    tuner = gc_tuner()
+    assert tuner is not None
+    assert gc.get_freeze_count() > 0
+
+    futures = c.map(inc, range(5))
+    await c.gather(futures)
+    assert not s._gc_refreeze_when_idle
+
+    with mock.patch.object(tuner, "refreeze", wraps=tuner.refreeze) as refreeze:
+        futures = c.map(inc, range(20))
+        await c.gather(futures)
+        await async_poll_for(lambda: refreeze.called, timeout=5)
+    assert not s._gc_refreeze_when_idle
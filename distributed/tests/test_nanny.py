@@ -220,6 +220,53 @@ async def test_nanny_restart(c, s, a):
     assert await c.submit(lambda: 1) == 1
 
 
+@pytest.mark.skipif(WINDOWS, reason="forkserver is not available on Windows")
+@gen_cluster(
+    client=True,
+    Worker=Nanny,
+    nthreads=[("", 1)],
+    config={
+        "distributed.worker.multiprocessing-method": "forkserver",
+        "distributed.worker.forkserver-preload": ["tabnanny", "not_a_module"],
+    },
+)
+async def test_nanny_restart_forkserver(c, s, a):
+    """Modules listed in forkserver-preload are already imported when the worker
+    starts, and those that fail to import in the fork server don't prevent the worker
+    from starting or restarting
+    """
+
+    def preloaded():
+        return "tabnanny" in sys.modules
+
+    assert await c.submit(preloaded, pure=False)
+    await a.restart()
+    assert await c.submit(preloaded, pure=False)
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(WINDOWS, reason="forkserver is not available on Windows")
+@gen_test(timeout=120)
+async def test_nanny_restart_time_forkserver():
+    """Benchmark of worker restarts: forking from the template process, where
+    distributed and its dependencies are already imported, is much faster than
+    spawning a new interpreter
+    """
+
+    async def restart_time(method: str) -> float:
+        with dask.config.set({"distributed.worker.multiprocessing-method": method}):
+            async with Scheduler(dashboard_address=":0") as s:
+                async with Nanny(s.address, nthreads=1) as n:
+                    start = time()
+                    await n.restart()
+                    return time() - start
+
+    spawn = await restart_time("spawn")
+    forkserver = await restart_time("forkserver")
+    print(f"Worker restart: spawn {spawn:.2f}s, forkserver {forkserver:.2f}s")
+    assert forkserver < spawn / 2
+
+
 @gen_cluster(client=True, Worker=Nanny, nthreads=[("", 1)])
 async def test_nanny_restart_timeout(c, s, a):
     x = await c.scatter(123)
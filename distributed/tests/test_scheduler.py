@@ -45,6 +45,7 @@ from distributed.compatibility import LINUX, MACOS, WINDOWS
 from distributed.core import ConnectionPool, Status, clean_exception, connect, rpc
 from distributed.metrics import time
 from distributed.protocol import serialize
+from distributed.protocol.cache import SerializationCache
 from distributed.protocol.pickle import dumps, loads
 from distributed.protocol.serialize import Serialize, Serialized
 from distributed.scheduler import (
@@ -1280,6 +1281,30 @@ async def test_broadcast_tls(s, a, b):
     assert result == {a.address: b"pong", b.address: b"pong"}
 
 
+@gen_cluster(
+    client=True,
+    config={
+        "distributed.comm.serialization-cache.enabled": True,
+        "distributed.comm.serialization-cache.min-size": "100kB",
+    },
+)
+async def test_broadcast_serialization_cache(c, s, a, b, monkeypatch):
+    """Large arguments are serialized once for all workers"""
+    serialized = []
+    orig = SerializationCache._serialize
+
+    def _serialize(value, *args, **kwargs):
+        serialized.append(value)
+        return orig(value, *args, **kwargs)
+
+    monkeypatch.setattr(SerializationCache, "_serialize", staticmethod(_serialize))
+
+    data = b"x" * 1_000_000
+    assert await c.run(len, data) == {a.address: 1_000_000, b.address: 1_000_000}
+    assert len(serialized) == 1
+    assert serialized[0] == dumps((data,))
+
+
 @gen_cluster(Worker=Nanny)
 async def test_broadcast_nanny(s, a, b):
     result1 = await s.broadcast(msg={"op": "identity"}, nanny=True)
@@ -1339,6 +1364,95 @@ async def test_broadcast_reuse_comm(
         assert s.rpc.open == 0
 
 
+@gen_cluster(
+    client=True,
+    nthreads=[("", 1)] * 6,
+    config={
+        "distributed.scheduler.broadcast-tree.enabled": True,
+        "distributed.scheduler.broadcast-tree.fanout": 2,
+        "distributed.scheduler.broadcast-tree.min-workers": 4,
+    },
+)
+async def test_broadcast_tree(c, s, *workers):
+    forwarded = []
+
+    def record(w):
+        async def tree_broadcast(comm, msg, address, children, fanout):
+            forwarded.append((address, len(children)))
+            return await w.tree_broadcast(comm, msg, address, children, fanout)
+
+        return tree_broadcast
+
+    for w in workers:
+        w.handlers["tree-broadcast"] = record(w)
+
+    def f(dask_worker):
+        return dask_worker.address
+
+    out = await c.run(f)
+    assert out == {w.address: w.address for w in workers}
+    # The scheduler sends to 2 workers, which forward to 2 workers each
+    assert sorted(n for _, n in forwarded) == [0, 0, 0, 0, 2, 2]
+    assert {addr for addr, _ in forwarded} == set(out)
+
+    # Not enough workers
+    forwarded.clear()
+    out = await c.run(f, workers=[w.address for w in workers[:3]])
+    assert len(out) == 3
+    assert not forwarded
+
+    out = await s.broadcast(
+        msg={"op": "ping"}, workers=[w.address for w in workers[:3]], tree=True
+    )
+    assert out == {w.address: b"pong" for w in workers[:3]}
+    assert len(forwarded) == 3
+
+    def g():
+        raise ZeroDivisionError("hello")
+
+    with pytest.raises(ZeroDivisionError, match="hello"):
+        await c.run(g)
+    out = await s.broadcast(msg={"op": "no-such-op"}, on_error="return")
+    assert out.keys() == {w.address for w in workers}
+    assert all(isinstance(v, KeyError) for v in out.values())
+
+
+@gen_cluster(Worker=Nanny)
+async def test_broadcast_tree_nanny(s, a, b):
+    out = await s.broadcast(msg={"op": "identity"}, nanny=True, tree=True)
+    assert {d["id"] for d in out.values()} == {a.id, b.id}
+    assert out.keys() == {a.worker_address, b.worker_address}
+
+
+@gen_cluster(
+    config={
+        "distributed.comm.timeouts.connect": "200ms",
+        "distributed.scheduler.broadcast-tree.fanout": 1,
+        "distributed.scheduler.reuse-broadcast-comm": False,
+    }
+)
+async def test_broadcast_tree_on_error(s, a, b):
+    """A worker that can't be reached is routed around"""
+    a.stop()
+    addresses = [a.address, b.address]
+
+    with pytest.raises(OSError):
+        await s.broadcast(msg={"op": "ping"}, workers=addresses, tree=True)
+
+    out = await s.broadcast(
+        msg={"op": "ping"}, workers=addresses, on_error="return", tree=True
+    )
+    assert isinstance(out[a.address], OSError)
+    assert out[b.address] == b"pong"
+    # The comms to the rest of the group are closed too
+    assert not s.rpc.available[b.address]
+
+    out = await s.broadcast(
+        msg={"op": "ping"}, workers=addresses, on_error="ignore", tree=True
+    )
+    assert out == {b.address: b"pong"}
+
+
 @gen_cluster(nthreads=[])
 async def test_worker_name(s):
     async with Worker(s.address, name="alice") as w:
@@ -3443,12 +3557,14 @@ def test_memorystate_sum():
         unmanaged_old=10,
         managed=58,
         spilled=2,
+        compressed=5,
     )
     m3 = MemoryState.sum(m1, m2)
     assert m3.process == 180
     assert m3.unmanaged_old == 25
     assert m3.managed_total == 140
     assert m3.spilled == 14
+    assert m3.compressed == 5
 
 
 @pytest.mark.parametrize(
@@ -3472,6 +3588,7 @@ def test_memorystate_adds_up(process, unmanaged_old, managed, spilled):
 def test_memorystate__to_dict():
     m = MemoryState(process=11, unmanaged_old=2, managed=3, spilled=1)
     assert m._to_dict() == {
+        "compressed": 0,
         "managed": 3,
         "managed_total": 4,
         "optimistic": 5,
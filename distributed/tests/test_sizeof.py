@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
 import pytest
 
 from dask.sizeof import sizeof
 
-from distributed.sizeof import safe_sizeof
+import distributed.sizeof
+from distributed.sizeof import is_immutable, safe_sizeof
 from distributed.utils_test import captured_logger
 
 
@@ -35,3 +40,110 @@ def test_safe_sizeof_logs_on_failure():
         assert safe_sizeof(foo, default_size=default_size) == default_size
 
     assert "Defaulting to 2.00 MiB" in logs.getvalue()
+
+
+class SlowlySized:
+    calls = 0
+
+    def __sizeof__(self):
+        SlowlySized.calls += 1
+        sleep(0.002)
+        return 123
+
+
+@is_immutable.register(SlowlySized)
+def _(obj):
+    return True
+
+
+def test_safe_sizeof_cache():
+    """The output of expensive sizeof() calls is memoized for as long as the object is
+    alive
+    """
+    SlowlySized.calls = 0
+
+    class FastlySized:
+        calls = 0
+
+        def __sizeof__(self):
+            FastlySized.calls += 1
+            return 456
+
+    x = SlowlySized()
+    size = safe_sizeof(x)
+    assert size >= 123
+    assert safe_sizeof(x) == size
+    assert SlowlySized.calls == 1
+    assert id(x) in distributed.sizeof._cache
+    del x
+    assert not distributed.sizeof._cache
+
+    y = FastlySized()
+    assert safe_sizeof(y) == safe_sizeof(y) >= 456
+    assert FastlySized.calls == 2
+
+
+def test_safe_sizeof_cache_mutable():
+    """The output of sizeof() is not memoized for objects that may be modified in
+    place
+    """
+
+    class SlowList(list):
+        def __sizeof__(self):
+            sleep(0.002)
+            return super().__sizeof__()
+
+    x = SlowList()
+    size = safe_sizeof(x)
+    assert not distributed.sizeof._cache
+    x.extend(range(1000))
+    assert safe_sizeof(x) > size
+
+
+def test_safe_sizeof_cache_evict_reused_id():
+    """A stale weakref callback doesn't evict the entry of a newer object with the
+    same id
+    """
+    x = SlowlySized()
+    safe_sizeof(x)
+    distributed.sizeof._evict(id(x), weakref.ref(x))
+    assert id(x) in distributed.sizeof._cache
+    del x
+    assert not distributed.sizeof._cache
+
+
+def test_safe_sizeof_cache_threads():
+    """The cache can be populated and evicted from multiple threads at once"""
+
+    def f(_):
+        for _ in range(10):
+            x = SlowlySized()
+            assert safe_sizeof(x) == safe_sizeof(x)
+
+    with ThreadPoolExecutor(8) as ex:
+        list(ex.map(f, range(8)))
+    assert not distributed.sizeof._cache
+
+
+def test_safe_sizeof_sample_dict():
+    d = {i: "x" * 100 for i in range(10_000)}
+    expect = sizeof(d)
+    actual = safe_sizeof(d)
+    assert 0.9 * expect < actual < 1.1 * expect
+
+    # Small dicts are measured exactly
+    d = {f"{i:03d}": "x" for i in range(100)}
+    assert safe_sizeof(d) == sizeof(d)
+
+
+def test_safe_sizeof_metrics():
+    class Foo:
+        pass
+
+    metrics = distributed.sizeof.cumulative_metrics
+    label = "test_sizeof.Foo"
+    before = metrics[label, "count"]
+    safe_sizeof(Foo())
+    safe_sizeof(Foo())
+    assert metrics[label, "count"] == before + 2
+    assert metrics[label, "seconds"] > 0
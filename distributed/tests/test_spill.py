@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import array
+import mmap
 import os
 import random
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from time import sleep
 
 import pytest
 
@@ -12,9 +16,11 @@ import dask.config
 from dask.sizeof import sizeof
 
 from distributed import profile
-from distributed.compatibility import WINDOWS
+from distributed.compatibility import LINUX, WINDOWS
 from distributed.metrics import meter
-from distributed.spill import SpillBuffer
+from distributed.protocol import Serialized, dumps, loads, serialize_bytes
+from distributed.protocol.utils import FileBuffer, pack_frames_prelude, unpack_frames
+from distributed.spill import SegmentedLog, SpillBuffer
 from distributed.utils import RateLimiterFilter
 from distributed.utils_test import captured_logger
 
@@ -313,6 +319,95 @@ def test_spillbuffer_evict(tmp_path):
     assert_buf(buf, tmp_path, {"bad": bad}, {"a": a})
 
 
+def test_next_use(tmp_path):
+    """With next_use, keys are spilled in order of expected next use instead of LRU"""
+    buf = SpillBuffer(str(tmp_path), target=1000)
+    next_use = {"a": (1,), "b": (3,), "c": None, "d": (2,)}
+    buf.next_use = next_use.get
+    assert buf.fast.next_use == next_use.get
+    for k in "abcd":
+        buf[k] = k * 100
+
+    # No waiters
+    assert buf.evict() > 0
+    assert set(buf.slow) == {"c"}
+    # Lowest priority
+    assert buf.evict() > 0
+    assert set(buf.slow) == {"c", "b"}
+
+    # Automatic eviction when reaching target
+    buf.fast.n = 200
+    buf.fast.evict_until_below_target()
+    assert set(buf.fast) == {"a"}
+
+    # Without next_use, fall back to LRU
+    buf.next_use = None
+    buf.fast.n = 1000
+    buf["e"] = "e" * 100
+    buf["a"]
+    assert buf.evict() > 0
+    assert set(buf.fast) == {"a"}
+
+
+class SlowPickle:
+    """Object that takes until ``release`` is set to pickle"""
+
+    def __init__(self, started: threading.Event, release: threading.Event):
+        self.started = started
+        self.release = release
+
+    def __reduce__(self):
+        self.started.set()
+        assert self.release.wait(5)
+        return bytes, ()
+
+
+def test_next_use_evict_does_not_block_reads(tmp_path):
+    """Reading a key from fast does not wait for another key to be spilled"""
+    buf = SpillBuffer(str(tmp_path), target=1000)
+    buf.next_use = {"a": None, "b": (1,)}.get
+    started = threading.Event()
+    release = threading.Event()
+    buf["a"] = SlowPickle(started, release)
+    buf["b"] = "b" * 100
+
+    with ThreadPoolExecutor(2) as ex:
+        evicting = ex.submit(buf.evict)
+        assert started.wait(5)
+        try:
+            assert ex.submit(buf.__getitem__, "b").result(timeout=2) == "b" * 100
+        finally:
+            release.set()
+        assert evicting.result() > 0
+    assert set(buf.fast) == {"b"}
+    assert set(buf.slow) == {"a"}
+
+
+def test_prefetch(tmp_path):
+    """prefetch() unspills keys only as long as they fit below target"""
+    buf = SpillBuffer(str(tmp_path), target=1000)
+    for k in "abc":
+        buf[k] = k * 100
+    buf.evict()
+    buf.evict()
+    assert set(buf.slow) == {"a", "b"}
+
+    assert buf.prefetch("a")
+    assert set(buf.fast) == {"a", "c"}
+    assert set(buf.slow) == {"b"}
+    assert buf.cumulative_metrics["disk-read", "count"] == 1
+    # Not spilled
+    assert buf.prefetch("a")
+    assert buf.prefetch("x")
+
+    # Not enough room below target
+    buf.fast.n = buf.fast.total_weight + 10
+    assert not buf.prefetch("b")
+    assert set(buf.fast) == {"a", "c"}
+    assert set(buf.slow) == {"b"}
+    assert buf.cumulative_metrics["disk-read", "count"] == 1
+
+
 def test_no_pop(tmp_path):
     buf = SpillBuffer(str(tmp_path), target=100)
     with pytest.raises(NotImplementedError):
@@ -445,6 +540,35 @@ def test_metrics(tmp_path):
         assert sum(time_metrics.values()) <= m.delta
 
 
+def test_get_for_transfer(tmp_path):
+    np = pytest.importorskip("numpy")
+    buf = SpillBuffer(str(tmp_path), target=300_000)
+    a = "a" * 100
+    x = np.arange(100_000)  # 800 kB > target
+    buf["a"] = a
+    buf["x"] = x
+    assert set(buf.fast) == {"a"}
+    assert set(buf.slow) == {"x"}
+
+    assert buf.get_for_transfer("a") is a
+    # Spilled, but still referenced
+    assert buf.get_for_transfer("x") is x
+    del x
+
+    ser = buf.get_for_transfer("x")
+    assert isinstance(ser, Serialized)
+    if not WINDOWS:
+        assert isinstance(ser.frames[-1].obj, FileBuffer)
+    assert buf.cumulative_metrics[("disk-read", "count")] == 1
+    # Not unspilled
+    assert set(buf.fast) == {"a"}
+    assert set(buf.slow) == {"x"}
+
+    # Round-trip through the network protocol
+    x2 = loads(dumps({"x": ser}))["x"]
+    np.testing.assert_array_equal(x2, np.arange(100_000))
+
+
 @pytest.mark.parametrize(
     "compression,minsize,maxsize",
     [("zlib", 100, 500), (None, 20_000, 20_500)],
@@ -457,6 +581,313 @@ def test_compression_settings(tmp_path, compression, minsize, maxsize):
         assert minsize <= psize(tmp_path, x=x)[1] <= maxsize
 
 
+def test_max_compressed(tmp_path):
+    with dask.config.set({"distributed.worker.memory.spill-compression": "zlib"}):
+        buf = SpillBuffer(str(tmp_path), target=100, max_compressed=400)
+    slow = buf._slow_uncached
+
+    a, b, c = "a" * 10_000, "b" * 10_000, "c" * 10_000  # ~170 bytes compressed
+    d = random.randbytes(1_000)  # Uncompressible
+    buf["a"] = a
+    buf["b"] = b
+    assert set(slow.compressed) == {"a", "b"}
+    assert not os.listdir(tmp_path)
+    assert buf.compressed_total == sum(map(len, slow.compressed.values()))
+    assert buf.spilled_total == (sizeof(a) + sizeof(b), 0)
+
+    # Oldest compressed values are written to disk to make room
+    buf["c"] = c
+    assert set(slow.compressed) == {"b", "c"}
+    assert buf.spilled_total == (
+        sizeof(a) + sizeof(b) + sizeof(c),
+        psize(tmp_path, a=a)[1],
+    )
+
+    # Uncompressible values are written to disk directly
+    buf["d"] = d
+    assert set(slow.compressed) == {"b", "c"}
+    assert set(buf.slow) == {"a", "b", "c", "d"}
+    assert len(buf.slow) == 4
+
+    assert buf.cumulative_metrics["disk-write", "count"] == 2
+    assert buf["b"] == b
+    assert buf["d"] == d
+    assert buf.cumulative_metrics["disk-read", "count"] == 1
+    ser = buf.get_for_transfer("c")
+    assert isinstance(ser, Serialized)
+    assert loads(dumps({"x": ser}))["x"] == c
+    assert buf.cumulative_metrics["disk-read", "count"] == 1
+
+    for k in "abcd":
+        del buf[k]
+    assert buf.compressed_total == 0
+    assert buf.spilled_total == (0, 0)
+    assert not os.listdir(tmp_path)
+
+
+@pytest.mark.skipif(WINDOWS, reason="Requires os.pread")
+def test_unspill_mmap(tmp_path):
+    """Large frames are page-aligned on disk and unspilled as copy-on-write memory
+    maps, which numpy can use without copying them
+    """
+    np = pytest.importorskip("numpy")
+    with dask.config.set({"distributed.worker.memory.spill-compression": False}):
+        buf = SpillBuffer(str(tmp_path), target=2**20)
+    x = np.arange(2**18)  # 2 MiB
+    buf["x"] = x
+    assert set(buf.slow) == {"x"}
+    del x
+
+    buf.fast.n = 2**22
+    y = buf["x"]
+    assert set(buf.fast) == {"x"}
+    assert not os.listdir(tmp_path)  # Deleted file remains mapped
+    assert y.ctypes.data % mmap.PAGESIZE == 0
+    assert isinstance(y.base, mmap.mmap)
+    assert y.flags.writeable
+    y[0] = -1
+    assert y[0] == -1
+    assert (y[1:] == np.arange(1, 2**18)).all()
+
+
+@pytest.mark.skipif(WINDOWS, reason="Requires os.pread")
+def test_unspill_mmap_disk_weight(tmp_path):
+    """Deleted spill files still count towards max_spill for as long as they are
+    memory-mapped
+    """
+    np = pytest.importorskip("numpy")
+    with dask.config.set({"distributed.worker.memory.spill-compression": False}):
+        buf = SpillBuffer(str(tmp_path), target=2**20, max_spill=2**22)
+    buf["x"] = np.arange(2**18)  # 2 MiB
+    disk = buf.spilled_total.disk
+    assert disk > 2**21
+
+    buf.fast.n = 2**22
+    y = buf["x"]
+    assert isinstance(y.base, mmap.mmap)
+    assert not os.listdir(tmp_path)
+    assert buf.spilled_total.memory == 0
+    assert buf.spilled_total.disk >= disk
+
+    # Not enough space left on disk for another 2 MiB
+    buf.fast.n = 2**20
+    buf["z"] = np.arange(2**18)
+    assert set(buf.fast) == {"x", "z"}
+
+    del buf["x"], buf["z"]
+    assert buf.spilled_total.disk >= disk
+    del y
+    assert buf.spilled_total == (0, 0)
+
+
+def mapping_rss(address: int) -> int:
+    """Resident bytes of the memory mapping of the current process that contains
+    address
+    """
+    with open("/proc/self/smaps") as fh:
+        found = False
+        for line in fh:
+            fields = line.split()
+            if "-" in fields[0] and not fields[0].endswith(":"):
+                start, end = (int(a, 16) for a in fields[0].split("-"))
+                found = start <= address < end
+            elif found and fields[0] == "Rss:":
+                return int(fields[1]) * 1024
+    raise ValueError(f"Address {address:#x} is not mapped")
+
+
+@pytest.mark.skipif(not LINUX, reason="Requires /proc/self/smaps")
+def test_prefetch_mmap_resident(tmp_path):
+    """prefetch() reads memory-mapped frames from disk right away, whereas regular
+    unspilling leaves them to be paged in when they're accessed
+    """
+    np = pytest.importorskip("numpy")
+    with dask.config.set({"distributed.worker.memory.spill-compression": False}):
+        buf = SpillBuffer(str(tmp_path), target=2**24)
+    buf["x"] = np.arange(2**20)  # 8 MiB
+
+    assert buf.evict() > 0
+    y = buf["x"]
+    assert isinstance(y.base, mmap.mmap)
+    assert mapping_rss(y.ctypes.data) < y.nbytes / 2
+    del y
+
+    assert buf.evict() > 0
+    assert buf.prefetch("x")
+    y = buf.fast["x"]
+    assert isinstance(y.base, mmap.mmap)
+    assert mapping_rss(y.ctypes.data) >= y.nbytes
+    assert (y == np.arange(2**20)).all()
+
+
+@pytest.mark.skipif(WINDOWS, reason="Requires os.pwrite")
+def test_segmented_log(tmp_path):
+    log = SegmentedLog(str(tmp_path), segment_size=900)
+    values = {k: [b"x" * 300, k.encode()] for k in "abcdef"}
+    for k, frames in values.items():
+        log[k] = [pack_frames_prelude(frames), *frames]
+    assert set(log) == set("abcdef")
+    # 325 bytes per value, prelude included
+    assert sorted(os.listdir(tmp_path)) == ["segment-0", "segment-1"]
+    assert log.get_frames("e") == values["e"]
+    assert unpack_frames(log["e"]) == values["e"]
+    assert log.dead_bytes == 0
+
+    # Segments are deleted as soon as they contain only dead space.
+    # Hold the lock to prevent compaction from starting after b is deleted.
+    with log.lock:
+        for k in "abc":
+            del log[k]
+    while os.listdir(tmp_path) != ["segment-1"]:
+        sleep(0.01)
+    assert log.dead_bytes == 0
+
+    # Old segments are compacted when they are mostly dead space
+    log["g"] = [pack_frames_prelude(values["a"]), *values["a"]]
+    assert sorted(os.listdir(tmp_path)) == ["segment-1", "segment-2"]
+    del log["d"]
+    del log["e"]
+    assert log.dead_bytes > 0
+    while "segment-1" in os.listdir(tmp_path):
+        sleep(0.01)
+    assert sorted(os.listdir(tmp_path)) == ["segment-2"]
+    assert log.dead_bytes == 0
+    assert log.get_frames("f") == values["f"]
+    assert log.get_frames("g") == values["a"]
+
+    log.close()
+    assert not os.listdir(tmp_path)
+
+
+@pytest.mark.skipif(WINDOWS, reason="Requires os.pwrite")
+def test_segmented_log_fill_and_delete(tmp_path):
+    """Segments are deleted when all their keys are deleted, including the ones that
+    were current when they filled up
+    """
+    log = SegmentedLog(str(tmp_path), segment_size=900)
+    frames = [b"x" * 300]
+    for i in range(20):
+        keys = [f"{i}-{j}" for j in range(5)]
+        for k in keys:
+            log[k] = [pack_frames_prelude(frames), *frames]
+        assert len(os.listdir(tmp_path)) == 2
+        # Hold the lock to prevent compaction from moving keys that are about to be
+        # deleted
+        with log.lock:
+            for k in keys:
+                del log[k]
+        while os.listdir(tmp_path):
+            sleep(0.01)
+        with log.lock:
+            assert log.dead_bytes == 0
+            assert not log.segments
+    log.close()
+
+
+@pytest.mark.skipif(WINDOWS, reason="Requires os.pwrite")
+def test_segmented_log_mmap(tmp_path):
+    """Deleted segments are still counted in dead_bytes for as long as they are
+    memory-mapped
+    """
+    log = SegmentedLog(str(tmp_path), segment_size=2**18)
+    frames = [b"x" * 2**17]
+    for k in "abc":
+        log[k] = [pack_frames_prelude(frames), *frames]
+    assert sorted(os.listdir(tmp_path)) == ["segment-0", "segment-1"]
+    y = log.get_frames("a", writeable=True)
+    assert isinstance(y[0], memoryview)
+    size = log.segments[0].size
+
+    # Hold the lock to prevent compaction from moving b after a is deleted
+    with log.lock:
+        del log["a"], log["b"]
+    while os.listdir(tmp_path) != ["segment-1"]:
+        sleep(0.01)
+    assert log.dead_bytes == size
+    assert y == frames
+    del y
+    assert log.dead_bytes == 0
+
+    # Segments that are still mapped when the log is closed
+    y = log.get_frames("c", writeable=True)
+    size = log.segments[1].size
+    log.close()
+    assert not os.listdir(tmp_path)
+    assert log.dead_bytes == size
+    del y
+    assert log.dead_bytes == 0
+
+
+@pytest.mark.skipif(WINDOWS, reason="Requires os.pwrite")
+def test_spillbuffer_log_backend(tmp_path):
+    buf = SpillBuffer(str(tmp_path), target=0, spill_backend="log")
+    a, b = "a" * 100, "b" * 100
+    buf["a"] = a
+    buf["b"] = b
+    assert set(buf.slow) == {"a", "b"}
+    assert os.listdir(tmp_path) == ["segment-0"]
+    assert buf.spilled_total == (sizeof(a) + sizeof(b), buf.spilled_total.disk)
+    assert buf["a"] == a
+    assert buf.get_for_transfer("b")
+
+    del buf["a"]
+    # Space on disk that hasn't been reclaimed yet is reported
+    assert buf.spilled_total.disk > buf._slow_uncached.total_weight.disk
+    del buf["b"]
+    assert buf.spilled_total.memory == 0
+
+
+@pytest.mark.parametrize("backend", ["files", "log"])
+def test_spill_directories(tmp_path, backend):
+    """Keys are spread across multiple spill directories, and max_spill applies to
+    each of them
+    """
+    if backend == "log" and WINDOWS:
+        pytest.skip("Requires os.pwrite")
+    dirs = [str(tmp_path / "d0"), str(tmp_path / "d1")]
+    a, b, c, d = "a" * 100, "b" * 100, "c" * 100, "d" * 100
+    size = len(serialize_bytes(a))
+    buf = SpillBuffer(dirs, target=0, max_spill=size, spill_backend=backend)
+    store = buf.striped_store
+    assert store is not None
+
+    buf["a"] = a
+    buf["b"] = b
+    assert set(buf.slow) == {"a", "b"}
+    assert store.weights == [size, size]
+    assert os.listdir(dirs[0]) and os.listdir(dirs[1])
+    assert buf.spilled_total == (sizeof(a) + sizeof(b), 2 * size)
+
+    # Both directories are full
+    RateLimiterFilter.reset_timer("distributed.spill")
+    with captured_logger("distributed.spill") as logs:
+        buf["c"] = c
+    assert "disk reached capacity" in logs.getvalue()
+    assert set(buf.fast) == {"c"}
+    del buf["c"]
+
+    assert buf["b"] == b
+    assert buf.get_for_transfer("a")
+
+    assert store.cumulative_metrics == {
+        (dirs[0], "disk-write", "count"): 1,
+        (dirs[0], "disk-write", "bytes"): size,
+        (dirs[1], "disk-write", "count"): 1,
+        (dirs[1], "disk-write", "bytes"): size,
+        (dirs[1], "disk-read", "count"): 1,
+        (dirs[1], "disk-read", "bytes"): size,
+        (dirs[0], "disk-read", "count"): 1,
+        (dirs[0], "disk-read", "bytes"): size,
+    }
+
+    # Deleting a key frees space in its directory
+    del buf["a"]
+    assert store.dead_bytes == 0
+    buf["d"] = d
+    assert set(buf.slow) == {"b", "d"}
+    assert store.location["d"] == (0, size)
+
+
 def test_str_collision(tmp_path):
     """keys are converted to strings before landing on disk. In dask, 1 and "1" are two
     different keys; make sure they don't collide.
@@ -134,3 +134,50 @@ def test_thread_name():
     with ThreadPoolExecutor(2) as e:
         e.map(id, range(10))
         assert len({thread.name for thread in e._threads}) == 2
+
+
+def test_priority():
+    """Work submitted with priority runs by priority, after work submitted without"""
+    ev = threading.Event()
+    order = []
+    with ThreadPoolExecutor(1) as e:
+        e.submit(ev.wait)
+        futures = [
+            e.submit_with_priority((3,), order.append, "p3"),
+            e.submit_with_priority((1, 2), order.append, "p1-2"),
+            e.submit(order.append, "d1"),
+            e.submit_with_priority((1, 1), order.append, "p1-1"),
+            e.submit_with_priority((3,), order.append, "p3-bis"),
+            e.submit(order.append, "d2"),
+        ]
+        ev.set()
+        for f in futures:
+            f.result()
+    assert order == ["d1", "d2", "p1-1", "p1-2", "p3", "p3-bis"]
+
+
+def test_rejoin_ahead_of_queued_work():
+    """A thread that rejoins the pool resumes before queued work is picked up"""
+    order = []
+    ev1 = threading.Event()
+    ev2 = threading.Event()
+
+    def f():
+        secede()
+        ev1.wait()
+        rejoin()
+        order.append("rejoined")
+
+    with ThreadPoolExecutor(1) as e:
+        fut = e.submit(f)
+        e.submit(ev2.wait)
+        futures = [e.submit_with_priority((i,), order.append, i) for i in range(3)]
+        sleep(0.05)
+        ev1.set()
+        sleep(0.05)
+        ev2.set()
+        fut.result()
+        for f2 in futures:
+            f2.result()
+    assert order[0] == "rejoined"
+    assert order[1:] == [0, 1, 2]
@@ -204,6 +204,28 @@ def test_get_mp_context():
         assert get_mp_context() is multiprocessing.get_context("fork")
 
 
+def test_get_mp_context_forkserver_preload(monkeypatch):
+    monkeypatch.setattr("distributed.utils._forkserver_preload_set", False)
+    ctx = multiprocessing.get_context("forkserver")
+    calls = []
+    monkeypatch.setattr(ctx, "set_forkserver_preload", calls.append)
+
+    with dask.config.set(
+        {
+            "distributed.worker.multiprocessing-method": "forkserver",
+            "distributed.worker.forkserver-preload": ["json", "xml.dom"],
+        }
+    ):
+        assert get_mp_context() is ctx
+        # The fork server is only configured once
+        assert get_mp_context() is ctx
+
+    assert len(calls) == 1
+    (modules,) = calls
+    assert modules[0] == "distributed"
+    assert modules[-2:] == ["json", "xml.dom"]
+
+
 def test_truncate_exception():
     e = ValueError("a" * 1000)
     assert len(str(e)) >= 1000
@@ -46,6 +46,7 @@ from distributed.diagnostics.plugin import ForwardOutput
 from distributed.metrics import time
 from distributed.protocol import pickle
 from distributed.scheduler import KilledWorker, Scheduler
+from distributed.spill import SpillBuffer
 from distributed.utils import get_mp_context, wait_for
 from distributed.utils_test import (
     NO_AMM,
@@ -822,6 +823,35 @@ async def test_multiple_transfers(c, s, w1, w2, w3):
     assert len(transfers) == 2
 
 
+@gen_cluster(
+    client=True,
+    nthreads=[("", 1)] * 2,
+    config={"distributed.worker.transfer.chunk-size": "10 kiB"},
+)
+async def test_gather_dep_streaming(c, s, a, b):
+    """Keys are streamed smallest first, in chunks of at most chunk-size bytes, and
+    each chunk is moved to memory as soon as it arrives
+    """
+    assert b.transfer_chunk_size == 10 * 2**10
+    x = c.submit(lambda: b"x" * 30_000, key="x", workers=[a.address])
+    y = c.submit(lambda: b"y" * 1_000, key="y", workers=[a.address])
+    z = c.submit(lambda: b"z" * 2_000, key="z", workers=[a.address])
+    await wait([x, y, z])
+
+    out = c.submit(
+        lambda *args: sum(map(len, args)), x, y, z, key="out", workers=[b.address]
+    )
+    assert await out == 33_000
+    story = b.state.story("request-dep", "receive-dep-chunk", "receive-dep")
+    assert [ev[:3] for ev in story] == [
+        ("request-dep", a.address, {"x", "y", "z"}),
+        ("receive-dep-chunk", a.address, {"y", "z"}),
+        ("receive-dep", a.address, {"x", "y", "z"}),
+    ]
+    assert b.state.transfer_incoming_bytes == 0
+    assert not b.state.in_flight_workers
+
+
 @pytest.mark.xfail(reason="very high flakiness")
 @gen_cluster(
     client=True,
@@ -3321,12 +3351,16 @@ async def test_Worker__to_dict(c, s, a):
         "transfer_outgoing_log",
         # Attributes of WorkerMemoryManager
         "data",
+        "max_compressed",
         "max_spill",
         "memory_limit",
         "memory_monitor_interval",
         "memory_pause_fraction",
         "memory_spill_fraction",
         "memory_target_fraction",
+        "spill_directories",
+        "unspill_ahead",
+        "task_peak_memory",
         # Attributes of WorkerState
         "nthreads",
         "running",
@@ -3751,3 +3785,64 @@ async def test_suppress_compute_failure_for_cancelled_tasks(c, s, a):
         await async_poll_for(lambda: not a.state.tasks)
 
     assert not log.getvalue()
+
+
+@gen_cluster(
+    client=True,
+    nthreads=[("", 1)] * 4,
+    config={
+        "distributed.comm.serialization-cache.enabled": True,
+        "distributed.comm.serialization-cache.min-size": "100kB",
+    },
+)
+async def test_serialization_cache_replicate(c, s, a, *workers):
+    """A key fetched by several workers is serialized only once"""
+    np = pytest.importorskip("numpy")
+    x = c.submit(np.arange, 100_000, key="x", workers=[a.address])
+    y = c.submit(np.arange, 10, key="y", workers=[a.address])
+    await wait([x, y])
+    await c.replicate([x, y])
+    assert all("x" in w.data and "y" in w.data for w in workers)
+    for w in workers:
+        assert (w.data["x"] == np.arange(100_000)).all()
+
+    cache = a.serialization_cache
+    # Only x is large enough to be cached
+    assert len(cache) == 1
+    assert cache.misses == 1
+    assert cache.hits >= 1
+    assert cache.nbytes >= 800_000
+    metrics = await a.get_metrics()
+    assert metrics["serialization_cache_bytes"] == cache.nbytes
+
+
+@gen_cluster(
+    client=True,
+    nthreads=[("", 1)] * 2,
+    worker_kwargs={"memory_limit": "1 GiB"},
+    config={
+        "distributed.comm.serialization-cache.enabled": True,
+        "distributed.comm.serialization-cache.min-size": "100kB",
+    },
+)
+async def test_serialization_cache_discard(c, s, a, b):
+    """Keys are dropped from the serialization cache as soon as they're spilled or
+    released, so that the cache doesn't keep their values in memory
+    """
+    np = pytest.importorskip("numpy")
+    x = c.submit(np.arange, 100_000, key="x", workers=[a.address])
+    y = c.submit(np.arange, 100_000, key="y", workers=[a.address])
+    await wait([x, y])
+    await c.replicate([x, y])
+    cache = a.serialization_cache
+    assert set(cache.keys()) == {"x", "y"}
+
+    assert isinstance(a.data, SpillBuffer)
+    a.data.fast.evict("x")
+    assert "x" in a.data.slow
+    await async_poll_for(lambda: set(cache.keys()) == {"y"}, timeout=5)
+
+    del y
+    await async_poll_for(lambda: "y" not in a.data, timeout=5)
+    assert not cache.keys()
+    assert cache.nbytes == 0
@@ -6,6 +6,7 @@ import itertools
 import logging
 import os
 import signal
+import threading
 from collections import Counter, UserDict
 from time import sleep
 
@@ -18,7 +19,7 @@ from dask.utils import format_bytes, parse_bytes
 
 import distributed.system
 from distributed import Client, Event, KilledWorker, Nanny, Scheduler, Worker, wait
-from distributed.compatibility import MACOS, WINDOWS
+from distributed.compatibility import LINUX, MACOS, WINDOWS
 from distributed.core import Status
 from distributed.metrics import monotonic
 from distributed.utils import RateLimiterFilter
@@ -27,10 +28,11 @@ from distributed.utils_test import (
     async_poll_for,
     captured_logger,
     gen_cluster,
+    gen_test,
     inc,
     wait_for_state,
 )
-from distributed.worker_memory import parse_memory_limit
+from distributed.worker_memory import CgroupMemoryWatcher, parse_memory_limit
 from distributed.worker_state_machine import (
     ComputeTaskEvent,
     ExecuteSuccessEvent,
@@ -359,8 +361,15 @@ async def test_spill_target_threshold(c, s, a):
     assert set(a.data.memory) == {"y", "z"}
     assert set(a.data.disk) == {"x"}
 
+    # Sending x to the client doesn't unspill it
     await x
-    assert set(a.data.memory) == {"x", "z"}
+    assert set(a.data.memory) == {"y", "z"}
+    assert set(a.data.disk) == {"x"}
+
+    # Using it in a task does
+    w = c.submit(len, x, key="w")
+    assert await w == 500
+    assert set(a.data.memory) == {"x", "z", "w"}
     assert set(a.data.disk) == {"y"}
 
 
@@ -417,6 +426,171 @@ async def test_spill_constrained(c, s, w):
     assert set(w.data.disk) == {x.key}
 
 
+@gen_cluster(
+    client=True,
+    nthreads=[("", 1)],
+    worker_kwargs={"memory_limit": "1 MB"},
+    config={
+        "distributed.worker.memory.target": 0.5,
+        "distributed.worker.memory.spill": False,
+        "distributed.worker.memory.pause": False,
+        "distributed.worker.memory.max-compressed": "100 kB",
+        "distributed.worker.memory.spill-compression": "zlib",
+    },
+)
+async def test_max_compressed(c, s, a):
+    """Spilled data is held compressed in memory and reported as such"""
+    x = c.submit(lambda: "x" * 600_000, key="x")  # > target
+    await wait(x)
+    assert set(a.data.disk) == {"x"}
+    assert 0 < a.data.compressed_total < 10_000
+    assert a.data.spilled_total.disk == 0
+    assert not os.listdir(os.path.join(a.local_directory, "storage"))
+
+    await a.heartbeat()
+    ms = s.workers[a.address].memory
+    assert ms.compressed == a.data.compressed_total
+    assert ms.spilled == 0
+    assert await x == "x" * 600_000
+
+
+@pytest.mark.skipif(WINDOWS, reason="Requires os.pwrite")
+@gen_cluster(
+    client=True,
+    nthreads=[("", 1)],
+    worker_kwargs={"memory_limit": "1 MB"},
+    config={
+        "distributed.worker.memory.target": 0.5,
+        "distributed.worker.memory.spill": False,
+        "distributed.worker.memory.pause": False,
+        "distributed.worker.memory.spill-backend": "log",
+    },
+)
+async def test_spill_backend_log(c, s, a):
+    """Spilled keys are appended to a segment file instead of one file per key"""
+    futs = c.map(lambda i: "x" * 600_000, range(3))  # > target
+    await wait(futs)
+    assert set(a.data.disk) == {f.key for f in futs}
+    assert os.listdir(os.path.join(a.local_directory, "storage")) == ["segment-0"]
+    assert a.data.spilled_total.disk > 0
+    assert await futs[0] == "x" * 600_000
+
+
+@pytest.mark.skipif(not LINUX, reason="Requires /proc/self/fd")
+@gen_test()
+async def test_spill_backend_log_close():
+    """Closing the worker closes the segment files of the spill log and waits for
+    compaction to complete
+    """
+    with dask.config.set(
+        {
+            "distributed.worker.memory.target": 0.5,
+            "distributed.worker.memory.spill": False,
+            "distributed.worker.memory.pause": False,
+            "distributed.worker.memory.spill-backend": "log",
+        }
+    ):
+        async with (
+            Scheduler(dashboard_address=":0") as s,
+            Client(s.address, asynchronous=True) as c,
+        ):
+            async with Worker(s.address, memory_limit="1 MB") as a:
+                futs = c.map(lambda i: "x" * 600_000, range(3))  # > target
+                await wait(futs)
+                log = a.data._slow_uncached.d
+                paths = {segment.path for segment in log.segments.values()}
+                assert paths
+
+            # The worker was closed while its keys were still spilled
+            open_files = {os.readlink(fd.path) for fd in os.scandir("/proc/self/fd")}
+            assert not any(f.startswith(p) for f in open_files for p in paths)
+            assert not any(
+                t.name == "Dask-Spill-Compaction" for t in threading.enumerate()
+            )
+
+
+@gen_test()
+async def test_spill_directories(tmp_path):
+    """Spilled keys are spread across all spill directories, which are deleted when
+    the worker shuts down
+    """
+    dirs = [str(tmp_path / "d0"), str(tmp_path / "d1")]
+    for d in dirs:
+        os.mkdir(d)
+    # Left behind by a worker that crashed
+    stale = os.path.join(dirs[0], "dask-spill-stale")
+    os.mkdir(stale)
+    open(stale + ".dirlock", "w").close()
+
+    with dask.config.set(
+        {
+            "distributed.worker.memory.spill-directories": dirs,
+            "distributed.worker.memory.target": 0.5,
+            "distributed.worker.memory.spill": False,
+            "distributed.worker.memory.pause": False,
+        }
+    ):
+        async with (
+            Scheduler(dashboard_address=":0") as s,
+            Worker(s.address, memory_limit="1 MB") as a,
+            Client(s.address, asynchronous=True) as c,
+        ):
+            assert not os.path.exists(stale)
+            spill_dirs = a.memory_manager.spill_directories
+            assert [os.path.dirname(d) for d in spill_dirs] == dirs
+            futs = c.map(lambda i: "x" * 600_000, range(4))  # > target
+            await wait(futs)
+            assert set(a.data.disk) == {f.key for f in futs}
+            assert all(len(os.listdir(d)) == 2 for d in spill_dirs)
+            assert await futs[0] == "x" * 600_000
+
+    assert not any(os.path.exists(d) for d in spill_dirs)
+    assert all(os.path.exists(d) for d in dirs)
+
+
+@pytest.mark.parametrize(
+    "worker_kwargs",
+    [{"memory_limit": 0}, {"memory_limit": "1 GB", "data": dict}],
+)
+@gen_test()
+async def test_spill_directories_no_spill(tmp_path, worker_kwargs):
+    """Spill directories are not created when the worker doesn't spill"""
+    with dask.config.set(
+        {"distributed.worker.memory.spill-directories": [str(tmp_path)]}
+    ):
+        async with Scheduler(dashboard_address=":0") as s:
+            async with Worker(s.address, **worker_kwargs) as a:
+                assert a.memory_manager.spill_directories == []
+                assert not os.listdir(tmp_path)
+
+
+@gen_cluster(
+    client=True,
+    nthreads=[("", 1)] * 2,
+    worker_kwargs={"memory_limit": "1 MB"},
+    config={
+        "distributed.worker.memory.target": 0.5,
+        "distributed.worker.memory.spill": False,
+        "distributed.worker.memory.pause": False,
+    },
+)
+async def test_transfer_spilled(c, s, a, b):
+    """Spilled keys are sent to peers straight from disk, without being unspilled"""
+    x = c.submit(os.urandom, 300_000, key="x", workers=[a.address])
+    await wait(x)
+    y = c.submit(os.urandom, 300_000, key="y", workers=[a.address])
+    await wait(y)
+    assert set(a.data.memory) == {"y"}
+    assert set(a.data.disk) == {"x"}
+
+    z = c.submit(len, x, key="z", workers=[b.address])
+    assert await z == 300_000
+    assert b.state.tasks["x"].state == "memory"
+    assert set(a.data.memory) == {"y"}
+    assert set(a.data.disk) == {"x"}
+    assert await c.submit(lambda x: x, x, workers=[b.address]) == await x
+
+
 @gen_cluster(
     nthreads=[("", 1)],
     client=True,
@@ -441,6 +615,137 @@ async def test_spill_spill_threshold(c, s, a):
     assert await x == 1
 
 
+class RecordSpillThread:
+    """Record the name of the thread where the object is pickled"""
+
+    def __init__(self, thread_name: str | None = None):
+        self.thread_name = thread_name
+
+    def __reduce__(self):
+        return RecordSpillThread, (threading.current_thread().name,)
+
+
+@gen_cluster(
+    nthreads=[("", 1)],
+    client=True,
+    worker_kwargs={"memory_limit": "1000 MB"},
+    config={
+        "distributed.worker.memory.target": False,
+        "distributed.worker.memory.spill": 0.7,
+        "distributed.worker.memory.pause": False,
+        "distributed.worker.memory.monitor-interval": "10ms",
+    },
+)
+async def test_spill_in_thread(c, s, a):
+    """Keys are serialized and written to disk on a dedicated thread, off the event
+    loop
+    """
+    a.monitor.get_process_memory = lambda: 800_000_000 if a.data.fast else 0
+    x = c.submit(RecordSpillThread, key="x")
+    while not a.data.disk:
+        await asyncio.sleep(0.01)
+    assert a.data.slow["x"].thread_name.startswith("Dask-Spill")
+    assert a.memory_manager._spill_executor is not None
+    assert (await x).thread_name.startswith("Dask-Spill")
+
+
+@gen_cluster(
+    nthreads=[("", 1)],
+    client=True,
+    worker_kwargs={"memory_limit": "1 GB"},
+    config={"distributed.worker.memory.unspill-ahead": 1},
+)
+async def test_unspill_ahead(c, s, a):
+    """When a task starts executing, the spilled inputs of the next task in the ready
+    queue are read back from disk while it runs
+    """
+    a.monitor.get_process_memory = lambda: 0
+    x = c.submit(inc, 1, key="x")
+    await wait(x)
+    assert a.data.evict() > 0
+    assert set(a.data.slow) == {"x"}
+
+    ev1, ev2 = Event(), Event()
+    b1 = c.submit(lambda ev: ev.wait(), ev1, key="b1")
+    await wait_for_state("b1", "executing", a)
+    b2 = c.submit(lambda ev: ev.wait(), ev2, key="b2", priority=1)
+    y = c.submit(inc, x, key="y")
+    await wait_for_state("b2", "ready", a)
+    await wait_for_state("y", "ready", a)
+    assert set(a.data.slow) == {"x"}
+
+    # b2 starts executing; x is unspilled while it runs
+    await ev1.set()
+    await wait_for_state("b2", "executing", a)
+    await async_poll_for(lambda: "x" in a.data.fast, timeout=5)
+    assert a.digests_total["memory-monitor", "disk-read", "count"] == 1
+
+    await ev2.set()
+    assert await y == 3
+    assert "disk-read" not in {ss["action"] for ss in a.state.tasks["y"].startstops}
+
+
+@gen_cluster(
+    nthreads=[("", 1)],
+    client=True,
+    worker_kwargs={"memory_limit": "1 GB"},
+    config={"distributed.worker.memory.task-peak-memory": "rss"},
+)
+async def test_task_peak_memory_rss(c, s, a):
+    """The worker samples process memory while a task runs and reports the peak to
+    the scheduler, which aggregates it by task group and prefix
+    """
+    memory = 100_000_000
+    a.monitor.get_process_memory = lambda: memory
+
+    ev = Event()
+    x = c.submit(lambda ev: ev.wait(), ev, key="x-1")
+    await wait_for_state("x-1", "executing", a)
+    memory = 400_000_000
+    await a.memory_manager.memory_monitor(a)
+    memory = 150_000_000
+    await ev.set()
+    await x
+    assert a.state.tasks["x-1"].peak_memory == 300_000_000
+    tg = s.tasks["x-1"].group
+    assert tg.peak_memory_max == 300_000_000
+    assert tg.prefix.peak_memory_average == 300_000_000
+
+    # Moving average by prefix
+    await c.submit(inc, 1, key="x-2")
+    assert a.state.tasks["x-2"].peak_memory == 0
+    assert tg.prefix.peak_memory_average == 150_000_000
+    assert tg.peak_memory_max == 300_000_000
+    assert not a.memory_manager._task_peaks
+
+
+@gen_cluster(
+    nthreads=[("", 1)],
+    client=True,
+    config={"distributed.worker.memory.task-peak-memory": "tracemalloc"},
+)
+async def test_task_peak_memory_tracemalloc(c, s, a):
+    def f():
+        buf = bytearray(50_000_000)
+        del buf
+        return 1
+
+    assert await c.submit(f, key="f") == 1
+    assert 50_000_000 <= a.state.tasks["f"].peak_memory < 60_000_000
+    assert s.task_prefixes["f"].peak_memory_max >= 50_000_000
+
+
+@gen_cluster(
+    nthreads=[("", 1)],
+    client=True,
+    config={"distributed.worker.memory.task-peak-memory": False},
+)
+async def test_task_peak_memory_disabled(c, s, a):
+    assert await c.submit(inc, 1, key="x") == 2
+    assert a.state.tasks["x"].peak_memory is None
+    assert s.task_prefixes["x"].peak_memory_average == -1
+
+
 @pytest.mark.parametrize(
     "target,managed,expect_spilled",
     [
@@ -492,10 +797,11 @@ async def test_spill_hysteresis(c, s, target, managed, expect_spilled):
             await wait(futures)
 
             # Wait until spilling starts. Then, wait until it stops.
+            # Spilling happens on a separate thread, so give it time to progress.
             prev_n = 0
             while not a.data.disk or len(a.data.disk) > prev_n:
                 prev_n = len(a.data.disk)
-                await asyncio.sleep(0)
+                await asyncio.sleep(0.1)
 
             assert len(a.data.disk) == expect_spilled
 
@@ -975,7 +1281,10 @@ async def test_pause_while_spilling(c, s, a):
 
     futs = [c.submit(SlowSpill, pure=False) for _ in range(N_TOTAL)]
 
-    await async_poll_for(lambda: len(a.data.slow) >= N_PAUSE, period=0)
+    # Keys remain in fast until they've been written to slow by the spill thread
+    await async_poll_for(
+        lambda: len(a.data.slow) >= N_PAUSE and not a.data.fast, period=0
+    )
     assert a.status == Status.paused
     # Worker should have become paused after the first `SlowSpill` was evicted, because
     # the spill to disk took longer than the memory monitor interval.
@@ -1131,3 +1440,64 @@ async def test_delete_spilled_keys(c, s, a):
     x.release()
     await async_poll_for(lambda: not a.data)
     assert not a.state.tasks
+
+
+@pytest.mark.skipif(not LINUX, reason="cgroups are Linux-only")
+def test_cgroup_watcher_path(tmp_path, monkeypatch):
+    proc_cgroup = tmp_path / "cgroup"
+    root = tmp_path / "root"
+    monkeypatch.setattr(CgroupMemoryWatcher, "proc_cgroup", str(proc_cgroup))
+    monkeypatch.setattr(CgroupMemoryWatcher, "root", str(root))
+
+    # No such file
+    assert CgroupMemoryWatcher.cgroup_path() is None
+    # cgroups v1
+    proc_cgroup.write_text("4:memory:/foo\n1:cpu:/\n")
+    assert CgroupMemoryWatcher.cgroup_path() is None
+    # cgroups v2 without the memory controller
+    proc_cgroup.write_text("0::/foo/bar\n")
+    assert CgroupMemoryWatcher.cgroup_path() is None
+
+    (root / "foo" / "bar").mkdir(parents=True)
+    (root / "foo" / "bar" / "memory.events").write_text("high 0\n")
+    assert CgroupMemoryWatcher.cgroup_path() == str(root / "foo" / "bar")
+
+
+@pytest.mark.skipif(not LINUX, reason="cgroups are Linux-only")
+@gen_test()
+async def test_cgroup_watcher_unavailable(tmp_path):
+    """Regular files, unlike cgroup files, can't be watched with epoll"""
+    (tmp_path / "memory.events").write_text("high 0\n")
+    (tmp_path / "memory.pressure").write_text("")
+    watcher = CgroupMemoryWatcher(lambda: None, str(tmp_path))
+    assert not watcher.start()
+    assert not watcher._fds
+    assert watcher._epoll is None
+    watcher.stop()  # Idempotent
+
+
+@gen_cluster(
+    nthreads=[("", 1)],
+    client=True,
+    worker_kwargs={"memory_limit": "1 GB"},
+    config={
+        "distributed.worker.memory.target": False,
+        "distributed.worker.memory.spill": False,
+        "distributed.worker.memory.pause": 0.8,
+        "distributed.worker.memory.monitor-interval": "1h",
+    },
+)
+async def test_cgroup_event_runs_memory_monitor(c, s, a):
+    """A cgroup memory event pauses the worker without waiting for the next poll"""
+    a.monitor.get_process_memory = lambda: 900_000_000
+    await asyncio.sleep(0.1)
+    assert a.status == Status.running
+
+    a.memory_manager._on_cgroup_event(a)
+    await async_poll_for(lambda: a.status == Status.paused, timeout=5)
+
+    # Events received while the memory monitor is running are dropped
+    async with a.memory_manager._memory_monitor_lock:
+        task = a.memory_manager._cgroup_event_task
+        a.memory_manager._on_cgroup_event(a)
+        assert a.memory_manager._cgroup_event_task is task
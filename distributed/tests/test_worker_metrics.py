@@ -103,15 +103,11 @@ async def test_task_lifecycle(c, s, a, b):
         # Delta to end-to-end runtime as seen from the worker state machine
         ("execute", span_id(s), "z", "other", "seconds"),
         # a.get_data() (triggered by the client retrieving the Future for z)
-        # Unspill
+        # Read the spilled frames from disk and send them over the network as they
+        # are, without deserializing and serializing them again
         ("get-data", "disk-read", "seconds"),
         ("get-data", "disk-read", "count"),
         ("get-data", "disk-read", "bytes"),
-        ("get-data", "decompress", "seconds"),
-        ("get-data", "deserialize", "seconds"),
-        # Send over the network
-        ("get-data", "serialize", "seconds"),
-        ("get-data", "compress", "seconds"),
         ("get-data", "network", "seconds"),
     }
     assert set(get_digests(a)) == expect
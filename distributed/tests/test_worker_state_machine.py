@@ -466,6 +466,7 @@ def test_executesuccess_to_dict():
         stop=456.7,
         nbytes=890,
         type=int,
+        peak_memory=1234,
     )
     ev2 = ev.to_loggable(handled=11.22)
     assert ev2.value is None
@@ -482,6 +483,7 @@ def test_executesuccess_to_dict():
         "start": 123.4,
         "stop": 456.7,
         "type": "<class 'int'>",
+        "peak_memory": 1234,
     }
     ev3 = StateMachineEvent.from_dict(d)
     assert isinstance(ev3, ExecuteSuccessEvent)
@@ -494,6 +496,7 @@ def test_executesuccess_to_dict():
     assert ev3.stop == 456.7
     assert ev3.nbytes == 890
     assert ev3.type is None
+    assert ev3.peak_memory == 1234
 
 
 def test_executesuccess_dummy():
@@ -506,6 +509,7 @@ def test_executesuccess_dummy():
         stop=1.0,
         nbytes=1,
         type=None,
+        peak_memory=None,
         stimulus_id="s",
     )
 
@@ -1309,6 +1313,32 @@ def test_recompute_erred_task(ws):
     assert ws.tasks["x"].state == "executing"
 
 
+def test_next_use(ws):
+    """WorkerState.next_use returns the priority of the first task waiting for a key"""
+    ws.handle_stimulus(
+        ComputeTaskEvent.dummy("x", stimulus_id="s1"),
+        ExecuteSuccessEvent.dummy("x", stimulus_id="s2"),
+    )
+    assert ws.next_use("x") is None
+    assert ws.next_use("missing") is None
+
+    ws.handle_stimulus(
+        # Executing; x has already been passed to it
+        ComputeTaskEvent.dummy(
+            "y", who_has={"x": [ws.address]}, priority=(0,), stimulus_id="s3"
+        ),
+        ComputeTaskEvent.dummy(
+            "z1", who_has={"x": [ws.address]}, priority=(2,), stimulus_id="s4"
+        ),
+        ComputeTaskEvent.dummy(
+            "z2", who_has={"x": [ws.address]}, priority=(1,), stimulus_id="s5"
+        ),
+    )
+    assert ws.tasks["y"].state == "executing"
+    assert ws.tasks["z1"].state == "ready"
+    assert ws.next_use("x") == ws.tasks["z2"].priority
+
+
 def test_transfer_incoming_metrics(ws):
     assert ws.transfer_incoming_bytes == 0
     assert ws.transfer_incoming_count == 0
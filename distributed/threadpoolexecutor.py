@@ -8,6 +8,8 @@ function realises that it is going to be a long-running job that doesn't want
 to take up space.  When the function finishes its thread will terminate
 gracefully.
 
+Work is not picked up in FIFO order, but by priority; see `PriorityWorkQueue`.
+
 This code copies and modifies two functions from the
 `concurrent.futures.thread` module, notably `_worker` and
 ThreadPoolExecutor._adjust_thread_count` to allow for checking against a global
@@ -28,6 +30,7 @@ import logging
 import os
 import queue
 import threading
+from concurrent.futures import Future
 
 from distributed import _concurrent_futures_thread as thread
 from distributed.metrics import time
@@ -36,6 +39,42 @@ logger = logging.getLogger(__name__)
 
 thread_state = threading.local()
 
+# Lanes of PriorityWorkQueue, in order of precedence
+LANE_REJOIN = 0
+LANE_DEFAULT = 1
+LANE_PRIORITY = 2
+LANE_SHUTDOWN = 3
+
+
+class PriorityWorkQueue(queue.PriorityQueue):
+    """Work queue of :class:`ThreadPoolExecutor`.
+
+    Work items are picked up by lane first:
+
+    1. threads waiting to rejoin the pool after :func:`secede`, so that a long-running
+       task that is done waiting resumes as soon as possible;
+    2. work submitted with :meth:`ThreadPoolExecutor.submit`, in FIFO order;
+    3. work submitted with :meth:`ThreadPoolExecutor.submit_with_priority`, typically
+       dask tasks, in order of priority (lowest first) and then FIFO;
+    4. shutdown sentinels.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._counter = itertools.count()
+
+    def put_with_priority(self, item, lane, priority=()):
+        self.put((lane, priority, next(self._counter), item))
+
+    def _put(self, item):
+        if item is None:
+            # Shutdown sentinel, put by concurrent.futures internals
+            item = (LANE_SHUTDOWN, (), next(self._counter), None)
+        super()._put(item)
+
+    def _get(self):
+        return super()._get()[-1]
+
 
 def _worker(executor, work_queue):
     thread_state.proceed = True
@@ -75,12 +114,43 @@ class ThreadPoolExecutor(thread.ThreadPoolExecutor):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._work_queue = PriorityWorkQueue()
         self._rejoin_list = []
         self._rejoin_lock = threading.Lock()
         self._thread_name_prefix = kwargs.get(
             "thread_name_prefix", "DaskThreadPoolExecutor"
         )
 
+    def submit(self, fn, *args, **kwargs):
+        return self._submit(LANE_DEFAULT, (), fn, args, kwargs)
+
+    submit.__doc__ = thread.ThreadPoolExecutor.submit.__doc__
+
+    def submit_with_priority(self, priority, fn, /, *args, **kwargs):
+        """Variant of :meth:`submit` which runs ``fn`` after all work with lower
+        ``priority`` that was submitted through this method, even if it was submitted
+        later. Work submitted through :meth:`submit` runs first.
+
+        Parameters
+        ----------
+        priority: tuple
+            Priority of the work; lower values run first. Typically this is
+            ``TaskState.priority``.
+        """
+        return self._submit(LANE_PRIORITY, priority, fn, args, kwargs)
+
+    def _submit(self, lane, priority, fn, args, kwargs):
+        with self._shutdown_lock:
+            if self._shutdown:  # pragma: no cover
+                raise RuntimeError("cannot schedule new futures after shutdown")
+
+            f = Future()
+            w = thread._WorkItem(f, fn, args, kwargs)
+
+            self._work_queue.put_with_priority(w, lane, priority)
+            self._adjust_thread_count()
+            return f
+
     def _adjust_thread_count(self):
         if len(self._threads) < self._max_workers:
             t = threading.Thread(
@@ -137,7 +207,8 @@ def rejoin():
     e = thread_state.executor
     with e._rejoin_lock:
         e._rejoin_list.append((thread, event))
-    e.submit(lambda: None)
+    # Wake up the next thread to finish a task ahead of any other queued work
+    e._submit(LANE_REJOIN, (), lambda: None, (), {})
     event.wait()
     thread_state.proceed = True
 
@@ -103,6 +103,14 @@ def get_mp_context():
     The context type is controlled by the
     ``distributed.worker.multiprocessing-method`` configuration key.
 
+    If it is ``forkserver``, the fork server is a template process where dask,
+    distributed, their dependencies, and the modules listed in
+    ``distributed.worker.forkserver-preload`` are already imported, so that new
+    processes forked from it start in a fraction of the time it takes to spawn a new
+    interpreter. Worker preload modules are not imported there unless they're listed
+    in ``forkserver-preload`` as well, since their side effects would then be shared
+    by all workers.
+
     Returns
     -------
     multiprocessing.BaseContext
@@ -129,6 +137,12 @@ def get_mp_context():
                 pass
             else:
                 preload.append(pkg)
+
+        # The fork server silently skips the modules that fail to import
+        for name in dask.config.get("distributed.worker.forkserver-preload"):
+            if name not in preload:
+                preload.append(name)
+
         ctx.set_forkserver_preload(preload)
         _forkserver_preload_set = True
 
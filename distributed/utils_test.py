@@ -40,6 +40,7 @@ from distributed import Event, Scheduler, system
 from distributed.batched import BatchedSend
 from distributed.client import Client, _global_clients, default_client
 from distributed.comm import Comm
+from distributed.comm.mux import MuxStream
 from distributed.comm.tcp import TCP
 from distributed.compatibility import MACOS, WINDOWS, asyncio_run
 from distributed.config import get_loop_factory, initialize_logging
@@ -1793,7 +1794,7 @@ class LockedComm(TCP):
         self.read_event = read_event
         self.read_queue = read_queue
         self.comm = comm
-        assert isinstance(comm, TCP)
+        assert isinstance(comm, (TCP, MuxStream))
 
     def __getattr__(self, name):
         return getattr(self.comm, name)
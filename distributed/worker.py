@@ -81,16 +81,24 @@ from distributed.diagnostics import nvml, rmm
 from distributed.diagnostics.plugin import WorkerPlugin, _get_plugin_name
 from distributed.diskutils import WorkSpace
 from distributed.exceptions import Reschedule
-from distributed.gc import disable_gc_diagnosis, enable_gc_diagnosis
+from distributed.gc import (
+    disable_gc_diagnosis,
+    disable_gc_tuning,
+    enable_gc_diagnosis,
+    enable_gc_tuning,
+    gc_tuner,
+)
 from distributed.http import get_handlers
 from distributed.metrics import context_meter, thread_time, time
 from distributed.node import ServerNode
 from distributed.proctitle import setproctitle
-from distributed.protocol import pickle, to_serialize
+from distributed.protocol import Serialize, Serialized, pickle, to_serialize
+from distributed.protocol.cache import SerializationCache
 from distributed.protocol.serialize import _is_dumpable
 from distributed.security import Security
 from distributed.sizeof import safe_sizeof as sizeof
 from distributed.spans import CONTEXTS_WITH_SPAN_ID, SpansWorkerExtension
+from distributed.spill import SpillBuffer
 from distributed.threadpoolexecutor import ThreadPoolExecutor
 from distributed.threadpoolexecutor import secede as tpe_secede
 from distributed.utils import (
@@ -123,6 +131,7 @@ from distributed.worker_state_machine import (
     FindMissingEvent,
     FreeKeysEvent,
     GatherDepBusyEvent,
+    GatherDepChunkEvent,
     GatherDepFailureEvent,
     GatherDepNetworkFailureEvent,
     GatherDepSuccessEvent,
@@ -315,6 +324,9 @@ class Worker(BaseWorker, ServerNode):
         The maximum number of concurrent outgoing data transfers.
         See also
         :attr:`distributed.worker_state_machine.WorkerState.transfer_incoming_count_limit`.
+    * **transfer_chunk_size**: ``int | None``
+        Maximum size of each message when streaming incoming data transfers, or None
+        to receive each transfer in a single message.
     * **batched_stream**: ``BatchedSend``
         A batched stream along which we communicate to the scheduler
     * **log**: ``[(message)]``
@@ -420,6 +432,10 @@ class Worker(BaseWorker, ServerNode):
     nanny: Nanny | None
     _lock: threading.Lock
     transfer_outgoing_count_limit: int
+    transfer_chunk_size: int | None
+    #: Serialized frames of keys that are sent to several workers, if
+    #: distributed.comm.serialization-cache.enabled is True
+    serialization_cache: SerializationCache | None
     threads: dict[Key, int]  # {ts.key: thread ID}
     active_threads_lock: threading.Lock
     active_threads: dict[int, Key]  # {thread ID: ts.key}
@@ -544,6 +560,11 @@ class Worker(BaseWorker, ServerNode):
         transfer_message_bytes_limit = parse_bytes(
             dask.config.get("distributed.worker.transfer.message-bytes-limit")
         )
+        transfer_chunk_size = dask.config.get("distributed.worker.transfer.chunk-size")
+        self.transfer_chunk_size = (
+            parse_bytes(transfer_chunk_size) if transfer_chunk_size else None
+        )
+        self.serialization_cache = SerializationCache.from_config()
         self.threads = {}
 
         self.active_threads_lock = threading.Lock()
@@ -737,6 +758,7 @@ class Worker(BaseWorker, ServerNode):
                 protocol = protocol_address[0]
             assert protocol
         self._protocol = protocol
+        self._gc_tuning = False
 
         self.memory_manager = WorkerMemoryManager(
             self, data=data, nthreads=nthreads, memory_limit=memory_limit
@@ -766,6 +788,13 @@ class Worker(BaseWorker, ServerNode):
             transfer_message_bytes_limit=transfer_message_bytes_limit,
         )
         BaseWorker.__init__(self, state)
+        if isinstance(self.memory_manager.data, SpillBuffer):
+            # Spill first the keys that are not going to be needed soon
+            self.memory_manager.data.next_use = state.next_use
+            if self.serialization_cache is not None:
+                self.memory_manager.data.fast_to_slow_callbacks.append(
+                    self._discard_serialized
+                )
 
         self.scheduler = self.rpc(scheduler_addr)
         self.execution_state = {
@@ -784,6 +813,12 @@ class Worker(BaseWorker, ServerNode):
         pc = PeriodicCallback(self.find_missing, 1000)
         self.periodic_callbacks["find-missing"] = pc
 
+        if self.serialization_cache is not None:
+            pc = PeriodicCallback(
+                self.serialization_cache.purge, self.serialization_cache.ttl * 1000
+            )
+            self.periodic_callbacks["serialization-cache"] = pc
+
         self._address = contact_address
 
         if extensions is None:
@@ -941,6 +976,7 @@ class Worker(BaseWorker, ServerNode):
         except AttributeError:
             # spilling is disabled
             spilled_memory, spilled_disk = 0, 0
+        compressed = getattr(self.data, "compressed_total", 0)
 
         # Send Fine Performance Metrics
         # Swap the dictionary to avoid updates while we iterate over it
@@ -972,7 +1008,11 @@ class Worker(BaseWorker, ServerNode):
             spilled_bytes={
                 "memory": spilled_memory,
                 "disk": spilled_disk,
+                "compressed": compressed,
             },
+            serialization_cache_bytes=(
+                self.serialization_cache.nbytes if self.serialization_cache else 0
+            ),
             transfer={
                 "incoming_bytes": self.state.transfer_incoming_bytes,
                 "incoming_count": self.state.transfer_incoming_count,
@@ -1284,6 +1324,9 @@ class Worker(BaseWorker, ServerNode):
         await super().start_unsafe()
 
         enable_gc_diagnosis()
+        if dask.config.get("distributed.admin.gc.auto-tune"):
+            enable_gc_tuning()
+            self._gc_tuning = True
 
         ports = parse_ports(self._start_port)
         for port in ports:
@@ -1392,6 +1435,10 @@ class Worker(BaseWorker, ServerNode):
         self.state.address = self.address
         await self._register_with_scheduler()
         self.start_periodic_callbacks()
+        self.memory_manager.start_cgroup_watcher(self)
+        if tuner := gc_tuner():
+            # Modules, comms, etc. will live as long as the worker
+            tuner.freeze()
         return self
 
     @log_errors
@@ -1448,6 +1495,9 @@ class Worker(BaseWorker, ServerNode):
             nanny = False
 
         disable_gc_diagnosis()
+        if self._gc_tuning:
+            disable_gc_tuning()
+            self._gc_tuning = False
 
         try:
             self.log_event(self.address, {"action": "closing-worker", "reason": reason})
@@ -1566,6 +1616,8 @@ class Worker(BaseWorker, ServerNode):
                         executor=executor, wait=executor_wait
                     )  # Just run it directly
 
+        await self.memory_manager.close()
+
         self.stop()
         self.status = Status.closed
         setproctitle("dask worker [closed]")
@@ -1630,6 +1682,62 @@ class Worker(BaseWorker, ServerNode):
 
         self.stream_comms[address].send(msg)
 
+    def _get_data_for_transfer(
+        self, comm: Comm, key: Key, serializers: list[str] | None
+    ) -> object:
+        """Return the value of a key for get_data. If the key is spilled, try
+        returning its serialized frames as they are on disk instead of unspilling it.
+        """
+        if not isinstance(self.data, SpillBuffer) or serializers is not None:
+            return self.data[key]
+        value = self.data.get_for_transfer(key)
+        if not isinstance(value, Serialized):
+            return value
+        # The spilled frames are compressed according to
+        # distributed.worker.memory.spill-compression, which the peer may not support
+        decompression = comm.handshake_options.get("decompression", ())
+        compression = value.header.get("compression", ())
+        if all(c is None or c in decompression for c in compression):
+            return value
+        return self.data[key]
+
+    def _discard_serialized(self, key: Key, value: object) -> None:
+        """Drop a key that was just spilled from the serialization cache, so that
+        spilling it releases its memory. Called from the thread that spills.
+        """
+        assert self.serialization_cache is not None
+        self.loop.add_callback(self.serialization_cache.discard, key)
+
+    async def _serialize_for_transfer(
+        self,
+        comm: Comm,
+        key: Key,
+        value: object,
+        nbytes: int,
+        serializers: list[str] | None,
+    ) -> Serialize | Serialized:
+        """Wrap the value of a key for get_data. Large values that several workers are
+        likely to request at about the same time, e.g. during a replicate, are
+        serialized and compressed only once.
+        """
+        from distributed.actor import Actor
+
+        if isinstance(value, Serialized):
+            return value
+        cache = self.serialization_cache
+        if (
+            cache is None
+            or serializers is not None
+            or nbytes < cache.min_size
+            or isinstance(value, Actor)
+        ):
+            return to_serialize(value)
+        try:
+            return await cache.serialize(key, value, comm, nbytes)
+        except Exception:
+            # Let comm.write deal with unserializable values
+            return to_serialize(value)
+
     @context_meter_to_server_digest("get-data")
     async def get_data(
         self,
@@ -1637,6 +1745,7 @@ class Worker(BaseWorker, ServerNode):
         keys: Collection[str],
         who: str | None = None,
         serializers: list[str] | None = None,
+        chunk_size: int | None = None,
     ) -> GetDataBusy | Literal[Status.dont_reply]:
         max_connections = self.transfer_outgoing_count_limit
         # Allow same-host connections more liberally
@@ -1669,8 +1778,12 @@ class Worker(BaseWorker, ServerNode):
         self.transfer_outgoing_count += 1
         self.transfer_outgoing_count_total += 1
 
-        # This may potentially take many seconds if it involves unspilling
-        data = {k: self.data[k] for k in keys if k in self.data}
+        # This may potentially take many seconds if it involves reading from disk
+        data = {
+            k: self._get_data_for_transfer(comm, k, serializers)
+            for k in keys
+            if k in self.data
+        }
 
         if len(data) < len(keys):
             for k in set(keys) - data.keys():
@@ -1681,7 +1794,6 @@ class Worker(BaseWorker, ServerNode):
                         type(self.state.actors[k]), self.address, k, worker=self
                     )
 
-        msg = {"status": "OK", "data": {k: to_serialize(v) for k, v in data.items()}}
         # Note: `if k in self.data` above guarantees that
         # k is in self.state.tasks too and that nbytes is non-None
         bytes_per_task = {k: self.state.tasks[k].nbytes or 0 for k in data}
@@ -1689,9 +1801,27 @@ class Worker(BaseWorker, ServerNode):
         self.transfer_outgoing_bytes += total_bytes
         self.transfer_outgoing_bytes_total += total_bytes
 
+        if chunk_size is None:
+            msgs = [{"status": "OK", "data": data}]
+        else:
+            # Streaming transfer, requested by the peer. See gather_dep.
+            chunks = _split_transfer(data, bytes_per_task, chunk_size)
+            msgs = [
+                {"status": "OK", "data": chunk, "more": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)
+            ]
+
         try:
             with context_meter.meter("network", func=time) as m:
-                compressed = await comm.write(msg, serializers=serializers)
+                compressed = 0
+                for msg in msgs:
+                    msg["data"] = {
+                        k: await self._serialize_for_transfer(
+                            comm, k, v, bytes_per_task[k], serializers
+                        )
+                        for k, v in msg["data"].items()
+                    }
+                    compressed += await comm.write(msg, serializers=serializers)
                 response = await comm.read(deserializers=serializers)
             assert response == "OK", response
         except OSError:
@@ -1851,6 +1981,12 @@ class Worker(BaseWorker, ServerNode):
                 self.log_event(topic, msg)
             raise
 
+        cache = self.serialization_cache
+        if cache:
+            # Don't keep the serialized values of released keys alive
+            for key in [k for k in cache.keys() if k not in self.data]:
+                cache.discard(key)
+
     def stateof(self, key: str) -> dict[str, Any]:
         ts = self.state.tasks[key]
         return {
@@ -1894,6 +2030,8 @@ class Worker(BaseWorker, ServerNode):
         cause: TaskState,
         worker: str,
     ) -> None:
+        # Keys of a streaming transfer may have already been released
+        data = {key: value for key, value in data.items() if key in self.state.tasks}
         total_bytes = sum(self.state.tasks[key].get_nbytes() for key in data)
 
         cause.startstops.append(
@@ -1960,11 +2098,36 @@ class Worker(BaseWorker, ServerNode):
 
         self.state.log.append(("request-dep", worker, to_gather, stimulus_id, time()))
         logger.debug("Request %d keys from %s", len(to_gather), worker)
+        # Capture this before any chunk of a streaming transfer is moved to memory,
+        # as the key may then be released before the end of the transfer
+        cause = self._get_cause(to_gather)
+
+        def on_chunk(data: dict[Key, object]) -> None:
+            # Streaming transfer: move to memory the keys received so far
+            nonlocal total_nbytes
+            nbytes = sum(self.state.tasks[key].get_nbytes() for key in data)
+            total_nbytes -= nbytes
+            self.state.log.append(
+                ("receive-dep-chunk", worker, set(data), stimulus_id, time())
+            )
+            self.handle_stimulus(
+                GatherDepChunkEvent(
+                    worker=worker,
+                    nbytes=nbytes,
+                    data=data,
+                    stimulus_id=f"gather-dep-chunk-{time()}",
+                )
+            )
 
         try:
             with context_meter.meter("network", func=time) as m:
                 response = await get_data_from_worker(
-                    rpc=self.rpc, keys=to_gather, worker=worker, who=self.address
+                    rpc=self.rpc,
+                    keys=to_gather,
+                    worker=worker,
+                    who=self.address,
+                    chunk_size=self.transfer_chunk_size,
+                    on_chunk=on_chunk,
                 )
 
             if response["status"] == "busy":
@@ -1978,7 +2141,6 @@ class Worker(BaseWorker, ServerNode):
                 )
 
             assert response["status"] == "OK"
-            cause = self._get_cause(to_gather)
             self._update_metrics_received_data(
                 start=m.start,
                 stop=m.stop,
@@ -2137,6 +2299,9 @@ class Worker(BaseWorker, ServerNode):
                 assert ts.state in ("executing", "cancelled", "resumed"), ts
             assert ts.run_spec is not None
 
+            # Read back from disk the inputs of the next tasks while this one runs
+            self.memory_manager.start_unspill_ahead(self)
+
             start = time()
             data: dict[Key, Any] = {}
             for dep in ts.dependencies:
@@ -2166,6 +2331,7 @@ class Worker(BaseWorker, ServerNode):
                 )
 
             self.active_keys.add(key)
+            self.memory_manager.start_task_peak_memory(self, key)
             # Propagate span (see distributed.spans). This is useful when spawning
             # more tasks using worker_client() and for logging.
             span_ctx = (
@@ -2196,8 +2362,9 @@ class Worker(BaseWorker, ServerNode):
                     # thread pool and the number of running tasks in the worker state
                     # machine (e.g. https://github.com/dask/distributed/issues/5882)
                     with context_meter.meter("executor"):
-                        result = await run_in_executor_with_context(
+                        result = await _run_in_executor_with_priority(
                             e,
+                            ts.priority,
                             _run_task,
                             ts.run_spec,
                             data,
@@ -2221,6 +2388,7 @@ class Worker(BaseWorker, ServerNode):
                         )
             finally:
                 self.active_keys.discard(key)
+                peak_memory = self.memory_manager.stop_task_peak_memory(self, key)
                 span_ctx.__exit__(None, None, None)
 
             self.threads[key] = result["thread"]
@@ -2238,6 +2406,7 @@ class Worker(BaseWorker, ServerNode):
                     stop=result["stop"],
                     nbytes=result["nbytes"],
                     type=result["type"],
+                    peak_memory=peak_memory,
                     stimulus_id=f"task-finished-{time()}",
                 )
 
@@ -2699,12 +2868,19 @@ async def get_data_from_worker(
     who: str | None = None,
     serializers: list[str] | None = None,
     deserializers: list[str] | None = None,
+    chunk_size: int | None = None,
+    on_chunk: Callable[[dict[Key, object]], None] | None = None,
 ) -> GetDataBusy | GetDataSuccess:
     """Get keys from worker
 
     The worker has a two step handshake to acknowledge when data has been fully
     delivered.  This function implements that handshake.
 
+    If chunk_size is set, the remote worker streams the keys, smallest first, in
+    messages of at most chunk_size bytes each (or a single key, if larger). on_chunk
+    is invoked with the data of every chunk except the last one as soon as it arrives.
+    The returned response always contains all the keys that were received.
+
     See Also
     --------
     Worker.get_data
@@ -2716,6 +2892,8 @@ async def get_data_from_worker(
     if deserializers is None:
         deserializers = rpc.deserializers
 
+    kwargs = {} if chunk_size is None else {"chunk_size": chunk_size}
+
     comm = await rpc.connect(worker)
     comm.name = "Ephemeral Worker->Worker for gather"
     try:
@@ -2726,6 +2904,7 @@ async def get_data_from_worker(
             op="get_data",
             keys=keys,
             who=who,
+            **kwargs,
         )
         try:
             status = response["status"]
@@ -2733,12 +2912,38 @@ async def get_data_from_worker(
             raise ValueError("Unexpected response", response)
         else:
             if status == "OK":
+                data = {}
+                while response.pop("more", False):
+                    data.update(response["data"])
+                    if on_chunk:
+                        on_chunk(response["data"])
+                    response = await comm.read(deserializers=deserializers)
+                    assert response["status"] == "OK", response
+                response["data"] = {**data, **response["data"]}
                 await comm.write("OK")
         return response
     finally:
         rpc.reuse(worker, comm)
 
 
+def _split_transfer(
+    data: dict[Key, object], nbytes: dict[Key, int], chunk_size: int
+) -> list[dict[Key, object]]:
+    """Split the payload of a streaming get_data into chunks of at most chunk_size
+    bytes, smallest keys first. Keys larger than chunk_size get a chunk of their own.
+    There is always at least one chunk.
+    """
+    chunks: list[dict[Key, object]] = [{}]
+    chunk_nbytes = 0
+    for key in sorted(data, key=nbytes.__getitem__):
+        if chunks[-1] and chunk_nbytes + nbytes[key] > chunk_size:
+            chunks.append({})
+            chunk_nbytes = 0
+        chunks[-1][key] = data[key]
+        chunk_nbytes += nbytes[key]
+    return chunks
+
+
 cache_dumps: LRU[Callable[..., Any], bytes] = LRU(maxsize=100)
 
 _cache_lock = threading.Lock()
@@ -2759,6 +2964,25 @@ def dumps_function(func) -> bytes:
     return result
 
 
+async def _run_in_executor_with_priority(
+    executor: Executor,
+    priority: tuple[int, ...] | None,
+    func: Callable[P, T],
+    /,
+    *args: P.args,
+    **kwargs: P.kwargs,
+) -> T:
+    """Variant of :func:`~distributed.utils.run_in_executor_with_context` which, if
+    the executor is a :class:`~distributed.threadpoolexecutor.ThreadPoolExecutor`,
+    queues the call by task priority.
+    """
+    if not isinstance(executor, ThreadPoolExecutor) or priority is None:
+        return await run_in_executor_with_context(executor, func, *args, **kwargs)
+    context = contextvars.copy_context()
+    future = executor.submit_with_priority(priority, context.run, func, *args, **kwargs)
+    return await asyncio.wrap_future(future)
+
+
 def _run_task(
     task: GraphNode,
     data: dict,
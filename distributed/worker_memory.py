@@ -5,6 +5,8 @@ This module covers:
 - spill/unspill data depending on the 'distributed.worker.memory.spill' threshold
 - pause/unpause the worker depending on the 'distributed.worker.memory.pause' threshold
 - kill the worker depending on the 'distributed.worker.memory.terminate' threshold
+- on Linux, react immediately to memory pressure reported by cgroups v2, without
+  waiting for the next check of the above thresholds
 
 This module does *not* cover:
 - Changes in behaviour in Worker, Scheduler, task stealing, Active Memory Manager, etc.
@@ -24,8 +26,11 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+import select
 import sys
+import tracemalloc
 from collections.abc import Callable, Container, Hashable, MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from functools import partial
 from typing import TYPE_CHECKING, Any, Literal, cast
@@ -39,12 +44,18 @@ from dask.typing import Key
 from dask.utils import format_bytes, parse_bytes, parse_timedelta
 
 from distributed import system
-from distributed.compatibility import WINDOWS
+from distributed.compatibility import LINUX, WINDOWS
 from distributed.core import Status
+from distributed.diskutils import WorkDir, WorkSpace
 from distributed.gc import ThrottledGC
 from distributed.metrics import context_meter, monotonic
 from distributed.spill import ManualEvictProto, SpillBuffer
-from distributed.utils import RateLimiterFilter, has_arg, log_errors
+from distributed.utils import (
+    RateLimiterFilter,
+    has_arg,
+    log_errors,
+    run_in_executor_with_context,
+)
 
 if TYPE_CHECKING:
     from typing import TypeAlias
@@ -96,8 +107,30 @@ class WorkerMemoryManager:
     memory_spill_fraction: float | Literal[False]
     memory_pause_fraction: float | Literal[False]
     max_spill: int | Literal[False]
+    max_compressed: int | Literal[False]
     memory_monitor_interval: float
     _throttled_gc: ThrottledGC
+    spill_directories: list[str]
+    _spill_work_dirs: list[WorkDir]
+    #: Number of tasks at the top of the ready queue whose spilled inputs are read back
+    #: from disk before they start executing
+    unspill_ahead: int
+    #: How to measure the memory allocated by each task while it runs
+    task_peak_memory: Literal["rss", "tracemalloc", False]
+    #: {key of running task: [memory when the task started, highest memory since]}
+    _task_peaks: dict[Key, list[int]]
+    _tracemalloc_started: bool
+    #: Dedicated thread where keys are evicted and unspilled ahead of execution;
+    #: started on first use
+    _spill_executor: ThreadPoolExecutor | None
+    _unspill_ahead_task: asyncio.Task | None
+    #: New tasks started executing while _unspill_ahead_task was running
+    _unspill_ahead_again: bool
+    #: Held while the memory monitor runs, either periodically or after a cgroup event
+    _memory_monitor_lock: asyncio.Lock
+    _cgroup_watcher: CgroupMemoryWatcher | None
+    _cgroup_event_task: asyncio.Task | None
+    _closed: bool
 
     def __init__(
         self,
@@ -119,6 +152,39 @@ class WorkerMemoryManager:
         self.memory_pause_fraction = dask.config.get("distributed.worker.memory.pause")
         max_spill = dask.config.get("distributed.worker.memory.max-spill")
         self.max_spill = False if max_spill is False else parse_bytes(max_spill)
+        max_compressed = dask.config.get("distributed.worker.memory.max-compressed")
+        self.max_compressed = (
+            False if max_compressed is False else parse_bytes(max_compressed)
+        )
+
+        spill_buffer = (
+            data is None
+            and bool(self.memory_limit)
+            and bool(self.memory_target_fraction or self.memory_spill_fraction)
+        )
+        # Unique subdirectories of distributed.worker.memory.spill-directories, which
+        # are deleted when the worker shuts down, or by the next worker that uses the
+        # same directory if this one crashes. Also used by P2P shuffles.
+        self._spill_work_dirs = [
+            WorkSpace(d).new_work_dir(prefix="dask-spill-")
+            for d in dask.config.get("distributed.worker.memory.spill-directories")
+            if spill_buffer
+        ]
+        self.spill_directories = [w.dir_path for w in self._spill_work_dirs]
+        self.unspill_ahead = dask.config.get("distributed.worker.memory.unspill-ahead")
+        self.task_peak_memory = dask.config.get(
+            "distributed.worker.memory.task-peak-memory"
+        )
+        if self.task_peak_memory not in ("rss", "tracemalloc", False):
+            raise ValueError(
+                "distributed.worker.memory.task-peak-memory must be one of 'rss', "
+                f"'tracemalloc', or False; got {self.task_peak_memory!r}"
+            )
+        self._task_peaks = {}
+        self._tracemalloc_started = False
+        if self.task_peak_memory == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_started = True
 
         if isinstance(data, MutableMapping):
             self.data = data
@@ -139,9 +205,8 @@ class WorkerMemoryManager:
                 )
             else:
                 self.data = func(**kwargs)
-        elif self.memory_limit and (
-            self.memory_target_fraction or self.memory_spill_fraction
-        ):
+        elif spill_buffer:
+            assert self.memory_limit
             if self.memory_target_fraction:
                 target = int(
                     self.memory_limit
@@ -150,9 +215,14 @@ class WorkerMemoryManager:
             else:
                 target = sys.maxsize
             self.data = SpillBuffer(
-                os.path.join(worker.local_directory, "storage"),
+                self.spill_directories
+                or os.path.join(worker.local_directory, "storage"),
                 target=target,
                 max_spill=self.max_spill,
+                max_compressed=self.max_compressed,
+                spill_backend=dask.config.get(
+                    "distributed.worker.memory.spill-backend"
+                ),
             )
         else:
             self.data = {}
@@ -182,6 +252,31 @@ class WorkerMemoryManager:
             worker.periodic_callbacks["memory_monitor"] = pc
 
         self._throttled_gc = ThrottledGC(logger=worker_logger)
+        self._spill_executor = None
+        self._unspill_ahead_task = None
+        self._unspill_ahead_again = False
+        self._memory_monitor_lock = asyncio.Lock()
+        self._cgroup_watcher = None
+        self._cgroup_event_task = None
+        self._closed = False
+
+    def start_cgroup_watcher(self, worker: Worker) -> None:
+        """Run the memory monitor as soon as the kernel reports memory pressure on the
+        cgroup of the worker, on top of every ``monitor-interval``.
+        Must be invoked from the event loop after the periodic callbacks are started.
+        """
+        if "memory_monitor" in worker.periodic_callbacks:
+            self._cgroup_watcher = CgroupMemoryWatcher.start_if_available(
+                partial(self._on_cgroup_event, worker)
+            )
+
+    def _on_cgroup_event(self, worker: Worker) -> None:
+        # If the memory monitor is already running, it will take care of the
+        # memory increase that triggered the event
+        if not self._closed and not self._memory_monitor_lock.locked():
+            self._cgroup_event_task = asyncio.create_task(
+                self.memory_monitor(worker), name="memory-monitor-cgroup-event"
+            )
 
     @log_errors
     async def memory_monitor(self, worker: Worker) -> None:
@@ -191,12 +286,15 @@ class WorkerMemoryManager:
         If process memory rises above the pause threshold (80%), stop execution of new
         tasks.
         """
-        # Don't use psutil directly; instead read from the same API that is used
-        # to send info to the Scheduler (e.g. for the benefit of Active Memory
-        # Manager) and which can be easily mocked in unit tests.
-        memory = worker.monitor.get_process_memory()
-        self._maybe_pause_or_unpause(worker, memory)
-        await self._maybe_spill(worker, memory)
+        async with self._memory_monitor_lock:
+            # Don't use psutil directly; instead read from the same API that is used
+            # to send info to the Scheduler (e.g. for the benefit of Active Memory
+            # Manager) and which can be easily mocked in unit tests.
+            memory = worker.monitor.get_process_memory()
+            if self.task_peak_memory == "rss":
+                self._sample_task_peaks(memory)
+            self._maybe_pause_or_unpause(worker, memory)
+            await self._maybe_spill(worker, memory)
 
     def _maybe_pause_or_unpause(self, worker: Worker, memory: int) -> None:
         if self.memory_pause_fraction is False:
@@ -268,7 +366,7 @@ class WorkerMemoryManager:
         # wrapping our change in contextvars (inside add_callback) inside create_task(),
         # which copies and insulates the context.
         async def _() -> None:
-            with context_meter.add_callback(metrics_callback):
+            with context_meter.add_callback(metrics_callback, allow_offload=True):
                 # Measure delta between the measures from the SpillBuffer and the total
                 # end-to-end duration of _spill
                 await self._spill(worker, memory)
@@ -277,7 +375,15 @@ class WorkerMemoryManager:
         # End work around
 
     async def _spill(self, worker: Worker, memory: int) -> None:
-        """Evict keys until the process memory goes below the ``target`` threshold"""
+        """Evict keys until the process memory goes below the ``target`` threshold.
+
+        If data is a SpillBuffer, serialization and disk writes run on a dedicated
+        thread, so that they don't block the event loop. The keys being evicted remain
+        available in memory until they have been written to disk; if they are deleted
+        or overwritten in the meantime, their eviction is cancelled.
+        Third-party implementations of ManualEvictProto are evicted from the event
+        loop, as they may not be thread-safe.
+        """
         assert self.memory_limit
         total_spilled = 0
 
@@ -293,6 +399,7 @@ class WorkerMemoryManager:
         last_checked_for_pause = last_yielded = monotonic()
 
         data = cast(ManualEvictProto, self.data)
+        threaded = isinstance(data, SpillBuffer) and not self._closed
 
         while memory > target:
             if not data.fast:
@@ -307,14 +414,21 @@ class WorkerMemoryManager:
                 )
                 break
 
-            weight = data.evict()
+            if threaded and not self._closed:
+                # Evict one key at a time, so that we can stop as soon as we reach the
+                # target. The key remains in data.fast until it's been written to disk.
+                weight = await run_in_executor_with_context(
+                    self._get_spill_executor(), data.evict
+                )
+            else:
+                weight = data.evict()
             if weight == -1:
                 # Failed to evict:
                 # disk full, spill size limit exceeded, or pickle error
                 break
 
             total_spilled += weight
-            count += 1
+            count += weight > 0
 
             memory = worker.monitor.get_process_memory()
             if total_spilled > need and memory > target:
@@ -332,12 +446,13 @@ class WorkerMemoryManager:
                 self._maybe_pause_or_unpause(worker, memory)
                 last_checked_for_pause = now
 
-            # Increase spilling aggressiveness when the fast buffer is filled with a lot
-            # of small values. This artificially chokes the rest of the event loop -
-            # namely, the reception of new data from other workers. While this is
-            # somewhat of an ugly hack,  DO NOT tweak this without a thorough cycle of
-            # stress testing. See: https://github.com/dask/distributed/issues/6110.
-            if now - last_yielded > 0.5:
+            # When evicting from the event loop, increase spilling aggressiveness when
+            # the fast buffer is filled with a lot of small values. This artificially
+            # chokes the rest of the event loop - namely, the reception of new data from
+            # other workers. While this is somewhat of an ugly hack,  DO NOT tweak this
+            # without a thorough cycle of stress testing.
+            # See: https://github.com/dask/distributed/issues/6110.
+            if not threaded and now - last_yielded > 0.5:
                 await asyncio.sleep(0)
                 last_yielded = monotonic()
 
@@ -348,6 +463,147 @@ class WorkerMemoryManager:
                 format_bytes(total_spilled),
             )
 
+    def _get_spill_executor(self) -> ThreadPoolExecutor:
+        if self._spill_executor is None:
+            self._spill_executor = ThreadPoolExecutor(
+                1, thread_name_prefix="Dask-Spill"
+            )
+        return self._spill_executor
+
+    def start_unspill_ahead(self, worker: Worker) -> None:
+        """Start reading back from disk the spilled inputs of the next
+        ``unspill_ahead`` tasks in the ready queue, on the spill thread, while the
+        tasks currently executing are still running. This is called every time a task
+        starts executing.
+
+        Keys are unspilled only as long as they fit below the ``target`` threshold and
+        the process memory is below it, so that this never causes other keys to be
+        spilled.
+        """
+        if (
+            not self.unspill_ahead
+            or self._closed
+            or not isinstance(self.data, SpillBuffer)
+            or not self.data.slow
+        ):
+            return
+        if self._unspill_ahead_task is not None:
+            self._unspill_ahead_again = True
+            return
+
+        def metrics_callback(label: Hashable, value: float, unit: str) -> None:
+            if not isinstance(label, tuple):
+                label = (label,)
+            worker.digest_metric(("memory-monitor", *label, unit), value)
+
+        # create_task() copies and insulates the context of Worker.execute
+        async def _() -> None:
+            try:
+                with context_meter.add_callback(metrics_callback, allow_offload=True):
+                    await self._unspill_ahead(worker)
+            except Exception:  # pragma: nocover
+                worker_logger.exception("Failed to unspill data ahead of execution")
+            finally:
+                self._unspill_ahead_task = None
+
+        self._unspill_ahead_task = asyncio.create_task(_(), name="unspill-ahead")
+
+    async def _unspill_ahead(self, worker: Worker) -> None:
+        data = cast(SpillBuffer, self.data)
+        target = (self.memory_limit or 0) * (
+            self.memory_target_fraction or self.memory_spill_fraction or 1
+        )
+        while True:
+            self._unspill_ahead_again = False
+            keys = {
+                dep.key: None
+                for ts in worker.state.ready.peekn(self.unspill_ahead)
+                for dep in ts.dependencies
+            }
+            for key in keys:
+                if self._closed or (
+                    target and worker.monitor.get_process_memory() > target
+                ):
+                    return
+                if key not in data.slow:
+                    continue
+                if not await run_in_executor_with_context(
+                    self._get_spill_executor(), data.prefetch, key
+                ):
+                    return  # target reached
+            if not self._unspill_ahead_again:
+                return
+
+    def _current_memory(self, worker: Worker) -> int:
+        if self.task_peak_memory == "rss":
+            return worker.monitor.get_process_memory()
+        current, _ = tracemalloc.get_traced_memory()
+        return current
+
+    def _sample_task_peaks(self, memory: int) -> None:
+        for peak in self._task_peaks.values():
+            if memory > peak[1]:
+                peak[1] = memory
+
+    def start_task_peak_memory(self, worker: Worker, key: Key) -> None:
+        """Start measuring the memory allocated by a task while it runs.
+        See ``distributed.worker.memory.task-peak-memory``.
+        """
+        if not self.task_peak_memory:
+            return
+        if self.task_peak_memory == "tracemalloc" and not self._task_peaks:
+            # Don't reset the peak while other tasks are running, so that it is never
+            # lower than theirs
+            tracemalloc.reset_peak()
+        memory = self._current_memory(worker)
+        self._sample_task_peaks(memory)
+        self._task_peaks[key] = [memory, memory]
+
+    def stop_task_peak_memory(self, worker: Worker, key: Key) -> int | None:
+        """Stop measuring the memory allocated by a task and return the highest memory
+        usage observed while it ran, minus the memory usage when it started.
+
+        When multiple tasks run at the same time, the allocations of each of them
+        contribute to the peak of all the others, so this is an upper bound.
+        In ``rss`` mode, process memory is sampled only when a task starts or finishes
+        and by the memory monitor, so short-lived spikes may be missed.
+        """
+        try:
+            baseline, peak = self._task_peaks.pop(key)
+        except KeyError:
+            return None
+        if self.task_peak_memory == "tracemalloc":
+            _, peak = tracemalloc.get_traced_memory()
+        else:
+            memory = worker.monitor.get_process_memory()
+            self._sample_task_peaks(memory)
+            peak = max(peak, memory)
+        return max(0, peak - baseline)
+
+    async def close(self) -> None:
+        """Wait for the eviction in progress to complete and stop the spill thread.
+        Any further spilling will happen on the event loop.
+        Delete the spill directories outside of the worker's local directory.
+        """
+        self._closed = True
+        if self._cgroup_watcher is not None:
+            self._cgroup_watcher.stop()
+            self._cgroup_watcher = None
+        if self._cgroup_event_task is not None:
+            await self._cgroup_event_task
+        if self._unspill_ahead_task is not None:
+            await self._unspill_ahead_task
+        if self._spill_executor is not None:
+            await asyncio.to_thread(self._spill_executor.shutdown)
+        if isinstance(self.data, SpillBuffer):
+            # Wait for compaction to complete and close the files of the spill log
+            await asyncio.to_thread(self.data.close)
+        for work_dir in self._spill_work_dirs:
+            work_dir.release()
+        if self._tracemalloc_started:
+            tracemalloc.stop()
+            self._tracemalloc_started = False
+
     def _to_dict(self, *, exclude: Container[str] = ()) -> dict:
         info = {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
         info["data"] = dict.fromkeys(self.data)
@@ -359,6 +615,7 @@ class NannyMemoryManager:
     memory_terminate_fraction: float | Literal[False]
     memory_monitor_interval: float | None
     _last_terminated_pid: int
+    _cgroup_watcher: CgroupMemoryWatcher | None
 
     def __init__(
         self,
@@ -378,6 +635,7 @@ class NannyMemoryManager:
         )
         assert isinstance(self.memory_monitor_interval, (int, float))
         self._last_terminated_pid = -1
+        self._cgroup_watcher = None
 
         if self.memory_limit and self.memory_terminate_fraction is not False:
             pc = PeriodicCallback(
@@ -386,6 +644,22 @@ class NannyMemoryManager:
             )
             nanny.periodic_callbacks["memory_monitor"] = pc
 
+    def start_cgroup_watcher(self, nanny: Nanny) -> None:
+        """Run the memory monitor as soon as the kernel reports memory pressure on the
+        cgroup of the nanny, which normally also contains the worker process, on top
+        of every ``monitor-interval``.
+        Must be invoked from the event loop after the periodic callbacks are started.
+        """
+        if "memory_monitor" in nanny.periodic_callbacks:
+            self._cgroup_watcher = CgroupMemoryWatcher.start_if_available(
+                partial(self.memory_monitor, nanny)
+            )
+
+    def close(self) -> None:
+        if self._cgroup_watcher is not None:
+            self._cgroup_watcher.stop()
+            self._cgroup_watcher = None
+
     def memory_monitor(self, nanny: Nanny) -> None:
         """Track worker's memory. Restart if it goes above terminate fraction."""
         if (
@@ -448,6 +722,159 @@ class NannyMemoryManager:
             process.kill()
 
 
+class CgroupMemoryWatcher:
+    """Invoke a callback as soon as the Linux kernel reports a memory event on the
+    cgroup v2 of this process, instead of waiting for the next poll of the memory
+    monitor. A fast allocation spike could otherwise go past the pause, spill, and
+    terminate thresholds between two polls.
+
+    This watches, through an epoll file descriptor registered with the event loop:
+
+    - ``memory.events``, which the kernel updates whenever the cgroup breaches
+      ``memory.high`` or ``memory.max``;
+    - a PSI trigger on ``memory.pressure``, which fires when the processes of the
+      cgroup spend more than :attr:`psi_stall` out of every :attr:`psi_window` stalled
+      waiting for memory.
+
+    ``memory.current`` does not support change notifications; it's up to the callback
+    to measure memory.
+
+    Parameters
+    ----------
+    callback
+        Function to invoke, from the event loop, after each event
+    path
+        cgroup directory to watch
+    """
+
+    #: Root of the cgroup v2 unified hierarchy
+    root = "/sys/fs/cgroup"
+    #: cgroups of this process, one per line
+    proc_cgroup = "/proc/self/cgroup"
+    #: Seconds of stall within :attr:`psi_window` which fire the PSI trigger
+    psi_stall = 0.15
+    #: Unprivileged processes can only create PSI triggers with a window that's a
+    #: multiple of 2 seconds
+    psi_window = 2.0
+
+    callback: Callable[[], object]
+    path: str
+    _epoll: select.epoll | None
+    #: File descriptors registered with the epoll
+    _fds: list[int]
+    #: File descriptor of memory.events, which needs to be read to re-arm it
+    _events_fd: int | None
+
+    def __init__(self, callback: Callable[[], object], path: str):
+        self.callback = callback
+        self.path = path
+        self._epoll = None
+        self._fds = []
+        self._events_fd = None
+
+    @classmethod
+    def cgroup_path(cls) -> str | None:
+        """Return the directory of the cgroup v2 of this process, or None if this
+        process is not in a cgroup v2 with the memory controller enabled
+        """
+        if not LINUX:
+            return None
+        try:
+            with open(cls.proc_cgroup) as fh:
+                for line in fh:
+                    if line.startswith("0::"):
+                        path = os.path.join(cls.root, line[3:].strip().lstrip("/"))
+                        if os.path.exists(os.path.join(path, "memory.events")):
+                            return path
+        except OSError:
+            pass
+        return None
+
+    @classmethod
+    def start_if_available(
+        cls, callback: Callable[[], object]
+    ) -> CgroupMemoryWatcher | None:
+        """Start watching the cgroup of this process, if
+        ``distributed.worker.memory.cgroup-events`` is enabled and the kernel
+        supports it. Return None otherwise.
+        """
+        if not dask.config.get("distributed.worker.memory.cgroup-events"):
+            return None
+        path = cls.cgroup_path()
+        if path is None:
+            return None
+        watcher = cls(callback, path)
+        return watcher if watcher.start() else None
+
+    def start(self) -> bool:
+        """Start watching the cgroup. Return False if neither memory.events nor
+        memory.pressure can be watched.
+        """
+        loop = asyncio.get_running_loop()
+        self._epoll = select.epoll()
+        try:
+            fd = os.open(os.path.join(self.path, "memory.events"), os.O_RDONLY)
+            os.read(fd, 4096)
+            self._register(fd)
+            self._events_fd = fd
+        except OSError as e:
+            worker_logger.debug("Can't watch cgroup memory.events: %s", e)
+
+        try:
+            fd = os.open(
+                os.path.join(self.path, "memory.pressure"),
+                os.O_RDWR | os.O_NONBLOCK,
+            )
+            trigger = f"some {int(self.psi_stall * 1e6)} {int(self.psi_window * 1e6)}"
+            try:
+                os.write(fd, trigger.encode() + b"\0")
+            except OSError:
+                os.close(fd)
+                raise
+            self._register(fd)
+        except OSError as e:
+            worker_logger.debug("Can't create cgroup memory pressure trigger: %s", e)
+
+        if not self._fds:
+            self.stop()
+            return False
+
+        loop.add_reader(self._epoll.fileno(), self._on_event)
+        worker_logger.debug("Watching memory events of cgroup %s", self.path)
+        return True
+
+    def _register(self, fd: int) -> None:
+        assert self._epoll
+        try:
+            self._epoll.register(fd, select.EPOLLPRI)
+        except OSError:
+            os.close(fd)
+            raise
+        self._fds.append(fd)
+
+    def _on_event(self) -> None:
+        assert self._epoll
+        for fd, _ in self._epoll.poll(0):
+            if fd == self._events_fd:
+                # The notification is delivered again until the file is read
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.read(fd, 4096)
+        self.callback()
+
+    def stop(self) -> None:
+        """Stop watching the cgroup and release all file descriptors"""
+        if self._epoll is None:
+            return
+        with suppress(RuntimeError):  # No running event loop
+            asyncio.get_running_loop().remove_reader(self._epoll.fileno())
+        for fd in self._fds:
+            os.close(fd)
+        self._epoll.close()
+        self._epoll = None
+        self._fds = []
+        self._events_fd = None
+
+
 def parse_memory_limit(
     memory_limit: str | float | None,
     nthreads: int,
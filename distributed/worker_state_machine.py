@@ -266,6 +266,10 @@ class TaskState:
     metadata: dict = field(default_factory=dict)
     #: The size of the value of the task, if in memory
     nbytes: int | None = None
+    #: Memory allocated by the task while it was executing, on top of what the worker
+    #: was using when it started; None if not measured. See
+    #: :meth:`~distributed.worker_memory.WorkerMemoryManager.start_task_peak_memory`.
+    peak_memory: int | None = None
     #: Arbitrary task annotations
     annotations: dict | None = None
     #: unique span id (see ``distributed.spans``).
@@ -442,6 +446,7 @@ class TaskFinishedMsg(SendMessageToScheduler):
     metadata: dict
     thread: int | None
     startstops: list[StartStop]
+    peak_memory: int | None
     __slots__ = tuple(__annotations__)
 
     def to_dict(self) -> dict[str, Any]:
@@ -668,6 +673,30 @@ class GatherDepSuccessEvent(GatherDepDoneEvent):
         self.data = {k: None for k in self.data}
 
 
+@dataclass
+class GatherDepChunkEvent(StateMachineEvent):
+    """:class:`GatherDep` instruction is still running: a chunk of the requested keys
+    has been received from a streaming transfer. See
+    ``distributed.worker.transfer.chunk-size``.
+    """
+
+    __slots__ = ("worker", "nbytes", "data")
+    worker: str
+    #: Portion of :attr:`GatherDep.total_nbytes` covered by this chunk. It is not
+    #: included in the ``total_nbytes`` of the final :class:`GatherDepDoneEvent`.
+    nbytes: int
+    data: dict[Key, object]
+
+    def to_loggable(self, *, handled: float) -> StateMachineEvent:
+        out = copy(self)
+        out.handled = handled
+        out.data = {k: None for k in self.data}
+        return out
+
+    def _after_from_dict(self) -> None:
+        self.data = {k: None for k in self.data}
+
+
 @dataclass
 class GatherDepBusyEvent(GatherDepDoneEvent):
     """:class:`GatherDep` instruction terminated:
@@ -822,6 +851,7 @@ class ExecuteSuccessEvent(ExecuteDoneEvent):
     stop: float
     nbytes: int
     type: type | None
+    peak_memory: int | None
     __slots__ = tuple(__annotations__)
 
     def to_loggable(self, *, handled: float) -> StateMachineEvent:
@@ -861,6 +891,7 @@ class ExecuteSuccessEvent(ExecuteDoneEvent):
             stop=1.0,
             nbytes=nbytes,
             type=None,
+            peak_memory=None,
             stimulus_id=stimulus_id,
         )
 
@@ -1783,6 +1814,7 @@ class WorkerState:
             metadata=ts.metadata,
             thread=self.threads.get(ts.key),
             startstops=ts.startstops,
+            peak_memory=ts.peak_memory,
             stimulus_id=stimulus_id,
         )
 
@@ -2948,6 +2980,28 @@ class WorkerState:
 
         return recommendations, []
 
+    @_handle_event.register
+    def _handle_gather_dep_chunk(self, ev: GatherDepChunkEvent) -> RecsInstrs:
+        """gather_dep is streaming; move the keys received so far to memory without
+        waiting for the rest of the transfer.
+        """
+        self.transfer_incoming_bytes -= ev.nbytes
+        keys = self.in_flight_workers[ev.worker]
+        if self.validate:
+            assert ev.data.keys() <= keys
+        # Don't update in place; the set is shared with the GatherDep instruction
+        self.in_flight_workers[ev.worker] = keys - ev.data.keys()
+
+        recommendations: Recs = {}
+        for key, value in ev.data.items():
+            ts = self.tasks[key]
+            ts.done = True
+            ts.coming_from = None
+            self.in_flight_tasks.remove(ts)
+            recommendations[ts] = ("memory", value, ts.run_id)
+
+        return recommendations, []
+
     @_handle_event.register
     def _handle_gather_dep_busy(self, ev: GatherDepBusyEvent) -> RecsInstrs:
         """gather_dep terminated: remote worker is busy"""
@@ -3145,6 +3199,7 @@ class WorkerState:
         ts.startstops.append({"action": "compute", "start": ev.start, "stop": ev.stop})
         ts.nbytes = ev.nbytes
         ts.type = ev.type
+        ts.peak_memory = ev.peak_memory
         recs[ts] = ("memory", ev.value, ev.run_id)
         return recs, instr
 
@@ -3215,6 +3270,28 @@ class WorkerState:
 
         return recommendations, instructions
 
+    def next_use(self, key: Key) -> tuple[int, ...] | None:
+        """Return the priority of the first task waiting to run on this worker that
+        needs key as an input, or None if there are none.
+        The lower the priority, the sooner the key is going to be needed.
+
+        This is used by :class:`~distributed.spill.SpillBuffer` to choose which keys to
+        spill to disk. It may be called from the spill thread.
+        """
+        ts = self.tasks.get(key)
+        if ts is None:
+            return None
+        # Copy the set, as it may be modified by the event loop thread in the meantime
+        return min(
+            (
+                dts.priority
+                for dts in tuple(ts.dependents)
+                if dts.state in ("waiting", "ready", "constrained")
+                and dts.priority is not None
+            ),
+            default=None,
+        )
+
     ###############
     # Diagnostics #
     ###############